@@ -2,7 +2,7 @@
 #' FILE: molgenis_emx2_client.py
 #' AUTHOR: David Ruvolo
 #' CREATED: 2022-02-09
-#' MODIFIED: 2023-05-11
+#' MODIFIED: 2026-10-17
 #' PURPOSE: EMX2 API py client
 #' STATUS: stable
 #' PACKAGES: requests
@@ -12,7 +12,12 @@
 from urllib.parse import urlparse, urlunparse
 from emx2.api.graphql import graphql
 from emx2.api.cli import cli
+from rd3tools.datatable import dt_from_records
+from os import path
 import requests
+import tempfile
+import zipfile
+import uuid
 import re
 
 print2 = cli()
@@ -25,10 +30,19 @@ def cleanUrl(string:str=None):
   value = value._replace(path = re.sub(r'([\/]{2,})|([\/]{1}$)','', value.path))
   return urlunparse(value)
 
+# column types that reference another table
+REF_TYPES = ['REF', 'REF_ARRAY', 'REFBACK', 'ONTOLOGY', 'ONTOLOGY_ARRAY']
+
+# column types that do not contain data
+LAYOUT_TYPES = ['HEADING', 'SECTION']
+
 class Molgenis:
-  def __init__(self, url:str=None):
+  def __init__(self, url:str=None, token:str=None):
     self.host = cleanUrl(url)
     self.session = requests.Session()
+    self._schemas = {}
+    if token:
+      self.session.headers.update({'x-molgenis-token': token})
     
   def _post(self,**kwargs):
     """POST Wrapper
@@ -46,6 +60,27 @@ class Molgenis:
     return response
 
 
+  def _graphqlData(self, response, label: str=None):
+    """GraphQL Data
+    Get the data of a GraphQL response. Errors are returned with status 200,
+    so the body is checked for errors as well.
+
+    @param response response of a GraphQL request
+    @param label a description of the request (used in the error message)
+
+    @return dictionary
+    """
+    response.raise_for_status()
+    body = response.json()
+    if body.get('errors'):
+      errors = '\n'.join([err.get('message', '') for err in body['errors']])
+      raise requests.exceptions.HTTPError(
+        f"GraphQL error in {label}:\n{errors}",
+        response=response
+      )
+    return body.get('data') or {}
+
+
   def signin(self, username:str=None, password:str=None):
     """Signin
     Sign in into an EMX2 instance with your username and password
@@ -177,27 +212,155 @@ class Molgenis:
     return response
   
   
-  def getSchema(self, database: str=None, table: str=None):
+  def getSchema(self, database: str=None, table: str=None, refresh: bool=False):
     """Get Schema
-    Retrieve the schema of a database
+    Retrieve the schema of a database. The schema is fetched once per
+    database and reused in later calls. Only schemas that were retrieved
+    successfully are reused.
     
     @param database the name of a database
     @param table if defined, response will be filtered for a specific table
+    @param refresh if True, the schema is fetched again
     
     @return json
     """
-    response = self._post(
-      url=f"{self.host}/{database}/api/graphql",
-      json={'query': graphql.schema()}
-    )
-    
-    data = response.json()['data']
+    if refresh or (database not in self._schemas):
+      response = self._post(
+        url=f"{self.host}/{database}/api/graphql",
+        json={'query': graphql.schema()}
+      )
+      data = self._graphqlData(response, label=f"schema of {database}")
+      if not data.get('_schema'):
+        raise ValueError(f"No schema found for database '{database}'")
+      self._schemas[database] = data
+
+    data = self._schemas[database]
 
     if (table is not None) and bool(data):
       return [schematable for schematable in data['_schema']['tables'] if schematable['name'] == table][0]
     else:
       return data
-      
+
+
+  def _selection(self, database: str=None, table: dict=None, columns: list=None):
+    """Selection
+    Build the graphql selection of a table. Reference columns select the
+    primary key of the referenced table.
+    
+    @param database name of the database
+    @param table a table from the schema (see `getSchema`)
+    @param columns names or ids of the columns to select; all if None
+    
+    @return list of tuples (column id, column name, selection)
+    """
+    tables = {schematable['name']: schematable for schematable in self.getSchema(database)['_schema']['tables']}
+    selection = []
+    for column in table['columns']:
+      if column['columnType'] in LAYOUT_TYPES or column['name'].startswith('mg_'):
+        continue
+      if columns and (column['name'] not in columns) and (column['id'] not in columns):
+        continue
+      if column['columnType'] in REF_TYPES:
+        reftable = tables.get(column['refTable'], {'columns': []})
+        keys = [
+          refcolumn['id'] for refcolumn in reftable['columns']
+          if refcolumn.get('key') == 1 and refcolumn['columnType'] not in REF_TYPES
+        ] or ['name']
+        selection.append((column['id'], column['name'], f"{column['id']} {{ {' '.join(keys)} }}"))
+      else:
+        selection.append((column['id'], column['name'], column['id']))
+    return selection
+
+
+  def _flattenValue(self, value=None):
+    """Flatten Value
+    Collapse a reference into its key value(s). References with more than
+    one key are joined with a space; arrays are joined with a comma.
+    
+    @param value value returned by graphql
+    
+    @return string or value
+    """
+    if isinstance(value, dict):
+      return ' '.join(map(str, value.values()))
+    if isinstance(value, list):
+      return ','.join([self._flattenValue(item) for item in value]) or None
+    return value
+
+
+  def fetch_table(
+    self,
+    database: str=None,
+    table: str=None,
+    columns: list=None,
+    filter: dict=None,
+    page_size: int=1000,
+    flatten: bool=True,
+    as_frame: bool=False
+  ):
+    """Fetch Table
+    Retrieve the rows of a table in pages using limit and offset. The graphql
+    selection is built from the (cached) schema.
+    
+    @param database name of the database
+    @param table name of the table (e.g., 'Clinical observations')
+    @param columns list of column names to select (default: all columns)
+    @param filter a graphql filter object, e.g., {'id': {'equals': 'P001'}}
+    @param page_size number of rows per request
+    @param flatten if True, references are collapsed into their key values
+      and rows are keyed by column name instead of column id
+    @param as_frame if True, a datatable frame is returned
+    
+    @examples
+    ```
+    for row in db.fetch_table('RD3', 'Clinical observations'):
+      ...
+    ```
+    
+    @return generator of dictionaries or a datatable frame
+    """
+    rows = self._fetchRows(database, table, columns, filter, page_size, flatten)
+    if as_frame:
+      return dt_from_records(rows)
+    return rows
+
+
+  def _fetchRows(self, database, table, columns, filter, page_size, flatten):
+    """Fetch Rows
+    Generator that requests pages until a page with fewer rows is returned
+    (see `fetch_table`)
+    """
+    schematable = self.getSchema(database, table)
+    selection = self._selection(database, schematable, columns)
+    tableId = schematable['id']
+    query = (
+      "query($filter:" + tableId + "Filter, $limit:Int, $offset:Int) {\n"
+      "  " + tableId + "(filter:$filter, limit:$limit, offset:$offset) {\n"
+      "    " + '\n    '.join([field for _, _, field in selection]) + "\n"
+      "  }\n"
+      "}"
+    )
+
+    offset = 0
+    while True:
+      response = self._post(
+        url=f"{self.host}/{database}/api/graphql",
+        json={
+          'query': query,
+          'variables': {'filter': filter or {}, 'limit': page_size, 'offset': offset}
+        }
+      )
+      data = self._graphqlData(response, label=f"{database}::{table}")
+      page = data.get(tableId) or []
+      for row in page:
+        if flatten:
+          yield {name: self._flattenValue(row.get(columnId)) for columnId, name, _ in selection}
+        else:
+          yield row
+      if len(page) < page_size:
+        break
+      offset += page_size
+
 
   def importCsvFile(self, database:str=None, table:str=None, file:str=None):
     """Import CSV File
@@ -221,14 +384,13 @@ class Molgenis:
     
     @return status message
     """
+    # the file object is passed to requests so the body is streamed from disk
     with open(file, 'rb') as stream:
-      databinary = stream.read()
-      stream.close()
-
-    response = self._post(
-      url=f"{self.host}/{database}/api/csv/{table}",
-      data=databinary
-    )
+      response = self._post(
+        url=f"{self.host}/{database}/api/csv/{table}",
+        headers={'Content-Type': 'text/csv'},
+        data=stream
+      )
     
     if response.status_code == 200:
       print2.alert_success(
@@ -239,6 +401,113 @@ class Molgenis:
     return response
 
     
+  def _sortByDependency(self, database:str=None, tables:list=[]):
+    """Sort By Dependency
+    Order tables so that referenced tables are imported before the tables
+    that reference them. Tables that are not in the schema keep their
+    position relative to each other.
+    
+    @param database name of the database
+    @param tables list of table names
+    
+    @return list of table names
+    """
+    schematables = {
+      schematable['name'].lower(): schematable
+      for schematable in self.getSchema(database)['_schema']['tables']
+    }
+    names = {table.lower(): table for table in tables}
+    ordered = []
+    visiting = set()
+
+    def visit(name):
+      if name in visiting or names[name] in ordered:
+        return
+      visiting.add(name)
+      for column in schematables.get(name, {}).get('columns', []):
+        ref = (column.get('refTable') or '').lower()
+        if ref in names and ref != name and column['columnType'] != 'REFBACK':
+          visit(ref)
+      ordered.append(names[name])
+
+    for table in tables:
+      visit(table.lower())
+    return ordered
+
+
+  def _multipartStream(self, field:str=None, filename:str=None, file:str=None, boundary:str=None, chunk_size:int=1048576):
+    """Multipart Stream
+    Generator that yields a multipart/form-data body for a single file,
+    reading the file in chunks instead of loading it into memory.
+    
+    @param field name of the form field
+    @param filename name of the file in the request
+    @param file path to the file
+    @param boundary multipart boundary
+    @param chunk_size number of bytes to read at a time
+    """
+    yield (
+      f'--{boundary}\r\n'
+      f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+      'Content-Type: application/zip\r\n\r\n'
+    ).encode('utf-8')
+    with open(file, 'rb') as stream:
+      while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+          break
+        yield chunk
+    yield f'\r\n--{boundary}--\r\n'.encode('utf-8')
+
+
+  def importZip(self, database:str=None, files=None):
+    """Import Zip
+    Pack one or more csv files into a zip archive and import them in a
+    single request. Tables are added to the archive in dependency order
+    (referenced tables first) using the schema of the database.
+    
+    @param database name of the database you wish to import data into
+    @param files a dictionary of table names and paths to csv files, or a
+      list of paths (the table name is the name of the file)
+    
+    @examples
+    ```
+    db.importZip(database='RD3', files={'organisations': 'data/organisations_2.csv'})
+    db.importZip(database='RD3', files=['data/persons.csv', 'data/library.csv'])
+    ```
+    
+    @return response
+    """
+    if isinstance(files, dict):
+      tables = dict(files)
+    else:
+      tables = {path.splitext(path.basename(file))[0]: file for file in files}
+
+    order = self._sortByDependency(database, list(tables.keys()))
+    boundary = uuid.uuid4().hex
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+      archive = f"{tmpdir}/{database}.zip"
+      with zipfile.ZipFile(archive, 'w', compression=zipfile.ZIP_DEFLATED) as zipped:
+        for table in order:
+          zipped.write(tables[table], arcname=f"{table}.csv")
+
+      response = self._post(
+        url=f"{self.host}/{database}/api/zip",
+        headers={'Content-Type': f'multipart/form-data; boundary={boundary}'},
+        data=self._multipartStream('file', f"{database}.zip", archive, boundary)
+      )
+
+    if response.status_code == 200:
+      print2.alert_success(
+        'Imported', print2.text_value(len(order)),
+        f"table{'s'[:len(order)^1]} into",
+        print2.text_value(database)
+      )
+    
+    return response
+
+    
   def importData(self, database:str=None, table:str=None, data:str=None):
     """Import Data
     Import a data object into a schema table
@@ -0,0 +1,187 @@
+#///////////////////////////////////////////////////////////////////////////////
+# FILE: emx2async.py
+# AUTHOR: David Ruvolo
+# CREATED: 2026-10-17
+# MODIFIED: 2026-10-17
+# PURPOSE: asyncio variant of the EMX2 client for large mutations
+# STATUS: stable
+# PACKAGES: requests
+# COMMENTS: Requests are sent through the pooled session of the EMX2 client
+# and executed in a thread pool so that batches run concurrently.
+#///////////////////////////////////////////////////////////////////////////////
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from requests.adapters import HTTPAdapter
+from emx2.api.emx2 import Molgenis, print2
+from emx2.api.graphql import graphql
+import requests
+import asyncio
+import json
+
+class AsyncMolgenis(Molgenis):
+  """Async EMX2 client
+  Mutations are split into batches that are limited by the number of records
+  and the size of the request. Batches are sent concurrently over a single
+  pooled session and each batch returns a structured result.
+
+  @param url url of the EMX2 instance
+  @param token an EMX2 api token (optional; alternatively use `signin`)
+  @param concurrency maximum number of requests in flight
+  @param batch_size maximum number of records per mutation
+  @param max_bytes maximum size of the records in a mutation (json encoded)
+  """
+  def __init__(self, url:str=None, token:str=None, concurrency:int=4, batch_size:int=1000, max_bytes:int=5_000_000):
+    super().__init__(url, token)
+    self.concurrency = concurrency
+    self.batch_size = batch_size
+    self.max_bytes = max_bytes
+    self.session.mount(
+      self.host,
+      HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+    )
+    self._executor = ThreadPoolExecutor(max_workers=concurrency)
+
+  def _batches(self, data:list=[]):
+    """Batches
+    Split records into batches that respect `batch_size` and `max_bytes`.
+    A single record that is larger than `max_bytes` is sent on its own.
+
+    @param data list of dictionaries
+
+    @return list of lists
+    """
+    batches = []
+    batch = []
+    size = 0
+    for record in data:
+      record_size = len(json.dumps(record))
+      if batch and (len(batch) >= self.batch_size or size + record_size > self.max_bytes):
+        batches.append(batch)
+        batch = []
+        size = 0
+      batch.append(record)
+      size += record_size
+    if batch:
+      batches.append(batch)
+    return batches
+
+  def _send(self, url:str=None, query:str=None, batch:list=[]):
+    """Send
+    Post a single mutation and return the result of the batch. Errors are
+    returned in the result instead of being raised.
+
+    @param url graphql endpoint of the database
+    @param query graphql mutation
+    @param batch list of records
+
+    @return dictionary
+    """
+    result = {'records': len(batch), 'status': None, 'message': None}
+    try:
+      response = self.session.post(
+        url=url,
+        json={'query': query, 'variables': {'records': batch}}
+      )
+      body = response.json()
+    except (requests.exceptions.RequestException, ValueError) as error:
+      result.update({'status': 'FAILED', 'message': str(error)})
+      return result
+
+    if body.get('errors'):
+      result.update({
+        'status': 'FAILED',
+        'message': '\n'.join([err.get('message', '') for err in body['errors']])
+      })
+    else:
+      operation = next(iter(body.get('data', {}).values()), {}) or {}
+      result.update({
+        'status': operation.get('status', 'SUCCESS'),
+        'message': operation.get('message')
+      })
+    return result
+
+  async def _mutate(self, operation:str=None, database:str=None, table:str=None, data:list=[]):
+    """Mutate
+    Run a mutation (insert, update, delete) in concurrent batches
+
+    @param operation name of the graphql operation
+    @param database name of the database
+    @param table name of the table
+    @param data list of one or more dictionaries
+
+    @return list of dictionaries (batch, records, status, message)
+    """
+    url = f"{self.host}/{database}/api/graphql"
+    query = getattr(graphql, operation)(table=table)
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(self.concurrency)
+
+    async def run(index, batch):
+      async with semaphore:
+        result = await loop.run_in_executor(
+          self._executor, partial(self._send, url, query, batch)
+        )
+      return {'batch': index, **result}
+
+    results = await asyncio.gather(*[
+      run(index, batch) for index, batch in enumerate(self._batches(data))
+    ])
+
+    failed = [result for result in results if result['status'] != 'SUCCESS']
+    target = print2.text_value(f"{database}::{table}")
+    if failed:
+      print2.alert_error(
+        f"{operation}: {len(failed)} of {len(results)} batch{'es'[:len(results)^1]} failed for",
+        target
+      )
+    else:
+      print2.alert_success(
+        f"{operation}:", print2.text_value(len(data)),
+        f"record{'s'[:len(data)^1]} in {len(results)} batch{'es'[:len(results)^1]} for",
+        target
+      )
+    return results
+
+  async def add(self, database:str=None, table:str=None, data:list=[]):
+    """Add Data
+    Import one or more records into a table. Row identifiers are required.
+
+    @param database name of the database
+    @param table name of the table to import data into
+    @param data list of one or more dictionaries
+
+    @return list of batch results
+    """
+    return await self._mutate('insert', database, table, data)
+
+  async def update(self, database:str=None, table:str=None, data:list=[]):
+    """Update data
+    Update one or more records from a table. Row identifiers are required
+
+    @param database name of the database
+    @param table name of the table
+    @param data a list of dictionaries containing the row identifiers
+
+    @return list of batch results
+    """
+    return await self._mutate('update', database, table, data)
+
+  async def delete(self, database:str=None, table:str=None, data:list=[]):
+    """Delete data
+    Delete one or more records from a table. Row identifiers are required
+
+    @param database name of the database
+    @param table name of the table to remove records from
+    @param data a list of dictionaries containing the row identifiers
+
+    @return list of batch results
+    """
+    return await self._mutate('delete', database, table, data)
+
+  def close(self):
+    """Close
+    Shut down the thread pool and close the session
+    """
+    self._executor.shutdown(wait=True)
+    self.session.close()
@@ -2,16 +2,17 @@
 # FILE: import.py
 # AUTHOR: David Ruvolo
 # CREATED: 2023-05-10
-# MODIFIED: 2023-05-11
+# MODIFIED: 2026-10-17
 # PURPOSE: import files into emx2 instance
 # STATUS: stable
 # PACKAGES: NA
 # COMMENTS: NA
 #///////////////////////////////////////////////////////////////////////////////
 
-from emx2.api.emx2 import Molgenis as EMX2
+from emx2.api.emx2async import AsyncMolgenis as EMX2
 from os import environ,path, listdir
 from dotenv import load_dotenv
+import asyncio
 load_dotenv()
 
 # connect to database
@@ -25,30 +26,27 @@ emx2.signin(environ['MOLGENIS_EMX2_USR'],environ['MOLGENIS_EMX2_PWD'])
 
 # import ontologies
 ontologies = listdir('emx2/ontologies')
-for file in ontologies:
-  emx2.importCsvFile(
-    database='RD3',
-    table=file.replace('.csv',''),
-    file=f"emx2/ontologies/{file}"
-  )
-
-
-# import RD3 specific ontologies (note order!!)
-for file in ['organisations_2', 'persons', 'datareleases', 'library']:
-  emx2.importCsvFile(
-    database='RD3',
-    table=file.replace('_2', ''),
-    file=f"emx2/data/{file}.csv"
-  )
+emx2.importZip(
+  database='RD3',
+  files={
+    file.replace('.csv',''): f"emx2/ontologies/{file}"
+    for file in ontologies
+  }
+)
 
 
-# import RD3 metadata
-for file in ['subjects','subjectinfo', 'samples', 'labinfo', 'files', 'overview']:
-  emx2.importCsvFile(
-    database='RD3',
-    table=file,
-    file=f"emx2/data/{file}.csv"
-  )
+# import RD3 specific ontologies and metadata
+# (tables are uploaded in dependency order in a single archive)
+emx2.importZip(
+  database='RD3',
+  files={
+    file.replace('_2', ''): f"emx2/data/{file}.csv"
+    for file in [
+      'organisations_2', 'persons', 'datareleases', 'library',
+      'subjects','subjectinfo', 'samples', 'labinfo', 'files', 'overview'
+    ]
+  }
+)
 
 
 #///////////////////////////////////////
@@ -84,11 +82,25 @@ importData = subjectsDT[:, (f.subjectID,f.subjectInformation)] \
 for row in importData:
   row['subjectInformation'] = {'subjectID': row['subjectInformation']}
 
-emx2.update(
-  database='RD3',
-  table='Subjects',
-  data = importData
-)
+try:
+  results = asyncio.run(
+    emx2.update(
+      database='RD3',
+      table='Subjects',
+      data = importData
+    )
+  )
+finally:
+  emx2.close()
+
+failedBatches = [result for result in results if result['status'] != 'SUCCESS']
+if failedBatches:
+  raise SystemExit(
+    'Failed to update subjectInformation references:\n' + '\n'.join([
+      f"  batch {result['batch']} ({result['records']} records): {result['message']}"
+      for result in failedBatches
+    ])
+  )
 
 
 
@@ -10,8 +10,9 @@
 #///////////////////////////////////////////////////////////////////////////////
 
 from emx2.api.emx2 import Molgenis as EMX2
-from emx2.utils import to_csv, recodeCommaStrings
-from rd3.utils.utils import flattenDataset, recodeValue
+from emx2.utils import to_csv
+from rd3.utils.utils import flattenDataset
+from rd3tools.recode import Recoder
 from rd3.api.molgenis2 import Molgenis
 from datatable import dt, f, as_type
 from dotenv import load_dotenv
@@ -103,23 +104,11 @@ ernMappings = {
   'ern_rnd': 'ERN-RND', 
 }
 
-subjectsDT['ERN'] = dt.Frame([
-  recodeValue(mappings=ernMappings, value = value, label='ERN')
-  if value else value
-  for value in subjectsDT['ERN'].to_list()[0]
-])
-
-samplesDT['ERN'] = dt.Frame([
-  recodeValue(mappings=ernMappings, value = value, label='ERN')
-  if value else value
-  for value in samplesDT['ERN'].to_list()[0]
-])
-
-overviewDT['ERN'] = dt.Frame([
-  recodeValue(mappings=ernMappings, value = value, label='ERN')
-  if value else value
-  for value in overviewDT['ERN'].to_list()[0]
-])
+ernRecoder = Recoder(ernMappings, label='ERN')
+subjectsDT['ERN'] = ernRecoder.recode_column(subjectsDT['ERN'])
+samplesDT['ERN'] = ernRecoder.recode_column(samplesDT['ERN'])
+overviewDT['ERN'] = ernRecoder.recode_column(overviewDT['ERN'])
+ernRecoder.report()
 
 
 # ~ 2d ~
@@ -135,37 +124,19 @@ hpo = emx2.query(
   """  
 ).json().get('data',{}).get('Phenotype')
 
-hpoMappings = {}
-for entry in hpo:
-  hpoMappings[entry['code']] = entry['name'] 
-
+# codes are comma separated; each code is recoded
+hpoRecoder = Recoder.from_records(hpo, 'code', 'name', label='HPO', sep=',')
 
-subjectsDT['phenotype'] = dt.Frame([
-  recodeCommaStrings(hpoMappings,value) if value else value
-  for value in subjectsDT['phenotype'].to_list()[0]
-])
 
-subjectsDT['hasNotPhenotype'] = dt.Frame([
-  recodeCommaStrings(hpoMappings,value) if value else value
-  for value in subjectsDT['hasNotPhenotype'].to_list()[0]
-])
+subjectsDT['phenotype'] = hpoRecoder.recode_column(subjectsDT['phenotype'])
+subjectsDT['hasNotPhenotype'] = hpoRecoder.recode_column(subjectsDT['hasNotPhenotype'])
 
 if 'ageOfOnset' in subjectInfoDT.names:
-  subjectInfoDT['ageOfOnset'] = dt.Frame([
-    recodeCommaStrings(hpoMappings,value) if value else value
-    for value in subjectInfoDT['ageOfOnset'].to_list()[0]
-  ])
-  
-  
-overviewDT['phenotype'] = dt.Frame([
-  recodeCommaStrings(hpoMappings,value) if value else value
-  for value in overviewDT['phenotype'].to_list()[0]
-])
+  subjectInfoDT['ageOfOnset'] = hpoRecoder.recode_column(subjectInfoDT['ageOfOnset'])
 
-overviewDT['hasNotPhenotype'] = dt.Frame([
-  recodeCommaStrings(hpoMappings,value) if value else value
-  for value in overviewDT['hasNotPhenotype'].to_list()[0]
-])
+overviewDT['phenotype'] = hpoRecoder.recode_column(overviewDT['phenotype'])
+overviewDT['hasNotPhenotype'] = hpoRecoder.recode_column(overviewDT['hasNotPhenotype'])
+hpoRecoder.report()
 
 # ~ 2e ~
 # Recode Diseases
@@ -180,20 +151,10 @@ disease = emx2.query(
   """
 ).json().get('data', {}).get('Disease')
 
-diseaseMappings={}
-for entry in disease:
-  diseaseMappings[entry['code']] = entry['name']
-  
-
-subjectsDT['disease'] = dt.Frame([
-  recodeCommaStrings(diseaseMappings, value) if value else value
-  for value in subjectsDT['disease'].to_list()[0]
-])
-
-overviewDT['disease'] = dt.Frame([
-  recodeCommaStrings(diseaseMappings, value) if value else value
-  for value in overviewDT['disease'].to_list()[0]
-])
+diseaseRecoder = Recoder.from_records(disease, 'code', 'name', label='Disease', sep=',')
+subjectsDT['disease'] = diseaseRecoder.recode_column(subjectsDT['disease'])
+overviewDT['disease'] = diseaseRecoder.recode_column(overviewDT['disease'])
+diseaseRecoder.report()
 
 #///////////////////////////////////////
 
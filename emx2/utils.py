@@ -2,27 +2,17 @@
 # FILE: utils.py
 # AUTHOR: David Ruvolo
 # CREATED: 2023-05-10
-# MODIFIED: 2023-05-10
+# MODIFIED: 2026-10-17
 # PURPOSE: misc functions
 # STATUS: stable
 # PACKAGES: NA
 # COMMENTS: NA
 #///////////////////////////////////////////////////////////////////////////////
 
-from rd3.utils.utils import recodeValue
-from csv import QUOTE_ALL
+from rd3tools.datatable import dt_to_csv
 
 def to_csv(path,data):
-  return data.to_pandas().to_csv(path,index=False,encoding='UTF-8',quoting=QUOTE_ALL)
+  return dt_to_csv(data,path)
 
 def to_csv_str(data):
-  return data.to_pandas().to_csv(index=False,encoding='UTF-8',quoting=QUOTE_ALL)
-
-
-def recodeCommaStrings(mappings,value):
-  codes = value.split(',')
-  terms = []
-  for code in codes:
-    value = recodeValue(mappings, code,'HPO')
-    terms.append(value)
-  return ','.join(terms)
\ No newline at end of file
+  return dt_to_csv(data)
@@ -11,13 +11,13 @@ https://gatk.broadinstitute.org/hc/en-us/articles/360035531972-PED-Pedigree-form
 """
 
 import ast
-import csv
 import re
 from os import environ
 from datetime import datetime
 from datatable import dt, f, fread, as_type
 from dotenv import load_dotenv
 from molgenis_emx2_pyclient.client import Client
+from rd3tools.datatable import dt_to_csv
 load_dotenv()
 
 
@@ -26,7 +26,7 @@ def to_csv_string(data):
     :param: data datatable object
     :return: text/csv string
     """
-    return data.to_pandas().to_csv(index=False, quoting=csv.QUOTE_ALL, encoding='utf-8')
+    return dt_to_csv(data)
 
 
 # connect to test instance
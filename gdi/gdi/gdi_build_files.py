@@ -2,53 +2,24 @@
 FILE: gdi_build_files.py
 AUTHOR: David Ruvolo
 CREATED: 2023-04-21
-MODIFIED: 2024-02-20
+MODIFIED: 2026-10-17
 PURPOSE: compile file metadata dataset
 STATUS: stable
 PACKAGES: **see below**
-COMMENTS: This script is designed to run on the cluster. Make changes and push to the client
+COMMENTS: This script is designed to run on the cluster. Make changes and push to the client.
+rd3tools (see rd3-py) must be installed on the cluster.
 """
 
-import sys
 import re
+import csv
 import json
-from os import listdir, path, stat
 import pandas as pd
+from rd3tools.scan import iter_files, FILE_INFO_FIELDS
 
 
 ENTRY_DIR = '/groups/umcg-gdi/prm03/rawdata/ngs/EGAD00001008392/EGAD00001008392'
 OUTPUT_DIR = '/home/umcg-druvolo/data/gdi'
 
-sys.setrecursionlimit(100000)
-
-
-def list_files(_dir: str = None):
-    """List files recursively
-    :param _dir: entry point to begin looking for files
-    :param _dir: string
-
-    :returns: all files at a given path
-    :rtype: recordset
-    """
-    dir_files = []
-    dir_contents = listdir(_dir)
-    for item in dir_contents:
-        item_path = _dir + '/' + item
-        if path.isdir(item_path):
-            print('Processing files subdirectory', item_path)
-            subdir_contents = list_files(item_path)
-            dir_files = dir_files + subdir_contents
-        if path.isfile(item_path):
-            file = {
-                'inode': stat(item_path, follow_symlinks=False).st_ino,
-                'name': path.basename(item),
-                'path': item_path,
-                'extension': path.splitext(item)[1],
-                'size': path.getsize(item_path)
-            }
-            dir_files.append(file)
-    return dir_files
-
 
 def read_ped(file: str = None, name: str = None):
     """Read and extract the contents of a PED file
@@ -116,54 +87,47 @@ def read_checksum(file: str = None):
 
 if __name__ == "__main__":
 
+    # Scan the directory tree once. Rows of files of interest are written to
+    # the files dataset as they are found; only checksum, ped, and
+    # phenopacket files are kept in memory for further processing.
     print('Compiling a list of files at entry....')
-    raw_files = list_files(_dir=ENTRY_DIR)
+    checksum_files = []
+    ped = []
+    phenopacket = []
 
-    # ///////////////////////////////////////
+    with open(f"{OUTPUT_DIR}/gdi_files.csv", 'w', encoding='utf-8', newline='') as stream:
+        writer = csv.DictWriter(stream, fieldnames=FILE_INFO_FIELDS)
+        writer.writeheader()
+
+        for row in iter_files(
+            root=ENTRY_DIR,
+            pattern=r'(md5|json|ped|fastq.gz|vcf.gz.cip)$',
+            workers=8
+        ):
+            # For md5 files, read and extract the checksum
+            if re.search(r'(md5)$', row['name']):
+                row['md5'] = read_checksum(file=row['path'])
+                checksum_files.append(row)
+                continue
 
-    # process checksum files
-    print('Processing checksum files.....')
+            writer.writerow(row)
 
-    checksum_files = [
-        file for file in raw_files if re.search(r'(md5)$', file['name'])
-    ]
+            if row['extension'] == '.ped':
+                ped.append(read_ped(file=row['path'], name=row['name']))
 
-    # For md5 files, read and extract the checksum
-    for row in checksum_files:
-        row['md5'] = read_checksum(file=row['path'])
+            if row['extension'] == '.json':
+                phenopacket.append(
+                    read_phenopacket(file=row['path'], name=row['name']))
 
     checksumDF = pd.DataFrame(checksum_files)
     checksumDF.to_csv(f'{OUTPUT_DIR}/gdi_checksums.csv', index=False)
 
     # ///////////////////////////////////////
 
-    # subset to files of interest and extract relevant metadata
-    print('Processing files of interest....')
-    files = [
-        file for file in raw_files
-        if re.search(r'(json|ped|fastq.gz|vcf.gz.cip)$', file['name'])
-    ]
-
-    ped = []
-    phenopacket = []
-
-    print('Extracting contents from ped and phenopacket files....')
-    for row in files:
-        if row['extension'] == '.ped':
-            ped_data = read_ped(file=row['path'], name=row['name'])
-            ped.append(ped_data)
-
-        if row['extension'] == '.json':
-            json_data = read_phenopacket(file=row['path'], name=row['name'])
-            phenopacket.append(json_data)
-
-    # ///////////////////////////////////////
-
     # save datasets
     print('Saving datasets....')
     ped_df = pd.DataFrame(ped)
     phenopacket_df = pd.DataFrame(phenopacket)
-    files_dt = pd.DataFrame(files)
 
     ped_df.to_csv(
         f"{OUTPUT_DIR}/gdi_ped.csv",
@@ -174,5 +138,3 @@ if __name__ == "__main__":
         f"{OUTPUT_DIR}/gdi_phenopacket.csv",
         index=False
     )
-
-    files_dt.to_csv(f"{OUTPUT_DIR}/gdi_files.csv", index=False)
@@ -0,0 +1,249 @@
+"""Concurrent batched writes to the REST API"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+import json
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+from .utils import print2
+
+# status codes that are worth retrying (rate limiting and server errors)
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class BatchResult:
+    """Outcome of a single batch
+
+    :param batch: index of the batch
+    :type batch: int
+
+    :param start: position of the first record of the batch in the dataset
+    :type start: int
+
+    :param size: number of records in the batch
+    :type size: int
+    """
+
+    def __init__(self, batch: int, start: int, size: int):
+        self.batch = batch
+        self.start = start
+        self.size = size
+        self.status_code = None
+        self.error = None
+        self.attempts = 0
+
+    @property
+    def ok(self):
+        """True if the batch was written"""
+        return self.error is None
+
+    def __repr__(self):
+        status = 'ok' if self.ok else f'failed: {self.error}'
+        return f'<BatchResult {self.batch} ({self.size} records) {status}>'
+
+
+class BatchSummary:
+    """Results of all batches sent to a table
+
+    :param label: a description of the request (e.g., table name)
+    :type label: str
+
+    :param results: the result of each batch
+    :type results: list
+    """
+
+    def __init__(self, label: str = None, results: list = None):
+        self.label = label
+        self.results = results or []
+
+    @property
+    def failed(self):
+        """Batches that could not be written"""
+        return [result for result in self.results if not result.ok]
+
+    @property
+    def ok(self):
+        """True if all batches were written"""
+        return not self.failed
+
+    @property
+    def records_written(self):
+        """Number of records in successful batches"""
+        return sum(result.size for result in self.results if result.ok)
+
+    @property
+    def records_failed(self):
+        """Number of records in failed batches"""
+        return sum(result.size for result in self.failed)
+
+    def __repr__(self):
+        return (
+            f'<BatchSummary {self.label}: {self.records_written} written, '
+            f'{self.records_failed} failed in {len(self.failed)} of '
+            f'{len(self.results)} batches>'
+        )
+
+
+class BatchWriter:
+    """Send records to the REST API in concurrent batches
+
+    Requests that fail because of rate limiting or server errors are retried
+    with an exponential backoff. Other errors are recorded for the batch and
+    do not stop the remaining batches.
+
+    :param session: the session of an authenticated client (client._session)
+    :type session: requests.Session
+
+    :param headers: request headers including the token and content type
+    :type headers: dict
+
+    :param batch_size: number of records per request (max 1000)
+    :type batch_size: int
+
+    :param workers: maximum number of concurrent requests
+    :type workers: int
+
+    :param retries: number of times a failed batch is retried
+    :type retries: int
+
+    :param backoff: delay in seconds before the first retry; doubled after
+      each attempt
+    :type backoff: float
+    """
+
+    def __init__(
+        self,
+        session,
+        headers: dict,
+        batch_size: int = 1000,
+        workers: int = 4,
+        retries: int = 3,
+        backoff: float = 1.0
+    ):
+        if batch_size > 1000:
+            raise ValueError('batch_size must be 1000 or less')
+        self.session = session
+        self.headers = headers
+        self.batch_size = batch_size
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+
+    def _error_message(self, response):
+        """Extract the error message from a failed response"""
+        try:
+            return response.json()['errors'][0]['message']
+        except (ValueError, KeyError, IndexError, TypeError):
+            return f'{response.status_code} {response.reason}'
+
+    def _send(self, method: str, url: str, body: str, result: BatchResult):
+        """Send a single batch and retry when possible"""
+        for attempt in range(self.retries + 1):
+            result.attempts = attempt + 1
+            retry_after = None
+            try:
+                response = self.session.request(
+                    method, url, headers=self.headers, data=body)
+            except requests.exceptions.RequestException as error:
+                result.status_code = None
+                result.error = str(error)
+            else:
+                result.status_code = response.status_code
+                if (response.status_code // 100) == 2:
+                    result.error = None
+                    return result
+                result.error = self._error_message(response)
+                if response.status_code not in RETRY_STATUS_CODES:
+                    return result
+                retry_after = response.headers.get('Retry-After')
+
+            if attempt < self.retries:
+                if retry_after and retry_after.isdigit():
+                    time.sleep(float(retry_after))
+                else:
+                    time.sleep(self.backoff * 2 ** attempt)
+        return result
+
+    def write(
+        self,
+        method: str,
+        url: str,
+        data: list,
+        label: str = None,
+        key: str = 'entities',
+        on_result=None
+    ):
+        """Write records in batches
+
+        :param method: http method (POST, PUT, DELETE)
+        :type method: str
+
+        :param url: endpoint to send the records to
+        :type url: str
+
+        :param data: records to send
+        :type data: list
+
+        :param label: a description to print (e.g., table name)
+        :type label: str
+
+        :param key: name of the property in the request body that contains
+          the records
+        :type key: str
+
+        :param on_result: function called with the BatchResult of each batch
+          as soon as it has finished (e.g., to record progress). Calls are
+          made from the thread that called `write`.
+        :type on_result: callable
+
+        :returns: summary of all batches
+        :rtype: BatchSummary
+        """
+        parsed = urlparse(url)
+        self.session.mount(
+            f'{parsed.scheme}://{parsed.netloc}',
+            HTTPAdapter(pool_connections=self.workers, pool_maxsize=self.workers)
+        )
+
+        starts = range(0, len(data), self.batch_size)
+        results = [
+            BatchResult(batch=index, start=start,
+                        size=len(data[start:start + self.batch_size]))
+            for index, start in enumerate(starts)
+        ]
+
+        futures = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for result in results:
+                try:
+                    body = json.dumps(
+                        {key: data[result.start:result.start + self.batch_size]})
+                except (TypeError, ValueError) as error:
+                    result.error = str(error)
+                    if on_result:
+                        on_result(result)
+                    continue
+                futures[executor.submit(self._send, method, url, body, result)] = result
+
+            # errors that are not handled in `_send` are recorded for the batch
+            for future in as_completed(futures):
+                result = futures[future]
+                try:
+                    future.result()
+                except Exception as error:
+                    result.error = f'{type(error).__name__}: {error}'
+                if on_result:
+                    on_result(result)
+
+        summary = BatchSummary(label=label, results=results)
+        if summary.ok:
+            print2('Wrote', summary.records_written, 'records to', label,
+                   f"({len(results)} batch{'es'[:len(results) ^ 1]})")
+        else:
+            print2('Failed to write', summary.records_failed, 'records to',
+                   label, f'({len(summary.failed)} of {len(results)} batches)')
+            for result in summary.failed:
+                print2(f'  Batch {result.batch}: {result.error}')
+        return summary
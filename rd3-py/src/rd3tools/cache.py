@@ -0,0 +1,194 @@
+"""Local snapshots of RD3 tables"""
+
+from os import makedirs, path, remove, replace
+from urllib.parse import urlparse
+import json
+import shutil
+from datatable import dt
+
+from .datatable import dt_from_records
+from .utils import iter_flatten_data, print2, timestamp
+
+
+class SnapshotCache:
+    """On-disk cache of RD3 tables
+
+    Each table is stored as a Jay file keyed by host and entity. When a table
+    is requested again, only the rows that were created or updated since the
+    last snapshot are retrieved and merged into the stored copy.
+
+    :param client: an authenticated rd3tools Molgenis client
+    :type client: Molgenis
+
+    :param cache_dir: location to store snapshots (default: ~/.cache/rd3tools)
+    :type cache_dir: str
+
+    :param date_attrs: attributes that record when a row was created or
+      updated. These are used to build the filter for incremental refreshes.
+    :type date_attrs: tuple
+    """
+
+    def __init__(
+        self,
+        client,
+        cache_dir: str = None,
+        date_attrs: tuple = ('dateRecordCreated', 'dateRecordUpdated')
+    ):
+        self.client = client
+        self.date_attrs = date_attrs
+        self.cache_dir = cache_dir or path.join(
+            path.expanduser('~'), '.cache', 'rd3tools')
+        self.host_dir = path.join(
+            self.cache_dir, urlparse(client._root_url).netloc)
+
+    def _paths(self, entity: str):
+        """Location of the snapshot and manifest of a table"""
+        base = path.join(self.host_dir, entity)
+        return f"{base}.jay", f"{base}.json"
+
+    def _read_manifest(self, entity: str):
+        """Read the manifest of a table or None if there is no snapshot"""
+        jay_path, manifest_path = self._paths(entity)
+        if not (path.exists(jay_path) and path.exists(manifest_path)):
+            return None
+        with open(manifest_path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+
+    def _write(self, entity: str, data, manifest: dict):
+        """Save a snapshot and its manifest"""
+        makedirs(self.host_dir, exist_ok=True)
+        jay_path, manifest_path = self._paths(entity)
+
+        # the stored frame may be memory mapped; write a new file and swap it
+        data.materialize(to_memory=True)
+        data.to_jay(f"{jay_path}.tmp")
+        replace(f"{jay_path}.tmp", jay_path)
+
+        with open(manifest_path, 'w', encoding='utf-8') as file:
+            json.dump(manifest, file, indent=2)
+
+    def _empty(self, attributes: str, id_attr: str):
+        """An empty frame with the requested columns (at least the id)"""
+        names = attributes.split(',') if attributes else [id_attr]
+        return dt.Frame([[] for _ in names], names=names)
+
+    def _fetch(self, entity: str, attributes: str, q: str, col_patterns: str, id_attr: str):
+        """Retrieve rows from the API as a flattened frame. If there are no
+        rows, an empty frame with the requested columns is returned."""
+        rows = self.client.iter_rows(entity, attributes=attributes, q=q)
+        data = dt_from_records(iter_flatten_data(rows, col_patterns))
+        if id_attr not in data.names:
+            return self._empty(attributes, id_attr)
+        return data
+
+    def _combine_filters(self, *filters):
+        """Join one or more RSQL filters with AND"""
+        return ';'.join(f"({value})" for value in filters if value)
+
+    def get(
+        self,
+        entity: str,
+        attributes: str = None,
+        q: str = None,
+        col_patterns: str = 'id|value',
+        refresh: bool = True,
+        prune: bool = True
+    ):
+        """Retrieve a table from the cache and refresh it if needed
+
+        :param entity: the identifier of a table in EMX format (package_entity)
+        :type entity: str
+
+        :param attributes: comma separated string of attributes to return. The
+          id attribute of the table is always included.
+        :type attributes: str
+
+        :param q: RSQL query used to filter the results
+        :type q: str
+
+        :param col_patterns: names of the nested keys to extract when the data
+          is flattened (see `flatten_data`)
+        :type col_patterns: str
+
+        :param refresh: if False, the stored snapshot is returned as is
+        :type refresh: bool
+
+        :param prune: if True, rows that no longer exist in the table are
+          removed from the snapshot. This requires retrieving the id column.
+        :type prune: bool
+
+        :returns: dataset
+        :rtype: datatable frame
+        """
+        jay_path = self._paths(entity)[0]
+        manifest = self._read_manifest(entity)
+        table_meta = self.client._get_table_meta(entity)
+        id_attr = table_meta['meta']['idAttribute']
+
+        # rows are merged and pruned by id, so the id must always be retrieved
+        if attributes and id_attr not in attributes.split(','):
+            attributes = f"{attributes},{id_attr}"
+        options = {'attributes': attributes, 'q': q, 'col_patterns': col_patterns}
+
+        # the date is recorded before fetching so changes made in the
+        # meantime are picked up during the next refresh
+        snapshot_date = timestamp(tz='UTC')
+
+        if (manifest is None) or (manifest['options'] != options):
+            print2('Creating snapshot of', entity)
+            data = self._fetch(entity, attributes, q, col_patterns, id_attr)
+            self._write(entity, data, {
+                'entity': entity,
+                'idAttribute': id_attr,
+                'snapshotDate': snapshot_date,
+                'options': options
+            })
+            return data
+
+        data = dt.fread(jay_path)
+        if id_attr not in data.names:
+            data = self._empty(attributes, id_attr)
+        if not refresh:
+            return data
+
+        since = manifest['snapshotDate']
+        modified = ','.join(f"{attr}=ge={since}" for attr in self.date_attrs)
+        delta = self._fetch(
+            entity, attributes, self._combine_filters(q, modified), col_patterns, id_attr)
+
+        # rows are only filtered if there are any (an empty list is not a
+        # valid row selector)
+        if delta.nrows:
+            if data.nrows:
+                changed_ids = set(delta[id_attr].to_list()[0])
+                unchanged = [value not in changed_ids
+                             for value in data[id_attr].to_list()[0]]
+                data = data[dt.Frame(unchanged), :]
+            data = dt.rbind(data, delta, force=True)
+
+        if prune and data.nrows:
+            current_ids = {
+                row[id_attr]
+                for row in self.client.iter_rows(entity, attributes=id_attr, q=q)
+            }
+            exists = [value in current_ids for value in data[id_attr].to_list()[0]]
+            data = data[dt.Frame(exists), :]
+
+        data = data[:, :, dt.sort(id_attr)]
+        self._write(entity, data, {**manifest, 'snapshotDate': snapshot_date})
+        print2('Refreshed snapshot of', entity, f'({delta.nrows} changed rows)')
+        return data
+
+    def clear(self, entity: str = None):
+        """Remove one or all snapshots of the current host
+
+        :param entity: the identifier of a table; if None, all snapshots of
+          the host are removed
+        :type entity: str
+        """
+        if entity is None:
+            shutil.rmtree(self.host_dir, ignore_errors=True)
+            return
+        for file in self._paths(entity):
+            if path.exists(file):
+                remove(file)
@@ -1,5 +1,7 @@
 """Datatable utils"""
 
+import csv
+import io
 import pandas as pd
 import numpy as np
 from datatable import dt
@@ -12,6 +14,97 @@ def dt_as_recordset(data: None):
     return data.to_pandas().replace({np.nan: None}).to_dict('records')
 
 
+def dt_to_csv(data, file=None, chunk_size: int = 10000):
+    """Write a datatable frame as CSV without converting it to pandas
+
+    All values are quoted (csv.QUOTE_ALL) and missing values are written as
+    empty strings. Rows are converted in chunks so that only a slice of the
+    frame is held as python objects at a time.
+
+    :param data: the dataset to write
+    :type data: datatable
+
+    :param file: a path or a writable text stream; if None, the csv is
+      returned as a string
+    :type file: str or stream
+
+    :param chunk_size: number of rows to convert at a time
+    :type chunk_size: int
+
+    :returns: csv string if no file was given
+    :rtype: str or NoneType
+    """
+    if file is None:
+        stream = io.StringIO()
+        dt_to_csv(data, stream, chunk_size)
+        return stream.getvalue()
+
+    if isinstance(file, str):
+        with open(file, 'w', encoding='utf-8', newline='') as stream:
+            dt_to_csv(data, stream, chunk_size)
+        return None
+
+    writer = csv.writer(file, quoting=csv.QUOTE_ALL, lineterminator='\n')
+    writer.writerow(data.names)
+    for start in range(0, data.nrows, chunk_size):
+        columns = data[start:start + chunk_size, :].to_list()
+        writer.writerows(zip(*columns))
+    return None
+
+
+def dt_to_csv_buffer(data, chunk_size: int = 10000):
+    """Write a datatable frame as CSV into an in-memory binary buffer
+
+    The buffer can be passed directly to an upload request (e.g., the
+    `files` argument of requests.post), so no temporary file is needed.
+
+    :param data: the dataset to write
+    :type data: datatable
+
+    :param chunk_size: number of rows to convert at a time
+    :type chunk_size: int
+
+    :returns: utf-8 encoded csv positioned at the start
+    :rtype: io.BytesIO
+    """
+    buffer = io.BytesIO()
+    stream = io.TextIOWrapper(
+        buffer, encoding='utf-8', newline='', write_through=True)
+    dt_to_csv(data, stream, chunk_size)
+    stream.detach()
+    buffer.seek(0)
+    return buffer
+
+
+def dt_from_records(data=None, chunk_size: int = 10000):
+    """Build a datatable frame from a stream of records
+
+    Records are consumed in chunks and each chunk is converted into a frame,
+    so only one chunk of dictionaries is held in memory at a time.
+
+    :param data: an iterable of records (e.g., the output of `iter_flatten_data`)
+    :type data: iterable
+
+    :param chunk_size: number of records to convert at a time
+    :type chunk_size: int
+
+    :returns: a single frame containing all records
+    :rtype: datatable
+    """
+    frames = []
+    chunk = []
+    for row in data:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            frames.append(dt.Frame(chunk))
+            chunk = []
+    if chunk:
+        frames.append(dt.Frame(chunk))
+    if not frames:
+        return dt.Frame()
+    return dt.rbind(*frames, force=True)
+
+
 def unique_values_by_id(
     data: None,
     group_by: str = None,
@@ -54,3 +147,257 @@ def unique_values_by_id(
         output.key = group_by
 
     return output
+
+
+def _column_map(columns, names: list):
+    """Normalise a list or dict of columns to a dict of target: source"""
+    if columns is None:
+        return {name: name for name in names}
+    if isinstance(columns, dict):
+        return dict(columns)
+    return {name: name for name in columns}
+
+
+def dt_collapse(
+    data,
+    group_by: str = None,
+    column: str = None,
+    sep: str = ',',
+    unique: bool = True,
+    sort: bool = False,
+    key: bool = True
+):
+    """Collapse the values of a column into one string per group
+
+    All rows are read once. Missing values and groups are skipped, so groups
+    without values are not included in the output.
+
+    :param data: dataset containing the data to collapse
+    :type data: datatable
+
+    :param group_by: name of the column that contains the groups
+    :type group_by: str
+
+    :param column: name of the column that contains the values to collapse
+    :type column: str
+
+    :param sep: string used to join the values
+    :type sep: str
+
+    :param unique: if True, duplicate values are removed (first occurrence)
+    :type unique: bool
+
+    :param sort: if True, values are sorted within each group
+    :type sort: bool
+
+    :param key: if True, the output is keyed by `group_by` so it can be used
+      in `dt.join`
+    :type key: bool
+
+    :returns: dataset with one row per group
+    :rtype: datatable
+    """
+    groups = {}
+    for group, value in zip(*data[:, [group_by, column]].to_list()):
+        if group is None or value is None:
+            continue
+        groups.setdefault(group, []).append(str(value))
+
+    values = []
+    for group_values in groups.values():
+        if unique:
+            group_values = list(dict.fromkeys(group_values))
+        if sort:
+            group_values = sorted(group_values)
+        values.append(sep.join(group_values))
+
+    output = dt.Frame(
+        [list(groups), values],
+        names=[group_by, column],
+        types=[data[group_by].type, dt.Type.str32]
+    )
+    if key:
+        output.key = group_by
+    return output
+
+
+def dt_left_join(data, lookup, on: str = None, lookup_on: str = None, columns=None):
+    """Add columns of a lookup table to a dataset by key
+
+    The lookup table is keyed and joined in a single operation (`dt.join`),
+    so each row is matched by key instead of filtering the lookup table. Rows
+    without a match get missing values. The values of the key must be unique
+    in the lookup table (see `dt_collapse`) and of the same type in both
+    datasets.
+
+    :param data: the dataset to add columns to
+    :type data: datatable
+
+    :param lookup: dataset containing the values to add
+    :type lookup: datatable
+
+    :param on: name of the key column in `data`
+    :type on: str
+
+    :param lookup_on: name of the key column in `lookup` (default: `on`)
+    :type lookup_on: str
+
+    :param columns: columns of `lookup` to add (default: all). Use a dict to
+      rename columns, e.g., {'newName': 'lookupName'}
+    :type columns: list or dict
+
+    :returns: a new dataset with the same rows as `data`
+    :rtype: datatable
+    """
+    lookup_on = lookup_on or on
+    columns = {
+        target: source
+        for target, source in _column_map(columns, lookup.names).items()
+        if source != lookup_on
+    }
+    keyed = lookup[~dt.isna(dt.f[lookup_on]), [lookup_on] + list(columns.values())]
+    keyed.names = [on] + list(columns)
+    keyed.key = on
+    return data[:, :, dt.join(keyed)]
+
+
+def dt_update_from(
+    data,
+    source,
+    on: str = None,
+    source_on: str = None,
+    columns=None,
+    flag: str = None,
+    overwrite: bool = True
+):
+    """Update columns of a dataset with the values of another dataset by key
+
+    Values are matched with a keyed join and assigned in one operation per
+    column. Rows without a match are not changed. Columns that do not exist
+    in `data` are created. The dataset is modified in place.
+
+    :param data: the dataset to update
+    :type data: datatable
+
+    :param source: dataset containing the new values. The values of the key
+      must be unique (see `dt_collapse`).
+    :type source: datatable
+
+    :param on: name of the key column in `data`
+    :type on: str
+
+    :param source_on: name of the key column in `source` (default: `on`)
+    :type source_on: str
+
+    :param columns: columns to update (default: all columns of source). Use
+      a dict if the names are different, e.g., {'familyID': 'fid'}
+    :type columns: list or dict
+
+    :param flag: name of a boolean column that is set to True for all rows
+      that were matched (e.g., 'shouldImport')
+    :type flag: str
+
+    :param overwrite: if False, only missing values are updated
+    :type overwrite: bool
+
+    :returns: number of rows that were matched
+    :rtype: int
+    """
+    source_on = source_on or on
+    columns = {
+        target: source_column
+        for target, source_column in _column_map(columns, source.names).items()
+        if source_column != source_on
+    }
+    marker = '__matched__'
+    lookup = source[:, list(columns.values()) + [source_on]]
+    lookup.names = [f'{marker}{target}' for target in columns] + [source_on]
+    lookup[marker] = True
+
+    joined = dt_left_join(data[:, on], lookup, on=on, lookup_on=source_on)
+    matched = joined[:, ~dt.isna(dt.f[marker])]
+
+    for target in columns:
+        values = joined[f'{marker}{target}']
+        if target not in data.names:
+            data[target] = dt.Frame([None] * data.nrows, types=[values.type])
+        rows = matched
+        if not overwrite:
+            missing = data[:, dt.isna(dt.f[target])]
+            rows = dt.cbind(matched, missing)[:, dt.f[0] & dt.f[1]]
+        data[rows, target] = values[rows, :]
+
+    if flag is not None:
+        if flag not in data.names:
+            data[flag] = False
+        data[matched, flag] = True
+    return matched[:, dt.sum(dt.f[0])][0, 0]
+
+
+def _as_set(reference):
+    """Convert a list, set, or single column frame into a set"""
+    if isinstance(reference, (set, frozenset, dict)):
+        return reference
+    if hasattr(reference, 'to_list'):
+        return set(reference.to_list()[0])
+    return set(reference)
+
+
+def is_in(column, reference, negate: bool = False):
+    """Check if the values of a column exist in a reference
+
+    The reference is converted into a set once, so each value is checked in
+    constant time instead of scanning a list of identifiers.
+
+    :param column: values to check
+    :type column: datatable (single column) or list
+
+    :param reference: identifiers to check against
+    :type reference: datatable (single column), list, or set
+
+    :param negate: if True, values that do not exist are flagged
+    :type negate: bool
+
+    :returns: a boolean column with one row per value
+    :rtype: datatable
+    """
+    values = column.to_list()[0] if hasattr(column, 'to_list') else column
+    reference = _as_set(reference)
+    return dt.Frame(
+        [(value in reference) != negate for value in values],
+        type=dt.Type.bool8
+    )
+
+
+def flag_membership(
+    frame,
+    column: str = None,
+    reference_frame=None,
+    ref_column: str = None,
+    negate: bool = False
+):
+    """Flag rows of a dataset whose identifier exists in another dataset
+
+    :param frame: dataset containing the identifiers to check
+    :type frame: datatable
+
+    :param column: name of the column in `frame` that contains the identifiers
+    :type column: str
+
+    :param reference_frame: dataset containing the known identifiers
+    :type reference_frame: datatable
+
+    :param ref_column: name of the column in `reference_frame` (default: `column`)
+    :type ref_column: str
+
+    :param negate: if True, rows that do not exist in the reference are flagged
+    :type negate: bool
+
+    :returns: a boolean column with one row per row in `frame`
+    :rtype: datatable
+    """
+    return is_in(
+        frame[column],
+        reference_frame[ref_column or column],
+        negate=negate
+    )
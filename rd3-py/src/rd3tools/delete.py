@@ -0,0 +1,337 @@
+"""Bulk removal of records across RD3 tables"""
+
+from concurrent.futures import ThreadPoolExecutor
+from os import path, replace
+import hashlib
+import json
+import threading
+
+from .batch import BatchWriter
+from .utils import flatten_data, print2
+
+
+class DeleteTarget:
+    """A table that contains records to remove
+
+    :param entity: the identifier of a table in EMX format (package_entity)
+    :type entity: str
+
+    :param id_attr: attribute that contains the row identifiers to delete
+    :type id_attr: str
+
+    :param match_attr: attribute compared with the reference identifiers. If
+      None, the row identifiers are compared.
+    :type match_attr: str
+
+    :param match_on: entity whose resolved identifiers are used for matching.
+      If None, the subject identifiers of the planner are used.
+    :type match_on: str
+
+    :param references: entities that this table references. Records in this
+      table are deleted before the records in the referenced tables.
+    :type references: list
+
+    :param col_patterns: names of the nested keys to extract when the data
+      is flattened (see `flatten_data`)
+    :type col_patterns: str
+
+    :param transform: function applied to each match value before comparing
+      (e.g., to extract an ID from a file name). Tables with a transform are
+      scanned in full instead of filtered on the server.
+    :type transform: callable
+    """
+
+    def __init__(
+        self,
+        entity: str,
+        id_attr: str,
+        match_attr: str = None,
+        match_on: str = None,
+        references: list = None,
+        col_patterns: str = 'id|value',
+        transform=None
+    ):
+        self.entity = entity
+        self.id_attr = id_attr
+        self.match_attr = match_attr or id_attr
+        self.match_on = match_on
+        self.references = references or []
+        self.col_patterns = col_patterns
+        self.transform = transform
+
+
+class DeletePlanner:
+    """Resolve, order, and delete records linked to a set of subjects
+
+    Rows to delete are resolved for all tables concurrently, deletes are
+    ordered so that referencing tables are cleared before the tables they
+    reference, and each table is deleted in concurrent batches. Progress is
+    written to a checkpoint file after every batch so an interrupted run
+    resumes where it stopped. When a run is resumed, rows that no longer
+    exist (e.g., deleted before the run stopped) are not sent again.
+
+    :param client: an authenticated rd3tools Molgenis client
+    :type client: Molgenis
+
+    :param subject_ids: identifiers of the subjects to remove
+    :type subject_ids: list
+
+    :param checkpoint: location of the checkpoint file (json)
+    :type checkpoint: str
+
+    :param workers: maximum number of concurrent tables or requests
+    :type workers: int
+
+    :param query_size: number of identifiers per server-side filter
+    :type query_size: int
+    """
+
+    def __init__(
+        self,
+        client,
+        subject_ids: list,
+        checkpoint: str = 'delete_checkpoint.json',
+        workers: int = 4,
+        query_size: int = 100
+    ):
+        self.client = client
+        self.subject_ids = sorted(set(map(str, subject_ids)))
+        self.checkpoint = checkpoint
+        self.workers = workers
+        self.query_size = query_size
+        self.targets = {}
+        self._lock = threading.RLock()
+        self.state = self._load_checkpoint()
+
+    def _load_checkpoint(self):
+        """Read the checkpoint if it belongs to the same set of subjects"""
+        ids_hash = hashlib.sha1(
+            ','.join(self.subject_ids).encode('utf-8')).hexdigest()
+        if path.exists(self.checkpoint):
+            with open(self.checkpoint, 'r', encoding='utf-8') as file:
+                state = json.load(file)
+            if state.get('subjects') == ids_hash:
+                print2('Resuming from checkpoint', self.checkpoint)
+                return state
+        return {'subjects': ids_hash, 'tables': {}}
+
+    def _save_checkpoint(self):
+        """Write the current state to the checkpoint file"""
+        with self._lock:
+            with open(f"{self.checkpoint}.tmp", 'w', encoding='utf-8') as file:
+                json.dump(self.state, file, indent=2)
+            replace(f"{self.checkpoint}.tmp", self.checkpoint)
+
+    def add(self, entity: str, id_attr: str, **kwargs):
+        """Add a table to the plan (see `DeleteTarget` for all arguments)
+
+        :returns: the planner so calls can be chained
+        :rtype: DeletePlanner
+        """
+        self.targets[entity] = DeleteTarget(entity, id_attr, **kwargs)
+        return self
+
+    def _reference_ids(self, target: DeleteTarget):
+        """Identifiers that the target is matched against"""
+        if target.match_on is None:
+            return self.subject_ids
+        return self.state['tables'][target.match_on]['ids']
+
+    def _resolve(self, target: DeleteTarget):
+        """Find the identifiers of the rows to delete in a table"""
+        reference = self._reference_ids(target)
+        attributes = ','.join(dict.fromkeys([target.id_attr, target.match_attr]))
+
+        if target.transform is None:
+            rows = []
+            for start in range(0, len(reference), self.query_size):
+                values = ','.join(
+                    f'"{value}"' for value in reference[start:start + self.query_size])
+                rows.extend(self.client.iter_rows(
+                    target.entity,
+                    attributes=attributes,
+                    q=f"{target.match_attr}=in=({values})"
+                ))
+        else:
+            rows = self.client.get_parallel(
+                target.entity, attributes=attributes, workers=self.workers)
+
+        reference = set(reference)
+        ids = []
+        for row in flatten_data(rows, target.col_patterns):
+            value = row.get(target.match_attr)
+            if value is None:
+                continue
+            if target.transform:
+                value = target.transform(value)
+            if any(code in reference for code in str(value).split(',')):
+                ids.append(str(row[target.id_attr]))
+        return sorted(set(ids))
+
+    def _resolve_order(self):
+        """Group tables into waves that can be resolved concurrently"""
+        waves = []
+        resolved = set(self.state['tables'])
+        pending = [name for name in self.targets if name not in resolved]
+        while pending:
+            wave = [
+                name for name in pending
+                if self.targets[name].match_on is None
+                or self.targets[name].match_on in resolved
+            ]
+            if not wave:
+                raise ValueError(f'Unable to resolve match_on for {pending}')
+            waves.append(wave)
+            resolved.update(wave)
+            pending = [name for name in pending if name not in wave]
+        return waves
+
+    def _delete_order(self):
+        """Group tables into waves so referencing tables are deleted first"""
+        referenced_by = {name: set() for name in self.targets}
+        for name, target in self.targets.items():
+            for ref in target.references:
+                if ref in referenced_by:
+                    referenced_by[ref].add(name)
+
+        waves = []
+        done = set()
+        pending = list(self.targets)
+        while pending:
+            wave = [name for name in pending if referenced_by[name] <= done]
+            if not wave:
+                raise ValueError(f'Circular references between {pending}')
+            waves.append(wave)
+            done.update(wave)
+            pending = [name for name in pending if name not in wave]
+        return waves
+
+    def resolve(self):
+        """Find the rows to delete in all tables
+
+        :returns: number of rows to delete per table
+        :rtype: dict
+        """
+        for wave in self._resolve_order():
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                results = executor.map(
+                    lambda name: (name, self._resolve(self.targets[name])),
+                    wave
+                )
+                for name, ids in results:
+                    self.state['tables'][name] = {
+                        'ids': ids, 'remaining': ids, 'deleted': False}
+                    print2('Found', len(ids), 'rows to delete in', name)
+            self._save_checkpoint()
+        return {
+            name: len(table['remaining'])
+            for name, table in self.state['tables'].items()
+        }
+
+    def _existing(self, target: DeleteTarget, ids: list):
+        """Identifiers that still exist in a table"""
+        existing = set()
+        for start in range(0, len(ids), self.query_size):
+            values = ','.join(
+                f'"{value}"' for value in ids[start:start + self.query_size])
+            existing.update(
+                str(row[target.id_attr])
+                for row in self.client.iter_rows(
+                    target.entity,
+                    attributes=target.id_attr,
+                    q=f"{target.id_attr}=in=({values})"
+                )
+            )
+        return [value for value in ids if value in existing]
+
+    def _delete(self, target: DeleteTarget):
+        """Delete the remaining rows of a table"""
+        table = self.state['tables'][target.entity]
+
+        # rows of an earlier attempt may have been deleted before it stopped
+        if table.get('attempted') and table['remaining']:
+            existing = self._existing(target, table['remaining'])
+            with self._lock:
+                table['remaining'] = existing
+                self._save_checkpoint()
+
+        if not table['remaining']:
+            with self._lock:
+                table['deleted'] = True
+            return None
+
+        pending = table['remaining']
+        deleted = set()
+        with self._lock:
+            table['attempted'] = True
+
+        def record(result):
+            if not result.ok:
+                return
+            with self._lock:
+                deleted.update(pending[result.start:result.start + result.size])
+                table['remaining'] = [value for value in pending if value not in deleted]
+                self._save_checkpoint()
+
+        writer = BatchWriter(
+            session=self.client._session,
+            headers=self.client._headers.ct_token_header,
+            workers=self.workers
+        )
+        summary = writer.write(
+            method='DELETE',
+            url=f"{self.client._root_url}api/v2/{target.entity}",
+            data=pending,
+            label=target.entity,
+            key='entityIds',
+            on_result=record
+        )
+
+        with self._lock:
+            table['remaining'] = [value for value in pending if value not in deleted]
+            table['deleted'] = not table['remaining']
+            table['errors'] = [
+                f'Batch {result.batch}: {result.error}' for result in summary.failed
+            ]
+        return summary
+
+    def run(self):
+        """Resolve and delete all rows in dependency order
+
+        Tables that were completed in a previous run are skipped. Tables that
+        reference a table with failed deletes are still processed, but the
+        referenced table is not marked as deleted until all rows are removed.
+        The errors of the last attempt are kept in the checkpoint.
+
+        :returns: summary of each table that was processed in this run
+        :rtype: dict
+        """
+        self.resolve()
+        summaries = {}
+        for wave in self._delete_order():
+            names = [
+                name for name in wave
+                if not self.state['tables'][name]['deleted']
+            ]
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                results = executor.map(
+                    lambda name: (name, self._delete(self.targets[name])),
+                    names
+                )
+                for name, summary in results:
+                    summaries[name] = summary
+            self._save_checkpoint()
+
+        failed = [
+            name for name, table in self.state['tables'].items()
+            if not table['deleted']
+        ]
+        if failed:
+            print2('Unable to delete all rows in', ', '.join(failed),
+                   '; run again to retry')
+            for name in failed:
+                for error in self.state['tables'][name].get('errors', []):
+                    print2(f'  {name}: {error}')
+        else:
+            print2('Deleted all rows linked to', len(self.subject_ids), 'subjects')
+        return summaries
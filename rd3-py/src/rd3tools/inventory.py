@@ -0,0 +1,149 @@
+"""Incremental inventory of files in a directory tree"""
+
+from os import path, replace, sep
+import csv
+
+from .scan import iter_files, FILE_INFO_FIELDS
+from .utils import print2
+
+# columns of the manifest; a file is unchanged if all values are the same
+MANIFEST_FIELDS = ['path', 'inode', 'size', 'mtime']
+
+# columns of the changes file
+CHANGES_FIELDS = FILE_INFO_FIELDS + ['status']
+
+
+class FileInventory:
+    """Track changes to a directory tree between scans
+
+    The manifest records the inode, size, and modification time of every file
+    found in the last committed scan. Each new scan compares files with the
+    manifest and writes only files that were added, changed, or removed to the
+    changes file. The result of the scan is saved as a pending manifest and
+    only replaces the manifest when `commit` is called (i.e., after the changes
+    were imported). Until then, each scan reports all changes since the last
+    committed scan, so changes are not lost if an import fails or a scan is
+    run again. A file that was moved shows up as removed at the old path and
+    added at the new path. Files in locations that could not be read are never
+    reported as removed; their previous entries are kept in the manifest until
+    they can be read again.
+
+    :param manifest: location of the manifest (csv)
+    :type manifest: str
+    """
+
+    def __init__(self, manifest: str):
+        self.manifest = manifest
+        self.pending = f"{manifest}.pending"
+
+    def _is_unreadable(self, filepath: str, errors: list):
+        """Is the file in (or is it) a location that could not be read"""
+        return any(
+            filepath == location or filepath.startswith(location.rstrip(sep) + sep)
+            for location in errors
+        )
+
+    def _read_manifest(self):
+        """Read the manifest into a dictionary of path and signature"""
+        if not path.exists(self.manifest):
+            return {}
+        with open(self.manifest, 'r', encoding='utf-8', newline='') as stream:
+            return {
+                row['path']: (int(row['inode']), int(row['size']), int(row['mtime']))
+                for row in csv.DictReader(stream)
+            }
+
+    def update(self, root: str, file: str, pattern: str = None, workers: int = 1):
+        """Scan a directory tree and write the changes since the last scan
+
+        If there is no manifest, all files are reported as added. The
+        manifest itself is not changed (see `commit`).
+
+        :param root: entry point to begin looking for files
+        :type root: str
+
+        :param file: location of the changes file (csv)
+        :type file: str
+
+        :param pattern: a regular expression used to select files by name
+        :type pattern: str
+
+        :param workers: number of threads used to read directories concurrently
+        :type workers: int
+
+        :returns: number of files per status (added, changed, removed,
+          unchanged, and unreadable)
+        :rtype: dict
+        """
+        previous = self._read_manifest()
+        counts = {'added': 0, 'changed': 0, 'removed': 0, 'unchanged': 0, 'unreadable': 0}
+        errors = []
+
+        with open(file, 'w', encoding='utf-8', newline='') as changes, \
+                open(f"{self.pending}.tmp", 'w', encoding='utf-8', newline='') as manifest:
+            changes_writer = csv.DictWriter(changes, fieldnames=CHANGES_FIELDS)
+            manifest_writer = csv.DictWriter(
+                manifest, fieldnames=MANIFEST_FIELDS, extrasaction='ignore')
+            changes_writer.writeheader()
+            manifest_writer.writeheader()
+
+            for row in iter_files(root, pattern=pattern, workers=workers, errors=errors):
+                manifest_writer.writerow(row)
+                signature = previous.pop(row['path'], None)
+                if signature is None:
+                    status = 'added'
+                elif signature != (row['inode'], row['size'], row['mtime']):
+                    status = 'changed'
+                else:
+                    counts['unchanged'] += 1
+                    continue
+                counts[status] += 1
+                changes_writer.writerow({**row, 'status': status})
+
+            # files left in the manifest were not found during this scan. A
+            # read error is not a removal: these files are kept as they were.
+            for filepath, (inode, size, mtime) in previous.items():
+                if self._is_unreadable(filepath, errors):
+                    counts['unreadable'] += 1
+                    manifest_writer.writerow({
+                        'path': filepath, 'inode': inode, 'size': size, 'mtime': mtime
+                    })
+                    continue
+                counts['removed'] += 1
+                changes_writer.writerow({
+                    'inode': inode,
+                    'name': path.basename(filepath),
+                    'path': filepath,
+                    'extension': path.splitext(filepath)[1],
+                    'size': size,
+                    'mtime': mtime,
+                    'status': 'removed'
+                })
+
+        replace(f"{self.pending}.tmp", self.pending)
+        print2(
+            'Found', counts['added'], 'added,', counts['changed'], 'changed, and',
+            counts['removed'], 'removed files', f"({counts['unchanged']} unchanged)"
+        )
+        if errors:
+            print2(
+                'Unable to read', len(errors), 'location(s);', counts['unreadable'],
+                'files in these locations were not checked'
+            )
+        return counts
+
+    def commit(self):
+        """Record the last scan as the new manifest
+
+        Call this method once the changes file of the last scan has been
+        imported. The next scan then only reports changes made after it.
+
+        :returns: True if a pending scan was committed
+        :rtype: bool
+        """
+        if not path.exists(self.pending):
+            print2('No pending scan to commit for', self.manifest)
+            return False
+        replace(self.pending, self.manifest)
+        print2('Committed scan to', self.manifest)
+        return True
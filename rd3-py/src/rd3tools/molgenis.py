@@ -1,11 +1,13 @@
 """molgenis.client for RD3"""
 
-from os.path import abspath
-import tempfile
-import csv
-import numpy as np
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import quote_plus
+import time
+import requests
+from requests.adapters import HTTPAdapter
 import molgenis.client as molgenis
 
+from .datatable import dt_to_csv, dt_to_csv_buffer
 from .utils import print2
 
 
@@ -16,6 +18,182 @@ class Molgenis(molgenis.Session):
         super(Molgenis, self).__init__(*args, **kwargs)
         self.api_file_import = f"{self._root_url}plugin/importwizard/importFile"
 
+    def _get_page(self, url: str, params: dict = None, retries: int = 3):
+        """Retrieve a single page from the REST API (v2)
+
+        :param url: endpoint of the table (i.e., api/v2/<entity>)
+        :type url: str
+
+        :param params: query parameters (num, start, q, attrs, sort)
+        :type params: dict
+
+        :param retries: number of times a failed request is retried
+        :type retries: int
+
+        :returns: response body
+        :rtype: dict
+        """
+        params = params or {}
+        for attempt in range(retries + 1):
+            try:
+                response = self._session.get(
+                    url=url,
+                    headers=self._headers.token_header,
+                    params=params
+                )
+                response.raise_for_status()
+                return response.json()
+            except requests.exceptions.RequestException as error:
+                if attempt == retries:
+                    raise
+                print2('Failed to retrieve page', params.get('start'),
+                       f'({error}); retrying')
+                time.sleep(2 ** attempt)
+        return None
+
+    def _get_table_meta(self, entity: str, q: str = None, retries: int = 3):
+        """Retrieve the row count and metadata of a table
+
+        :param entity: the identifier of a table in EMX format (package_entity)
+        :type entity: str
+
+        :param q: RSQL query used to filter the results
+        :type q: str
+
+        :returns: response body of a single row request (total, meta, items)
+        :rtype: dict
+        """
+        url = f"{self._root_url}api/v2/{quote_plus(entity)}"
+        return self._get_page(url, {'q': q, 'num': 1}, retries)
+
+    def get_parallel(
+        self,
+        entity: str,
+        attributes: str = None,
+        q: str = None,
+        page_size: int = 10000,
+        workers: int = 4,
+        retries: int = 3
+    ):
+        """Retrieve all rows of a table using concurrent requests
+
+        The number of rows is determined first, then all pages are fetched
+        using a bounded thread pool over the session. Rows are sorted by the
+        id attribute so that the result is always returned in the same order.
+
+        :param entity: the identifier of a table in EMX format (package_entity)
+        :type entity: str
+
+        :param attributes: comma separated string of attributes to return
+        :type attributes: str
+
+        :param q: RSQL query used to filter the results
+        :type q: str
+
+        :param page_size: number of rows per request (max 10000)
+        :type page_size: int
+
+        :param workers: maximum number of concurrent requests
+        :type workers: int
+
+        :param retries: number of times a failed page is retried
+        :type retries: int
+
+        :returns: recordset
+        :rtype: list
+        """
+        if page_size > 10000:
+            raise ValueError('page_size must be 10000 or less')
+
+        url = f"{self._root_url}api/v2/{quote_plus(entity)}"
+        params = {'q': q, 'attrs': attributes}
+
+        # count rows and find the id attribute for sorting
+        meta = self._get_table_meta(entity, q, retries)
+        total = meta['total']
+        sort = f"{meta['meta']['idAttribute']}:asc"
+
+        # make sure the session can hold a connection for each worker
+        self._session.mount(
+            self._root_url,
+            HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        )
+
+        starts = range(0, total, page_size)
+        pages = [None] * len(starts)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(
+                    self._get_page,
+                    url,
+                    {**params, 'num': page_size, 'start': start, 'sort': sort},
+                    retries
+                ): index
+                for index, start in enumerate(starts)
+            }
+            for future in as_completed(futures):
+                pages[futures[future]] = future.result()['items']
+
+        print2('Retrieved', total, 'rows from', entity,
+               f'in {len(pages)} page{"s"[:len(pages) ^ 1]}')
+        return [row for page in pages for row in page]
+
+    def iter_rows(
+        self,
+        entity: str,
+        attributes: str = None,
+        q: str = None,
+        page_size: int = 10000,
+        pages: bool = False,
+        retries: int = 3
+    ):
+        """Stream the rows of a table page by page
+
+        Only one page is held in memory at a time. Rows are sorted by the id
+        attribute so that paging is stable.
+
+        :param entity: the identifier of a table in EMX format (package_entity)
+        :type entity: str
+
+        :param attributes: comma separated string of attributes to return
+        :type attributes: str
+
+        :param q: RSQL query used to filter the results
+        :type q: str
+
+        :param page_size: number of rows per request (max 10000)
+        :type page_size: int
+
+        :param pages: if True, each page is yielded as a list instead of
+          yielding individual rows
+        :type pages: bool
+
+        :param retries: number of times a failed page is retried
+        :type retries: int
+
+        :returns: a generator of records (or lists of records)
+        :rtype: generator
+        """
+        if page_size > 10000:
+            raise ValueError('page_size must be 10000 or less')
+
+        url = f"{self._root_url}api/v2/{quote_plus(entity)}"
+        params = {'q': q, 'attrs': attributes}
+
+        meta = self._get_table_meta(entity, q, retries)
+        sort = f"{meta['meta']['idAttribute']}:asc"
+
+        for start in range(0, meta['total'], page_size):
+            response = self._get_page(
+                url,
+                {**params, 'num': page_size, 'start': start, 'sort': sort},
+                retries
+            )
+            if pages:
+                yield response['items']
+            else:
+                yield from response['items']
+
     def _dt_to_csv(self, path, datatable):
         """Write datatable object to csv
 
@@ -25,8 +203,67 @@ class Molgenis(molgenis.Session):
         :param data: dataset to save
         :type data: datatable
         """
-        data = datatable.to_pandas().replace({np.nan: None})
-        data.to_csv(path, index=False, quoting=csv.QUOTE_ALL)
+        dt_to_csv(datatable, path)
+
+    def _post_import_file(self, pkg_entity: str, file):
+        """Upload a CSV file to the import wizard
+
+        :param pkg_entity: the identifier of a table in EMX format (package_entity)
+        :type pkg_entity: str
+
+        :param file: csv file opened in binary mode or an in-memory buffer
+          (see `dt_to_csv_buffer`)
+        :type file: stream
+
+        :returns: response
+        :rtype: response
+        """
+        return self._session.post(
+            url=self.api_file_import,
+            headers=self._headers.token_header,
+            files={'file': (f"{pkg_entity}.csv", file, 'text/csv')},
+            params={
+                'action': 'add_update_existing',
+                'metadataAction': 'ignore'
+            }
+        )
+
+    def wait_for_import(
+        self,
+        response,
+        poll_interval: float = 2,
+        timeout: float = 3600
+    ):
+        """Wait until an import job has finished
+
+        The import wizard responds with a link to the import job
+        (sys_ImportRun) rather than the result of the import. The job is
+        polled until it is no longer running.
+
+        :param response: response of an import request
+        :type response: response
+
+        :param poll_interval: number of seconds between status requests
+        :type poll_interval: float
+
+        :param timeout: maximum number of seconds to wait
+        :type timeout: float
+
+        :returns: the sys_ImportRun record (status, message, importedEntities)
+        :rtype: dict
+        """
+        href = response.headers.get('Location') or response.text
+        run_id = href.strip().rstrip('/').split('/')[-1]
+        url = f"{self._root_url}api/v2/sys_ImportRun/{run_id}"
+
+        started = time.monotonic()
+        while True:
+            run = self._get_page(url)
+            if run.get('status') != 'RUNNING':
+                return run
+            if time.monotonic() - started > timeout:
+                return {**run, 'status': 'TIMEOUT'}
+            time.sleep(poll_interval)
 
     def import_dt(self, pkg_entity: str, data):
         """Import datatable object as a CSV file
@@ -43,26 +280,80 @@ class Molgenis(molgenis.Session):
         :returns: response
         :rtype: response
         """
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            file_path = f"{tmp_dir}/{pkg_entity}.csv"
-            self._dt_to_csv(file_path, data)
+        with dt_to_csv_buffer(data) as buffer:
+            response = self._post_import_file(pkg_entity, buffer)
 
-            with open(abspath(file_path), 'r') as file:
-                response = self._session.post(
-                    url=self.api_file_import,
-                    headers=self._headers.token_header,
-                    files={'file': file},
-                    params={
-                        'action': 'add_update_existing',
-                        'metadataAction': 'ignore'
-                    }
-                )
+        if (response.status_code // 100) != 2:
+            print2('Failed to import data into', pkg_entity,
+                   '(', response.status_code, ')')
+        else:
+            print2('Imported data into', pkg_entity)
+
+        return response
+
+    def import_dt_chunked(
+        self,
+        pkg_entity: str,
+        data,
+        chunk_size: int = 10000,
+        workers: int = 2,
+        poll_interval: float = 2,
+        timeout: float = 3600
+    ):
+        """Import a datatable object in chunks and report the status of each job
+
+        The dataset is split into CSV files of `chunk_size` rows that are
+        uploaded by a small worker pool. Each import job is tracked in
+        sys_ImportRun until it has finished.
+
+        :param pkg_entity: the identifier of a table in EMX format (package_entity)
+        :type pkg_entity: str
+
+        :param data: the dataset to import
+        :type data: datatable
+
+        :param chunk_size: number of rows per file
+        :type chunk_size: int
+
+        :param workers: maximum number of concurrent imports
+        :type workers: int
+
+        :param poll_interval: number of seconds between status requests
+        :type poll_interval: float
+
+        :param timeout: maximum number of seconds to wait for a single job
+        :type timeout: float
+
+        :returns: a report for each chunk (chunk, rows, status, message)
+        :rtype: list
+        """
+        starts = range(0, data.nrows, chunk_size)
+
+        def import_chunk(index):
+            start = starts[index]
+            chunk = data[start:start + chunk_size, :]
+            report = {'chunk': index, 'rows': chunk.nrows}
+            try:
+                with dt_to_csv_buffer(chunk) as buffer:
+                    response = self._post_import_file(pkg_entity, buffer)
+                response.raise_for_status()
+                run = self.wait_for_import(response, poll_interval, timeout)
+                report.update({
+                    'status': run.get('status'),
+                    'message': run.get('message')
+                })
+            except requests.exceptions.RequestException as error:
+                report.update({'status': 'FAILED', 'message': str(error)})
+            return report
 
-                if (response.status_code // 100) != 2:
-                    print2('Failed to import data into', pkg_entity,
-                           '(', response.status_code, ')')
-                else:
-                    print2('Imported data into', pkg_entity)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            reports = list(executor.map(import_chunk, range(len(starts))))
 
-                file.close()
-            return response
+        failed = [report for report in reports if report['status'] != 'FINISHED']
+        if failed:
+            print2('Failed to import', len(failed), 'of', len(reports),
+                   'chunks into', pkg_entity)
+        else:
+            print2('Imported', data.nrows, 'rows into', pkg_entity,
+                   f'in {len(reports)} chunk{"s"[:len(reports) ^ 1]}')
+        return reports
@@ -0,0 +1,175 @@
+"""Recode values using lookup tables"""
+
+from collections import Counter
+
+from .utils import print2
+
+
+class Recoder:
+    """Recode values using key-value pairs
+
+    The lookup table is built once and applied to whole columns. Each
+    distinct value is only looked up once per column and values that cannot
+    be mapped are counted instead of printed, so the misses can be reviewed
+    in a single summary (see `report`).
+
+    :param mappings: an object where each key corresponds to a new value
+    :type mappings: dict
+
+    :param label: string that indicates the mapping type in the summary
+    :type label: str
+
+    :param normalize: function applied to values before they are looked up
+      (e.g., `str.lower`). Missing values are not normalized.
+    :type normalize: callable
+
+    :param sep: if set, values are split on this character and each part is
+      recoded. Parts that cannot be mapped are dropped.
+    :type sep: str
+
+    :example:
+    ern = Recoder.from_records(rd3.get('solverd_info_ERN'), 'shortname', 'identifier',
+                               label='ERN', normalize=str.lower)
+    shipment_dt['ERN'] = ern.recode_column(shipment_dt['ERN'])
+    ern.report()
+    """
+
+    def __init__(
+        self,
+        mappings: dict = None,
+        label: str = None,
+        normalize=None,
+        sep: str = None
+    ):
+        self.mappings = mappings or {}
+        self.label = label
+        self.normalize = normalize
+        self.sep = sep
+        self.misses = Counter()
+
+    @classmethod
+    def from_records(cls, data, key_attr: str = None, value_attr: str = None, **kwargs):
+        """Create a recoder from a recordset or a datatable frame
+
+        :param data: dataset containing the keys and values
+        :type data: recordset or datatable
+
+        :param key_attr: name of the column that contains the keys
+        :type key_attr: str
+
+        :param value_attr: name of the column that contains the new values
+        :type value_attr: str
+
+        :returns: a new recoder. Keys are normalized if `normalize` is given.
+        :rtype: Recoder
+        """
+        if hasattr(data, 'to_list'):
+            pairs = zip(*data[:, [key_attr, value_attr]].to_list())
+        else:
+            pairs = ((row[key_attr], row.get(value_attr)) for row in data)
+
+        normalize = kwargs.get('normalize')
+        mappings = {}
+        for key, value in pairs:
+            if key is not None:
+                mappings[normalize(key) if normalize else key] = value
+        return cls(mappings, **kwargs)
+
+    def _lookup(self, value):
+        """Recode a single value without splitting it. Empty values (None,
+        '') are returned unchanged.
+
+        :returns: the new value and the value if it could not be mapped
+        :rtype: tuple
+        """
+        if not value:
+            return value, None
+        key = self.normalize(value) if self.normalize else value
+        try:
+            return self.mappings[key], None
+        except KeyError:
+            return None, value
+
+    def _recode(self, value):
+        """Recode a value and list the parts that could not be mapped"""
+        if not value:
+            return value, []
+        if self.sep is None:
+            new_value, miss = self._lookup(value)
+            return new_value, [miss] if miss is not None else []
+
+        values = []
+        misses = []
+        for part in value.split(self.sep):
+            if not part.strip():
+                continue
+            new_value, miss = self._lookup(part.strip())
+            if new_value is not None:
+                values.append(str(new_value))
+            if miss is not None:
+                misses.append(miss)
+        return self.sep.join(dict.fromkeys(values)) or None, misses
+
+    def recode(self, value=None):
+        """Recode a single value
+
+        :param value: the value to recode
+        :type value: str
+
+        :returns: a new value or None if the value cannot be mapped. Empty
+          values are returned as is.
+        :rtype: str or NoneType
+        """
+        new_value, misses = self._recode(value)
+        self.misses.update(misses)
+        return new_value
+
+    def recode_values(self, values: list = None):
+        """Recode a list of values; each distinct value is recoded once
+
+        :param values: the values to recode
+        :type values: list
+
+        :returns: recoded values in the same order
+        :rtype: list
+        """
+        results = {}
+        output = []
+        for value in values:
+            if value not in results:
+                results[value] = self._recode(value)
+            new_value, misses = results[value]
+            self.misses.update(misses)
+            output.append(new_value)
+        return output
+
+    def recode_column(self, column):
+        """Recode all values of a column in one pass
+
+        :param column: the values to recode
+        :type column: datatable (single column) or list
+
+        :returns: a new column
+        :rtype: datatable
+        """
+        from datatable import dt
+        values = column.to_list()[0] if hasattr(column, 'to_list') else column
+        return dt.Frame(self.recode_values(values))
+
+    def report(self, quiet: bool = False):
+        """Summarise the values that could not be mapped
+
+        :param quiet: if True, the summary is not printed
+        :type quiet: bool
+
+        :returns: number of occurrences per unmapped value
+        :rtype: dict
+        """
+        if not quiet and self.misses:
+            print2(
+                f'Error in {self.label or ""} recoding:',
+                len(self.misses), 'value(s) not found',
+                f'({sum(self.misses.values())} occurrences):',
+                ', '.join(f'"{value}" ({count})' for value, count in self.misses.most_common())
+            )
+        return dict(self.misses)
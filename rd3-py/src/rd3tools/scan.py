@@ -0,0 +1,239 @@
+"""Iterative scanning of large directory trees"""
+
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from collections import deque
+import csv
+import os
+import re
+
+from .utils import print2
+
+# default columns returned by `file_info`
+FILE_INFO_FIELDS = ['inode', 'name', 'path', 'extension', 'size', 'mtime']
+
+
+def file_info(entry):
+    """Extract metadata from a directory entry
+
+    The inode is read from the directory listing and the size and modification
+    time from a single (cached) stat call. For symbolic links, the inode is
+    that of the link and the size and modification time are those of the
+    target.
+
+    :param entry: a directory entry returned by `os.scandir`
+    :type entry: os.DirEntry
+
+    :returns: inode, name, path, extension, size, and modification time
+    :rtype: dict
+    """
+    stat = entry.stat()
+    return {
+        'inode': entry.inode(),
+        'name': entry.name,
+        'path': entry.path,
+        'extension': os.path.splitext(entry.name)[1],
+        'size': stat.st_size,
+        'mtime': stat.st_mtime_ns
+    }
+
+
+def _dir_key(directory):
+    """Identify a directory by device and inode
+
+    :param directory: a path or a directory entry
+    :type directory: str or os.DirEntry
+
+    :returns: device and inode or None if the directory cannot be read
+    :rtype: tuple
+    """
+    try:
+        stat = directory.stat() if isinstance(directory, os.DirEntry) else os.stat(directory)
+    except OSError:
+        return None
+    return stat.st_dev, stat.st_ino
+
+
+def _scan_dir(directory: str, row=None, pattern=None, follow_symlinks: bool = True):
+    """List the files and subdirectories of a single directory
+
+    Entries that cannot be read (e.g., files that were removed during the
+    scan) are skipped; the remaining entries are still listed.
+
+    :returns: rows of the files, the paths of the subdirectories with
+      their device and inode (None if symbolic links are not followed), and
+      the paths that could not be read
+    :rtype: tuple
+    """
+    rows = []
+    subdirs = []
+    errors = []
+    try:
+        entries = os.scandir(directory)
+    except OSError as error:
+        print2('Unable to read', directory, f'({error.strerror})')
+        return rows, subdirs, [directory]
+
+    with entries:
+        iterator = iter(entries)
+        while True:
+            try:
+                entry = next(iterator)
+            except StopIteration:
+                break
+            except OSError as error:
+                print2('Unable to read', directory, f'({error.strerror})')
+                errors.append(directory)
+                break
+
+            try:
+                if entry.is_dir(follow_symlinks=follow_symlinks):
+                    subdirs.append(
+                        (entry.path, _dir_key(entry) if follow_symlinks else None))
+                elif entry.is_file(follow_symlinks=follow_symlinks):
+                    if pattern is None or pattern.search(entry.name):
+                        rows.append(row(entry))
+            except OSError as error:
+                print2('Unable to read', entry.path, f'({error.strerror})')
+                errors.append(entry.path)
+    return rows, subdirs, errors
+
+
+class _VisitedDirs:
+    """Track directories that were queued to avoid symbolic link cycles"""
+
+    def __init__(self):
+        self.keys = set()
+
+    def new(self, subdirs: list):
+        """Paths of the subdirectories that were not seen before"""
+        paths = []
+        for subdir, key in subdirs:
+            if key is not None:
+                if key in self.keys:
+                    continue
+                self.keys.add(key)
+            paths.append(subdir)
+        return paths
+
+
+def iter_files(
+    root: str,
+    pattern: str = None,
+    row=None,
+    workers: int = 1,
+    follow_symlinks: bool = True,
+    errors: list = None
+):
+    """List all files in a directory tree
+
+    Directories are processed from a work queue instead of recursively, so the
+    depth of the tree is not limited by the recursion limit. Rows are yielded
+    as soon as a directory has been read. Symbolic links are followed by
+    default; each directory is read once (by device and inode), so links that
+    point to a directory that was already found are skipped.
+
+    :param root: entry point to begin looking for files
+    :type root: str
+
+    :param pattern: a regular expression used to select files by name. Files
+      that do not match are skipped before their metadata is read.
+    :type pattern: str
+
+    :param row: function that converts a directory entry into a row
+      (default: `file_info`)
+    :type row: callable
+
+    :param workers: number of threads used to read directories concurrently.
+      Useful on network file systems where each call has a high latency.
+    :type workers: int
+
+    :param follow_symlinks: if False, symbolic links to files and
+      directories are skipped
+    :type follow_symlinks: bool
+
+    :param errors: if set, the paths of directories and entries that could
+      not be read are appended to this list. Files in these locations may be
+      missing from the results.
+    :type errors: list
+
+    :returns: a row for each file
+    :rtype: generator
+    """
+    row = row or file_info
+    pattern = re.compile(pattern) if pattern else None
+    visited = _VisitedDirs()
+    visited.new([(root, _dir_key(root) if follow_symlinks else None)])
+    errors = errors if errors is not None else []
+
+    if workers <= 1:
+        queue = deque([root])
+        while queue:
+            rows, subdirs, dir_errors = _scan_dir(
+                queue.popleft(), row, pattern, follow_symlinks)
+            queue.extend(visited.new(subdirs))
+            errors.extend(dir_errors)
+            yield from rows
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {executor.submit(_scan_dir, root, row, pattern, follow_symlinks)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                rows, subdirs, dir_errors = future.result()
+                errors.extend(dir_errors)
+                pending.update(
+                    executor.submit(_scan_dir, subdir, row, pattern, follow_symlinks)
+                    for subdir in visited.new(subdirs)
+                )
+                yield from rows
+
+
+def scan_to_csv(
+    root: str,
+    file: str,
+    pattern: str = None,
+    row=None,
+    fields: list = None,
+    workers: int = 1,
+    follow_symlinks: bool = True
+):
+    """Write metadata of all files in a directory tree to a csv file
+
+    Rows are written while the tree is scanned, so memory use does not grow
+    with the number of files.
+
+    :param root: entry point to begin looking for files
+    :type root: str
+
+    :param file: location of the output file
+    :type file: str
+
+    :param pattern: a regular expression used to select files by name
+    :type pattern: str
+
+    :param row: function that converts a directory entry into a row
+      (default: `file_info`)
+    :type row: callable
+
+    :param fields: names of the columns (default: FILE_INFO_FIELDS)
+    :type fields: list
+
+    :param workers: number of threads used to read directories concurrently
+    :type workers: int
+
+    :param follow_symlinks: if False, symbolic links are skipped
+    :type follow_symlinks: bool
+
+    :returns: number of files written
+    :rtype: int
+    """
+    count = 0
+    with open(file, 'w', encoding='utf-8', newline='') as stream:
+        writer = csv.DictWriter(
+            stream, fieldnames=fields or FILE_INFO_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        for count, data in enumerate(iter_files(root, pattern, row, workers, follow_symlinks), start=1):
+            writer.writerow(data)
+    print2('Wrote', count, 'files to', file)
+    return count
@@ -1,8 +1,8 @@
 """RD3 Utils"""
 
 import re
-import copy
 from datetime import datetime
+from functools import lru_cache
 import pytz
 
 
@@ -27,50 +27,140 @@ def as_key_pairs(data: list = None, key_attr: str = None, value_attr: str = None
     return output
 
 
-def flatten_data(data: list = None, col_patterns: str = None):
+@lru_cache(maxsize=None)
+def _compile_pattern(col_patterns: str):
+    """Compile a search pattern once"""
+    return re.compile(col_patterns)
+
+
+@lru_cache(maxsize=4096)
+def _match_key(col_patterns: str, keys: tuple):
+    """Find the nested key that matches the search pattern
+
+    :returns: name of the key or None if there is no match
+    :rtype: str
+    """
+    match = _compile_pattern(col_patterns).search(','.join(keys))
+    return match.group() if match else None
+
+
+class _Flattener:
+    """Flatten records using the target key of each column
+
+    The target key of a column is determined from the first non-empty value
+    and reused for all following rows. Nested values that do not contain the
+    key are resolved separately (the result is cached by set of keys).
+    """
+
+    def __init__(self, col_patterns: str = None):
+        self.col_patterns = col_patterns
+        self.keys = {}
+
+    def _key(self, column: str, value: dict):
+        """Get the target key of a nested value"""
+        key = self.keys.get(column)
+        if key is None or key not in value:
+            key = _match_key(self.col_patterns, tuple(value))
+            if key is not None:
+                self.keys[column] = key
+        return key
+
+    def value(self, column: str, value=None):
+        """Flatten a single value"""
+        if isinstance(value, dict):
+            if not value:
+                return None
+            key = self._key(column, value)
+            if key is None:
+                print(f'Variable {column} is type "dict", but no target column found')
+            else:
+                value = value[key]
+        if isinstance(value, list):
+            if not value:
+                return None
+            values = []
+            for nestedrow in value:
+                key = self._key(column, nestedrow)
+                if key is None:
+                    print(f'Variable {column} is type "list", but no target column found')
+                else:
+                    values.append(nestedrow[key])
+            if values:
+                value = ','.join(values)
+        return value
+
+    def row(self, row: dict = None, in_place: bool = False):
+        """Flatten a single record"""
+        if in_place:
+            row.pop('_href', None)
+            for column, value in row.items():
+                if isinstance(value, (dict, list)):
+                    row[column] = self.value(column, value)
+            return row
+        return {
+            column: self.value(column, value)
+            for column, value in row.items()
+            if column != '_href'
+        }
+
+
+def iter_flatten_data(data=None, col_patterns: str = None, in_place: bool = False):
+    """Flatten a stream of records one row at a time
+
+    The target key of each nested column is determined once from the first
+    non-empty value (see `flatten_data`).
+
+    :param data: an iterable of records containing nested data, e.g., the
+      output of `Molgenis.iter_rows`
+    :type data: iterable
+
+    :param col_patterns: names of the nested keys that contain the data to extract
+      that are formatted as a re search pattern (key1|key2|keyN)
+
+    :param in_place: if True, records are modified instead of copied
+    :type in_place: bool
+
+    :returns: a generator of records without nested data
+    :rtype: generator
+    """
+    flattener = _Flattener(col_patterns)
+    for row in data:
+        yield flattener.row(row, in_place)
+
+
+def flatten_data(
+    data: list = None,
+    col_patterns: str = None,
+    in_place: bool = False,
+    as_frame: bool = False
+):
     """Flatten dataset by column
 
+    Nested values (objects and arrays) are replaced by the value of the key
+    that matches `col_patterns`. The matching key is determined once per
+    column from the first non-empty value and the pattern is compiled once,
+    so the cost of flattening is a dictionary lookup per nested value.
+
     :param data: recordset containing nested data (objects and arrays)
-    :type data: recordset (i.e.,list of dictionaries)
+    :type data: recordset (i.e.,list of dictionaries) or an iterable of records
 
     :param col_patterns: names of the nested keys that contain the data to extract
       that are formatted as a re search pattern (key1|key2|keyN)
 
+    :param in_place: if True, the records are modified instead of copied
+    :type in_place: bool
+
+    :param as_frame: if True, a datatable frame is returned
+    :type as_frame: bool
+
     :returns: recordset without nested data
-    :rtype: recordset
+    :rtype: recordset or datatable
     """
-    new_data = copy.deepcopy(data)
-    for row in new_data:
-        if '_href' in row:
-            del row['_href']
-        for column in row.keys():
-            if isinstance(row[column], dict):
-                if bool(row[column]):
-                    col_match_dict = re.search(
-                        col_patterns, ','.join(row[column].keys()))
-                    if bool(col_match_dict):
-                        row[column] = row[column][col_match_dict.group()]
-                    else:
-                        print(
-                            f'Variable {column} is type "dict", but no target column found')
-                else:
-                    row[column] = None
-            if isinstance(row[column], list):
-                if bool(row[column]):
-                    values = []
-                    for nestedrow in row[column]:
-                        col_match_list = re.search(
-                            col_patterns, ','.join(nestedrow.keys()))
-                        if bool(col_match_list):
-                            values.append(nestedrow[col_match_list.group()])
-                        else:
-                            print(
-                                f'Variable {column} is type "list", but no target column found')
-                    if bool(values):
-                        row[column] = ','.join(values)
-                else:
-                    row[column] = None
-    return new_data
+    rows = iter_flatten_data(data, col_patterns, in_place)
+    if as_frame:
+        from .datatable import dt_from_records
+        return dt_from_records(rows)
+    return list(rows)
 
 
 def print2(*args):
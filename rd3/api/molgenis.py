@@ -2,7 +2,7 @@
 #' FILE: _client.py
 #' AUTHOR: David Ruvolo
 #' CREATED: 2022-02-23
-#' MODIFIED: 2022-02-23
+#' MODIFIED: 2026-10-17
 #' PURPOSE: Extension of the molgenis.lcient
 #' STATUS: stable
 #' PACKAGES: 
@@ -11,6 +11,7 @@
 
 import molgenis.client as molgenis
 from rd3.utils.utils import statusMsg
+from rd3tools.batch import BatchWriter
 import json
 
 class Molgenis(molgenis.Session):
@@ -55,7 +56,31 @@ class Molgenis(molgenis.Session):
         response.raise_for_status()
             
     
-    def importData(self, entity: str, data: list):
+    def _writeBatches(self, method: str, url: str, data: list, label: str,
+                      batchSize: int = 1000, workers: int = 4):
+        """Write Batches
+        Send records in concurrent batches. Batches that fail due to rate
+        limiting or server errors are retried. Failed batches are collected
+        in the summary instead of stopping the import.
+        
+        @param method http method (POST or PUT)
+        @param url endpoint to send the data to
+        @param data list of dictionaries
+        @param label a description to print (e.g., table name)
+        @param batchSize number of records per request (max 1000)
+        @param workers maximum number of concurrent requests
+        
+        @return BatchSummary
+        """
+        writer = BatchWriter(
+            session = self._session,
+            headers = self._headers.ct_token_header,
+            batch_size = batchSize,
+            workers = workers
+        )
+        return writer.write(method=method, url=url, data=data, label=label)
+    
+    def importData(self, entity: str, data: list, batchSize: int = 1000, workers: int = 4):
         """Import Data
         Import data into a table. The data must be a list of dictionaries that
         contains the 'idAttribute' and one or more attributes that you wish
@@ -63,25 +88,16 @@ class Molgenis(molgenis.Session):
         
         @param entity (str) : name of the entity to import data into
         @param data (list) : data to import (a list of dictionaries)
+        @param batchSize (int) : number of records per request (max 1000)
+        @param workers (int) : maximum number of concurrent requests
         
-        @return a status message
+        @return a BatchSummary with the status of each batch
         """
         url = '{}v2/{}'.format(self._apiUrl, entity)
-        # single push
-        if len(data) < 1000:
-            self._POST(url=url, data=data, label=str(entity))
-            
-        # batch push
-        if len(data) >= 1000:    
-            for d in range(0, len(data), 1000):
-                self._POST(
-                    url = url,
-                    data = data[d:d+1000],
-                    label = '{} (batch {})'.format(str(entity), str(d))
-                )
+        return self._writeBatches('POST', url, data, str(entity), batchSize, workers)
     
     
-    def updateRows(self, entity: str, data: list):
+    def updateRows(self, entity: str, data: list, batchSize: int = 1000, workers: int = 4):
         """Update Rows
         Update rows in a table. The data must be a list of dictionaries that
         contains the 'idAttribute' and must contain values for all attributes
@@ -90,24 +106,15 @@ class Molgenis(molgenis.Session):
         
         @param entity (str) : name of the entity to import data into
         @param data (list) : data to import (list of dictionaries)
+        @param batchSize (int) : number of records per request (max 1000)
+        @param workers (int) : maximum number of concurrent requests
         
-        @return a status message
+        @return a BatchSummary with the status of each batch
         """
         url = '{}v2/{}'.format(self._apiUrl, entity)
-        # single push
-        if len(data) < 1000:
-            self._PUT(url=url, data=data, label=str(entity))
-            
-        # batch push
-        if len(data) >= 1000:    
-            for d in range(0, len(data), 1000):
-                self._PUT(
-                    url = url,
-                    data = data[d:d+1000],
-                    label = '{} (batch {})'.format(str(entity), str(d))
-                )
+        return self._writeBatches('PUT', url, data, str(entity), batchSize, workers)
 
-    def updateColumn(self, entity: str, attr: str, data: list):
+    def updateColumn(self, entity: str, attr: str, data: list, batchSize: int = 1000, workers: int = 4):
         """Update Column
         Update values of an single column in a table. The data must be a list of
         dictionaries that contain the `idAttribute` and the value of the
@@ -117,24 +124,11 @@ class Molgenis(molgenis.Session):
         @param entity (str) : name of the entity to import data into
         @param attr (str) : name of the attribute to update
         @param data (list) : data to import (list of dictionaries)
+        @param batchSize (int) : number of records per request (max 1000)
+        @param workers (int) : maximum number of concurrent requests
         
-        @retrun status message
+        @retrun a BatchSummary with the status of each batch
         """
         url = '{}v2/{}/{}'.format(self._apiUrl, str(entity), str(attr))
-        
-        # single push
-        if len(data) < 1000:
-            self._PUT(url=url, data=data, label=str(entity))
-        
-        # batch push
-        if len(data) >= 1000:
-            for d in range(0, len(data), 1000):
-                self._PUT(
-                    url = url,
-                    data = data[d:d+1000],
-                    label = '{}/{} (batch {})'.format(
-                        str(entity),
-                        str(attr),
-                        str(d)
-                    )
-                )
+        label = '{}/{}'.format(str(entity), str(attr))
+        return self._writeBatches('PUT', url, data, label, batchSize, workers)
@@ -2,7 +2,7 @@
 #' FILE: molgenis2.py
 #' AUTHOR: David Ruvolo
 #' CREATED: 2022-07-28
-#' MODIFIED: 2023-03-22
+#' MODIFIED: 2026-10-17
 #' PURPOSE: molgenis.client extensions for DataTable
 #' STATUS: stable
 #' PACKAGES: **see below**
@@ -10,13 +10,18 @@
 #'////////////////////////////////////////////////////////////////////////////
 
 import molgenis.client as molgenis
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from rd3tools.datatable import dt_to_csv, dt_to_csv_buffer
+from rd3tools.batch import BatchWriter
+from urllib.parse import quote_plus
 from os import path
 import numpy as np
 import datetime
 import requests
 import tempfile
+import time
 import pytz
-import json
 import csv
 
 def now(tz='Europe/Amsterdam'):
@@ -41,6 +46,77 @@ class Molgenis(molgenis.Session):
     super(Molgenis, self).__init__(*args, **kwargs)
     self.fileImportEndpoint = f"{self._root_url}plugin/importwizard/importFile"
     
+  def __getPage__(self, url, params, retries=3):
+    """Get Page
+    Retrieve a single page from the REST API (v2). Failed requests are
+    retried with an increasing delay.
+
+    @param url endpoint of the table (i.e., api/v2/<entity>)
+    @param params query parameters (num, start, q, attrs, sort)
+    @param retries number of times a failed request is retried
+
+    @return response body
+    """
+    for attempt in range(retries + 1):
+      try:
+        response = self._session.get(url, headers=self._headers.token_header, params=params)
+        response.raise_for_status()
+        return response.json()
+      except requests.exceptions.RequestException as err:
+        if attempt == retries:
+          raise
+        print2('Failed to retrieve page', params.get('start'), f'({err}); retrying')
+        time.sleep(2 ** attempt)
+
+  def get_parallel(self, entity, attributes=None, q=None, page_size=10000, workers=4, retries=3):
+    """Get Parallel
+    Retrieve all rows of a table using concurrent requests. The number of
+    rows is determined first, then all pages are fetched using a bounded
+    thread pool. Rows are sorted by the id attribute so the output is
+    returned in a stable order.
+
+    @param entity table identifier in emx format (package_entity)
+    @param attributes comma separated string of attributes to return
+    @param q RSQL query used to filter the results
+    @param page_size number of rows per request (max 10000)
+    @param workers maximum number of concurrent requests
+    @param retries number of times a failed page is retried
+
+    @return a recordset
+    """
+    if page_size > 10000:
+      raise ValueError('page_size must be 10000 or less')
+
+    url = f"{self._root_url}api/v2/{quote_plus(entity)}"
+    params = {'q': q, 'attrs': attributes}
+
+    meta = self.__getPage__(url, {**params, 'num': 1}, retries)
+    total = meta['total']
+    sort = f"{meta['meta']['idAttribute']}:asc"
+
+    self._session.mount(
+      self._root_url,
+      HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+    )
+
+    starts = range(0, total, page_size)
+    pages = [None] * len(starts)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+      futures = {
+        executor.submit(
+          self.__getPage__,
+          url,
+          {**params, 'num': page_size, 'start': start, 'sort': sort},
+          retries
+        ): index
+        for index, start in enumerate(starts)
+      }
+      for future in as_completed(futures):
+        pages[futures[future]] = future.result()['items']
+
+    print2('Retrieved', total, 'rows from', entity, f"in {len(pages)} page{'s'[:len(pages)^1]}")
+    return [row for page in pages for row in page]
+
   def __checkFileImport__(self, pkg_entity, response):
     if (response.status_code // 100 ) != 2:
       print2('Failed to import data into',pkg_entity,'(',response.status_code,')')
@@ -54,8 +130,7 @@ class Molgenis(molgenis.Session):
     @param path location to save the file
     @param data datatable object
     """
-    data = datatable.to_pandas().replace({np.nan: None})
-    data.to_csv(path, index=False, quoting=csv.QUOTE_ALL)
+    dt_to_csv(datatable, path)
     
   def __dfToCsv__(self, path, df):
     """To CSV
@@ -81,18 +156,15 @@ class Molgenis(molgenis.Session):
     
     @return status message
     """
-    with tempfile.TemporaryDirectory() as tmpdir:
-      filepath=f"{tmpdir}/{pkg_entity}.csv"
-      self.__datatableToCsv__(filepath, data)
-      with open(path.abspath(filepath), 'r') as file:
-        response = self._session.post(
-          url = self.fileImportEndpoint,
-          headers = self._headers.token_header,
-          files = {'file': file},
-          params = {'action': 'add_update_existing', 'metadataAction': 'ignore'}
-        )
-        self.__checkFileImport__(pkg_entity=pkg_entity, response=response)
-        return response
+    with dt_to_csv_buffer(data) as buffer:
+      response = self._session.post(
+        url = self.fileImportEndpoint,
+        headers = self._headers.token_header,
+        files = {'file': (f"{pkg_entity}.csv", buffer, 'text/csv')},
+        params = {'action': 'add_update_existing', 'metadataAction': 'ignore'}
+      )
+    self.__checkFileImport__(pkg_entity=pkg_entity, response=response)
+    return response
       
   def importPandasAsCsv(self, pkg_entity, data):
     """Import Pandas data.frame As CSV
@@ -121,28 +193,30 @@ class Molgenis(molgenis.Session):
         self.__checkFileImport__(pkg_entity=pkg_entity, response=response)
         return response
 
-  def batchUpdate(self, pkg_entity, column, data):
+  def batchUpdate(self, pkg_entity, column, data, batch_size=1000, workers=4):
     """Batch Update
-    Batch update a column in a table for 1000+ entities. Smaller datasets also work too.
+    Batch update a column in a table for 1000+ entities. Smaller datasets also
+    work too. Batches are sent concurrently and batches that fail due to rate
+    limiting or server errors are retried. Failed batches do not stop the
+    import and are listed in the returned summary.
     
     @param pkg_entity table identifier in emx format (package_entity)
     @param column name of column to update
     @param data a recordset to import
+    @param batch_size number of records per request (max 1000)
+    @param workers maximum number of concurrent requests
     
-    @return a response code
+    @return a BatchSummary with the status of each batch
     """
-    url=f"{self._root_url}api/v2/{pkg_entity}/{column}"
-    headers=self._headers.ct_token_header
-    
-    batches = range(0, len(data), 1000)
-    print(f"Importing {len(batches)} batch{'es'[:len(batches)^1]} into {pkg_entity}${column}")
-    for batch in batches:
-      batchNumber = round(batch / 1000, ndigits=None) + 1
-      batchToImport = json.dumps({'entities': data[batch:batch+1000] })
-      response = self._session.put(url, headers=headers, data=batchToImport)
-      try:
-        if response.status_code // 100 == 2:
-          print(f'Batch {batchNumber}: Imported {len(data)} entities')
-        response.raise_for_status()
-      except requests.exceptions.HTTPError as err:
-        print(f'Batch {batchNumber} Error: unable to import data:\n{str(err)}')
+    writer = BatchWriter(
+      session=self._session,
+      headers=self._headers.ct_token_header,
+      batch_size=batch_size,
+      workers=workers
+    )
+    return writer.write(
+      method='PUT',
+      url=f"{self._root_url}api/v2/{pkg_entity}/{column}",
+      data=data,
+      label=f"{pkg_entity}${column}"
+    )
@@ -67,9 +67,15 @@ for dir in directories:
       'type': folder.replace('/',''),
       'created': str(datetime.now()).replace(' ', 'T') + 'Z'
     }
-    fileMetadata['md5sum'] = fender.md5sum(path=fileMetadata['path'])
     files.append(fileMetadata)
 
+# run checksums in parallel on the cluster
+checksums = fender.md5sumMany(paths=[file['path'] for file in files])
+for file in files:
+  file['md5sum'] = checksums.get(file['path'])
+
+fender.close()
+
 # filter files - remove duplicates
 data = pd.DataFrame(files).drop_duplicates(subset='name', keep='first').to_dict('records')
 
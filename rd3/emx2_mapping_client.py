@@ -15,6 +15,7 @@ from dotenv import load_dotenv
 import molgenis.client
 import pandas as pd
 load_dotenv()
+from rd3.utils.pedigreetools import PedigreeGraph
 import re
 import json
 
@@ -113,147 +114,18 @@ class map_solve_rd:
               pedigree members table: both as a patient (with itself as the relative) and as a parent
               (with the child as the relative).
             If an individual has a family ID, but no other information, the person is added to the table
-              with itself as the relative. This happens later in the code.
-            If individuals have the same mother and father, they are mapped as full siblings. This also
-              happens later in the code. 
+              with itself as the relative.
+            If individuals have the same mother and father, they are mapped as full siblings.
             If a family only has one member, we assume this individual is a patient. This is done at the end.
         """
-        for subject in self.subjects:
-            subject_id = subject.get('subjectID')
-            if subject_id not in self.individuals:
-                continue
+        graph = PedigreeGraph(self.subjects)
+        # keep track of the parents' and patients' IDs.
+        self.track_mothers = graph.mothers
+        self.track_fathers = graph.fathers
+        self.patients = [subject_id for subject_id in graph.subjects if graph.isPatient(subject_id)]
 
-           # if 'fid' in subject: 
-            fid = subject.get('fid')
-            if fid and ('pid' in subject or 'mid' in subject):
-
-                new_pedigree_members_entry = self.pedigree_entry(pedigree=fid,
-                                                                individual= subject_id,
-                                                                affected=subject.get('clinical_status'),
-                                                                relative=subject_id,
-                                                                relation='Patient')
-                if fid not in self.pedigree_members:
-                   self.pedigree_members[fid] = []
-                self.pedigree_members[fid].append(new_pedigree_members_entry)
-                # keep track of the patients
-                self.patients.append(subject_id)
-            # Map Parents - based on MaternalID and PaternalID
-            if fid:
-                for subj in subjects:
-                    if subj['subjectID'] == subject_id:
-                        continue
-                    pedigree = fid
-                    individual = subject_id
-                    affected = subject.get('clinical_status')
-                    # new_pedigree_members_entry['pedigree'] = subject['fid']
-                    # new_pedigree_members_entry['individual'] = subject_id
-                    # if 'clinical_status' in subject:
-                        # new_pedigree_members_entry['affected'] = subject['clinical_status']
-                    # Map Biological Mother
-                    if 'mid' in subj and subj['mid']['subjectID'] == subject_id:
-                        relative = subj['subjectID']
-                        relation = "Biological Mother"
-                        # add the child and mother IDs to the dictionary
-                        self.track_mothers[subj['subjectID']] = subject_id
-                    # Map Biological Father
-                    elif 'pid' in subj and subj['pid']['subjectID'] == subject_id:
-                        relative = subj['subjectID']
-                        relation = "Biological Father"
-                        # add the child and father's IDs to the dictionary
-                        self.track_fathers[subj['subjectID']] = subject_id
-                        # if 'mid' in subject or 'pid' in subject:
-                            # print(f'Individual has a parent and is a parent for ind {subject['subjectID']}')
-                    else: 
-                        relative = ""
-                        relation = ""
-                    new_pedigree_members_entry = self.pedigree_entry(pedigree=pedigree,
-                                                                    individual=individual,
-                                                                    affected=affected,
-                                                                    relative=relative,
-                                                                    relation=relation)
-                    if fid not in self.pedigree_members:
-                       self.pedigree_members[fid] = [fid]
-                    if new_pedigree_members_entry.get('relative'): # only append new entry if individual has a parent
-                        self.pedigree_members[fid].append(new_pedigree_members_entry)
-                    
-                # Map maternal grandparents
-                if subject['subjectID'] in self.patients and subject_id in self.track_mothers.values():
-                    # Map Biological Maternal Grandmother
-                    if 'mid' in subject:
-                        # get the identifier for the grandchild
-                        grandchild_ids = [child_id for child_id, value in self.track_mothers.items() if value == subject_id]
-                        for grandchild_id in grandchild_ids:
-                            clinical_status = [subject_clin['clinical_status'] for subject_clin in subjects if(
-                                subject_clin['subjectID'] == subject['mid']['subjectID']) if (
-                                    'clinical_status' in subject_clin)]
-                            if clinical_status:
-                                affected = clinical_status[0]
-                            new_pedigree_members_entry = self.pedigree_entry(pedigree=fid,
-                                                                            individual=subject['mid']['subjectID'],
-                                                                            affected=affected,
-                                                                            relative=grandchild_id,
-                                                                            relation="Biological Maternal Grandmother")
-                            #new_pedigree_members_entry['pedigree'] = subject['fid']
-                            #new_pedigree_members_entry['individual'] = subject['mid']['subjectID']
-                            # if 'clinical_status' in subject:
-                            
-                            
-                            #new_pedigree_members_entry['relative'] = grandchild_id
-                            #new_pedigree_members_entry['relation'] = "Biological Maternal Grandmother"
-                            self.pedigree_members[fid].append(new_pedigree_members_entry)
-                    # Map Biological Maternal Grandfather
-                    if 'pid' in subject:
-                        # get the identifier for the grandchild
-                        grandchild_ids = [child_id for child_id, value in self.track_mothers.items() if value == subject_id]
-                        for grandchild_id in grandchild_ids:
-                            new_pedigree_members_entry = {} # TODO: change these to use the pedigree_entry as well 
-                            new_pedigree_members_entry['pedigree'] = subject['fid']
-                            new_pedigree_members_entry['individual'] = subject['pid']['subjectID']
-                            # retrieve clinical status of grandparent
-                            clinical_status = [subject_clin['clinical_status'] for subject_clin in subjects if(
-                                subject_clin['subjectID'] == subject['pid']['subjectID']) if (
-                                    'clinical_status' in subject_clin)]
-                            if clinical_status:
-                                new_pedigree_members_entry['affected'] = clinical_status[0]
-                            new_pedigree_members_entry['relative'] = grandchild_id
-                            new_pedigree_members_entry['relation'] = "Biological Maternal Grandfather"
-                            self.pedigree_members[fid].append(new_pedigree_members_entry)
-                # Map Paternal Grandparents
-                if subject_id in self.patients and subject_id in self.track_fathers.values():
-                    # Map Biological Paternal Grandmother
-                    if 'mid' in subject:
-                        # get the identifier for the grandchild
-                        grandchild_ids = [child_id for child_id, value in self.track_fathers.items() if value == subject_id]
-                        for grandchild_id in grandchild_ids:
-                            new_pedigree_members_entry = {}
-                            new_pedigree_members_entry['pedigree'] = subject['fid']
-                            new_pedigree_members_entry['individual'] = subject['mid']['subjectID']
-                            # retrieve clinical status of grandparent
-                            clinical_status = [subject_clin['clinical_status'] for subject_clin in subjects if(
-                                subject_clin['subjectID'] == subject['mid']['subjectID']) if(
-                                    'clinical_status' in subject_clin)]
-                        if clinical_status:
-                            new_pedigree_members_entry['affected'] = clinical_status[0]
-                        new_pedigree_members_entry['relative'] = grandchild_id
-                        new_pedigree_members_entry['relation'] = "Biological Paternal Grandmother"
-                        self.pedigree_members[fid].append(new_pedigree_members_entry)
-                    # Map Biological Paternal Grandfather
-                    if 'pid' in subject: 
-                        # get the identifier for the grandchild
-                        grandchild_ids = [child_id for child_id, value in self.track_fathers.items() if value == subject_id]
-                        for grandchild_id in grandchild_ids:
-                            new_pedigree_members_entry = {}
-                            new_pedigree_members_entry['pedigree'] = subject['fid']
-                            new_pedigree_members_entry['individual'] = subject['pid']['subjectID']
-                            # retrieve clinical status of grandparent
-                            clinical_status = [subject_clin['clinical_status'] for subject_clin in subjects if(
-                                subject_clin['subjectID'] == subject['pid']['subjectID']) if(
-                                    'clinical_status' in subject_clin)]
-                            if clinical_status:
-                                new_pedigree_members_entry['affected'] = clinical_status[0]
-                            new_pedigree_members_entry['relative'] = grandchild_id
-                            new_pedigree_members_entry['relation'] = "Biological Paternal Grandfather"
-                            self.pedigree_members[fid].append(new_pedigree_members_entry)
+        for row in graph.pedigreeMembers():
+            self.pedigree_members.setdefault(row['pedigree'], []).append(row)
 
 
     def get_results(self):
@@ -267,7 +139,7 @@ class map_solve_rd:
                         pedigree = item.get('pedigree', key)
                         individual = item.get('individual', key)
                         affected = item.get('affected', key)
-                        relative = item.get('realtive', key)
+                        relative = item.get('relative', key)
                         relation = item.get('relation', key)
                         normalized.append({'pedigree': pedigree,
                                             'individual': individual,
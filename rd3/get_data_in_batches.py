@@ -6,31 +6,19 @@ Python script to download solve-RD data in batches, from the server.
 # imports
 from os import environ
 from dotenv import load_dotenv
-import molgenis.client
-import pandas as pd
+from rd3tools.molgenis import Molgenis
 load_dotenv()
 import json
 
 # connect to the RD3 EMX1 environment and log in
-rd3 = molgenis.client.Session(environ['MOLGENIS_PROD_HOST'])
+rd3 = Molgenis(environ['MOLGENIS_PROD_HOST'])
 rd3.login(environ['MOLGENIS_PROD_USR'], environ['MOLGENIS_PROD_PWD'])
 
 # ///////////////////////////////////////////////////////////////////////////////
 # Get the Samples (solverd_samples) data. 
 
-# initialize list to gather all samples
-solveRD_samples = []
-
-# define the number of rows (samples) in the table
-num_rows = 27846
-
-# define the batch size
-step = 1000
-
-# loop through the batches and gather the rows (samples) for each batch
-for batch in range(0, num_rows, step):
-    samples = rd3.get('solverd_samples', start=batch, num=step)
-    solveRD_samples.extend(samples)
+# retrieve all rows (samples); pages are fetched concurrently
+solveRD_samples = rd3.get_parallel('solverd_samples')
 
 # write the dictionary to a json file
 with open('samples_17022025.json', 'w') as file:
@@ -39,19 +27,8 @@ with open('samples_17022025.json', 'w') as file:
 # ///////////////////////////////////////////////////////////////////////////////
 # Get the Experiments (solverd_labinfo) data.
 
-# initialize list to gather all experiments
-solveRD_experiments = []
-
-# define the number of rows (experiments) in the table
-num_rows = 26302
-
-# define the batch size
-step = 1000
-
-# loop through the batches and gather the rows (experiments) for each batch
-for batch in range(0, num_rows, step):
-    experiments = rd3.get('solverd_labinfo', start=batch, num=step)
-    solveRD_experiments.extend(experiments)
+# retrieve all rows (experiments); pages are fetched concurrently
+solveRD_experiments = rd3.get_parallel('solverd_labinfo')
 
 # write the dictionary to a json file
 with open('experiments_17022025.json', 'w') as file:
@@ -60,20 +37,8 @@ with open('experiments_17022025.json', 'w') as file:
 # ///////////////////////////////////////////////////////////////////////////////
 # Get the Files (solverd_files) data.
 
-# initialize list to gather all files
-solveRD_files = []
-
-# define the number of rows (files) in the table
-num_rows = 697223
-
-# define the batch size
-step = 10000
-
-# loop through the batches and gather the rows (files) for each batch
-for batch in range(0, num_rows, step):
-    print(batch)
-    files = rd3.get('solverd_files', start=batch, num=step)
-    solveRD_files.extend(files)
+# retrieve all rows (files); pages are fetched concurrently
+solveRD_files = rd3.get_parallel('solverd_files', workers=8)
 
 # write the dictionary to a json file
 with open('files_18022025.json', 'w') as file:
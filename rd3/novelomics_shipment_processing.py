@@ -18,15 +18,20 @@ from datatable import dt, f
 from tqdm import tqdm
 
 from rd3tools.molgenis import Molgenis
-from rd3tools.datatable import dt_as_recordset
-from rd3tools.utils import (as_key_pairs, timestamp,
-                            recode_value, flatten_data)
+from rd3tools.datatable import dt_as_recordset, is_in
+from rd3tools.recode import Recoder
+from rd3tools.utils import as_key_pairs, timestamp, flatten_data
 load_dotenv()
 
 rd3_prod = Molgenis(environ['MOLGENIS_PROD_HOST'])
 rd3_prod.login(environ['MOLGENIS_PROD_USR'], environ['MOLGENIS_PROD_PWD'])
 
 
+def clean_value(value: str = None):
+    """Strip whitespace and convert to lowercase before recoding"""
+    return value.strip().lower()
+
+
 def get_wrapped_values(val: str = None):
     """Get Wrapped Values
     In a string, extract the value between two parentheses.
@@ -125,10 +130,7 @@ releases['id'] = dt.Frame([
     for value in releases['id'].to_list()[0]
 ])
 
-releases['isNewRelease'] = dt.Frame([
-    id not in releaseinfo['id'].to_list()[0]
-    for id in releases['id'].to_list()[0]
-])
+releases['isNewRelease'] = is_in(releases['id'], releaseinfo, negate=True)
 
 releases['typeOfAnalysis'] = dt.Frame([
     value.lower().replace('-', '')
@@ -409,15 +411,14 @@ shipment_dt['type_of_analysis'] = dt.Frame([
     for value in shipment_dt['type_of_analysis'].to_list()[0]
 ])
 
-shipment_dt['partOfRelease'] = dt.Frame([
-    recode_value(mappings=release_ids, value=value, label='Release')
-    for value in shipment_dt['type_of_analysis'].to_list()[0]
-])
+# values that cannot be recoded are collected and reported once all columns
+# have been recoded (see the end of this step)
+release_recoder = Recoder(release_ids, label='Release')
+shipment_dt['partOfRelease'] = release_recoder.recode_column(
+    shipment_dt['type_of_analysis'])
 
-shipment_dt['ERN'] = dt.Frame([
-    recode_value(ern_mappings, value.strip().lower(), 'ERN')
-    for value in shipment_dt['ERN'].to_list()[0]
-])
+ern_recoder = Recoder(ern_mappings, label='ERN', normalize=clean_value)
+shipment_dt['ERN'] = ern_recoder.recode_column(shipment_dt['ERN'])
 
 # clean organisation
 shipment_dt['organisation'] = dt.Frame([
@@ -430,21 +431,21 @@ shipment_dt['organisation'] = dt.Frame([
     for value in shipment_dt['organisation'].to_list()[0]
 ])
 
-shipment_dt['organisation'] = dt.Frame([
-    recode_value(org_mappings, value.strip().lower(), 'Organistion')
-    for value in shipment_dt['organisation'].to_list()[0]
-])
+org_recoder = Recoder(org_mappings, label='Organisation', normalize=clean_value)
+shipment_dt['organisation'] = org_recoder.recode_column(
+    shipment_dt['organisation'])
 
 # recode anatomical location (if available)
+recoders = [release_recoder, ern_recoder, org_recoder]
 if 'anatomical_location' in shipment_dt.names:
-    shipment_dt['tmp_anatomical_location'] = dt.Frame([
-        recode_value(
-            mappings=anatomical_location_mappings,
-            value=value.lower(),
-            label='anatomical locations'
-        ) if value else value
-        for value in shipment_dt['anatomical_location'].to_list()[0]
-    ])
+    anatomical_location_recoder = Recoder(
+        anatomical_location_mappings,
+        label='anatomical locations',
+        normalize=str.lower
+    )
+    recoders.append(anatomical_location_recoder)
+    shipment_dt['tmp_anatomical_location'] = anatomical_location_recoder.recode_column(
+        shipment_dt['anatomical_location'])
 
     # identifier cases with "other"
     shipment_dt['anatomical_location_comment'] = dt.Frame([
@@ -459,16 +460,13 @@ else:
     shipment_dt['anatomical_location_comment'] = None
 
 # recode sample types (i.e., materialType)
+material_type_recoder = Recoder(
+    material_type_mappings, label='Sample Type', normalize=str.lower)
+recoders.append(material_type_recoder)
 shipment_dt['sample_type'] = dt.Frame([
     'TISSUE (FFPE)'
     if row[0] and (row[0].lower() == 'ffpe')
-    else (
-        recode_value(
-            mappings=material_type_mappings,
-            value=row[1].lower(),
-            label='Sample Type'
-        ) if row[1] is not None else row[1]
-    )
+    else material_type_recoder.recode(row[1])
     for row in shipment_dt[:, (f.tissue_type, f.sample_type)].to_tuples()
 ])
 
@@ -482,10 +480,11 @@ if 'extracted_protocol' in shipment_dt.names:
     ])
 
 # recode tissue types
-shipment_dt['tissue_type'] = dt.Frame([
-    recode_value(tissue_type_mappings, value.strip().lower(), 'Tissue')
-    for value in shipment_dt['tissue_type'].to_list()[0]
-])
+tissue_type_recoder = Recoder(
+    tissue_type_mappings, label='Tissue', normalize=clean_value)
+recoders.append(tissue_type_recoder)
+shipment_dt['tissue_type'] = tissue_type_recoder.recode_column(
+    shipment_dt['tissue_type'])
 
 # extract values inside parenthesis
 # get_wrapped_values(row[0]) if '(' in row[0] else row[1]
@@ -502,15 +501,14 @@ if 'alternative_sample_identifier' not in shipment_dt.names:
     shipment_dt['alternative_sample_identifier'] = None
 
 if 'pathological_state' in shipment_dt.names:
-    shipment_dt['pathological_state'] = dt.Frame([
-        recode_value(
-            mappings=pathological_state_mappings,
-            value=value.lower().strip(),
-            label='Pathological State'
-        )
-        if value else None
-        for value in shipment_dt['pathological_state'].to_list()[0]
-    ])
+    pathological_state_recoder = Recoder(
+        pathological_state_mappings,
+        label='Pathological State',
+        normalize=clean_value
+    )
+    recoders.append(pathological_state_recoder)
+    shipment_dt['pathological_state'] = pathological_state_recoder.recode_column(
+        shipment_dt['pathological_state'])
 else:
     shipment_dt['pathological_state'] = None
 
@@ -523,6 +521,10 @@ if 'tumor_cell_fraction' in shipment_dt.names:
 else:
     shipment_dt['tumor_cell_fraction'] = None
 
+# summarise values that could not be recoded
+for recoder in recoders:
+    recoder.report()
+
 # ///////////////////////////////////////
 
 # ~ 1f ~
@@ -787,13 +789,15 @@ existing_subjects_dt = shipment_dt[f.isNewSubject == False, :]
 existing_subject_ids = existing_subjects_dt['subjectID'].to_list()[0]
 
 # Is the current analysis associated with this participant?
+# misses are reported separately from the recoding in step 1e
+subject_release_recoder = Recoder(release_ids, label='Release (existing subjects)')
 for subj_id in tqdm(existing_subject_ids):
     curr_subj_row = subjects_dt[f.subjectID == subj_id, :]
     curr_releases = curr_subj_row[:, 'partOfRelease'].to_list()[0][0]
 
     new_subj_row = existing_subjects_dt[f.subjectID == subj_id, :]
     new_analysis_type = new_subj_row[:, 'type_of_analysis'].to_list()[0][0]
-    new_release = recode_value(release_ids, new_analysis_type)
+    new_release = subject_release_recoder.recode(new_analysis_type)
 
     if new_release not in curr_releases:
         print('Updating releases....')
@@ -808,6 +812,8 @@ for subj_id in tqdm(existing_subject_ids):
             ['partOfRelease', 'should_import']
         ] = (curr_new_releases, True)
 
+subject_release_recoder.report()
+
 rd3_prod.import_dt('solverd_subjects', subjects_dt[f.should_import, :])
 rd3_prod.import_dt('solverd_subjectinfo', subjectinfo_dt[f.should_import, :])
 
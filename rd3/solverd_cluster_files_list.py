@@ -2,53 +2,64 @@
 # FILE: cluster_listfiles.py
 # AUTHOR: David Ruvolo
 # CREATED: 2021-10-11
-# MODIFIED: 2023-03-24
+# MODIFIED: 2026-10-17
 # PURPOSE: compile file metadata on the cluster
 # STATUS: stable
 # PACKAGES: **see below**
-# COMMENTS: This script is designed to run in the cluster.
+# COMMENTS: This script is designed to run in the cluster and requires
+# rd3tools (see rd3-py).
 #//////////////////////////////////////////////////////////////////////////////
 
-from os import listdir, path
-from tqdm import tqdm
-import pandas as pd
-import sys, re
+from rd3tools.scan import scan_to_csv
+from rd3tools.inventory import FileInventory
 
-sys.setrecursionlimit(100000)
 basePath = '/groups/solve-rd/tmp10/releases/'
 entryFolder = 'freeze3' # fill this in
 
-def ls(dir):
-  """List files recursively
-  @param dir directory to check
+# If True, only files that were added, changed, or removed since the previous
+# run are written (see `rd3_cluster_files_changes.csv`). Set to False to list
+# all files.
+incremental = True
+
+# Set to True once the changes file has been imported (see
+# `solverd_cluster_files_process.py`) and run this script again. The last scan
+# is then recorded in the manifest. Until then, every scan reports all changes
+# since the last recorded scan.
+importCompleted = False
+
+def fileRow(entry):
+  """File row
+  Build the row of a file from a directory entry (no extra system calls)
+  @param entry os.DirEntry
   """
-  files = []
-  dir_contents = listdir(dir)
-  for item in tqdm(dir_contents):
-    item_path = dir + '/' + item
-    if path.isdir(item_path):
-      print('Processing files subdirectory',item_path)
-      subdir_contents = ls(item_path)
-      files = files + subdir_contents
-    if path.isfile(item_path):
-      file = {'filepath': item_path, 'filename': path.basename(item)}
-      files.append(file)
-  return files
+  return {'filepath': entry.path, 'filename': entry.name}
 
 #///////////////////////////////////////////////////////////////////////////////
 
 # ~ 1 ~
 # Build file metadata
-# Look for files at the specified path and compile relevant metadata.
+# Look for files at the specified path and compile relevant metadata. The
+# directory tree is scanned iteratively and rows are written to the output
+# file as they are found.
 
 # set full path
 dir = basePath + entryFolder
-files = ls(dir)
-
-# to pandas 
-filedata = pd.DataFrame(files)
 
 # save files and sync locally
 # Download file to localy machine and continue
-filedata.to_csv('../rd3_cluster_files_freeze.csv',index=False)
-# rsync -av corridor+fender:rd3_cluster_files_freeze.csv .
+if incremental:
+  inventory = FileInventory(manifest=f'../rd3_cluster_files_{entryFolder}_manifest.csv')
+  if importCompleted:
+    inventory.commit()
+  else:
+    inventory.update(root=dir, file='../rd3_cluster_files_changes.csv', workers=8)
+    # rsync -av corridor+fender:rd3_cluster_files_changes.csv .
+else:
+  scan_to_csv(
+    root=dir,
+    file='../rd3_cluster_files_freeze.csv',
+    row=fileRow,
+    fields=['filepath', 'filename'],
+    workers=8
+  )
+  # rsync -av corridor+fender:rd3_cluster_files_freeze.csv .
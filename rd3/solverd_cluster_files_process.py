@@ -2,7 +2,7 @@
 # FILE: solverd_cluster_files_process.py
 # AUTHOR: David Ruvolo
 # CREATED: 2023-03-24
-# MODIFIED: 2023-03-27
+# MODIFIED: 2026-10-17
 # PURPOSE: process file metadata for a specific release
 # STATUS: stable
 # PACKAGES: **see below**
@@ -15,6 +15,10 @@
 # It was decided to split this job into two scripts as it is 1) faster to
 # compile metadata on the cluster and 2) it is easier to process and import
 # datasets locally as there are issues setting up the venv.
+#
+# When the list script runs in incremental mode, download the changes file
+# instead. Only added and changed files are imported and removed files are
+# deleted from the portal table.
 #///////////////////////////////////////////////////////////////////////////////
 
 from rd3.api.molgenis2 import Molgenis
@@ -22,6 +26,7 @@ from dotenv import load_dotenv
 from datetime import datetime
 from os import environ
 from datatable import dt, f, as_type, fread
+from rd3tools.datatable import dt_collapse, dt_update_from
 import re
 
 def getFileType(value):
@@ -44,7 +49,19 @@ rd3.login(environ['MOLGENIS_PROD_USR'], environ['MOLGENIS_PROD_PWD'])
 # ~ 1 ~
 # Process data
 
-filemeta = fread('data/rd3_cluster_files_freeze.csv')
+incremental = True
+portalTable = 'rd3_portal_cluster_freeze3'
+
+if incremental:
+  changes = fread('data/rd3_cluster_files_changes.csv')
+  removedFiles = changes[f.status=='removed', 'path'].to_list()[0]
+  filemeta = changes[f.status!='removed', {
+    'filepath': f.path,
+    'filename': f.name,
+    'filetype': f.name
+  }]
+else:
+  filemeta = fread('data/rd3_cluster_files_freeze.csv')
 
 # format filetype
 filemeta['filetype'] = dt.Frame([
@@ -110,26 +127,41 @@ subjects = dt.Frame(
 )[:, ['subjectID','fid']]
 
 
-# merge subject ID if missing
-filemeta['subjectID'] = dt.Frame([
-  ','.join(subjects[f.fid==row[0], 'subjectID'].to_list()[0])
-  if (row[0] is not None) and (row[1] is None) else row[1]
-  for row in filemeta[:, ['familyID', 'subjectID']].to_tuples()
-])
+# merge subject ID if missing (all subjects of the family)
+dt_update_from(
+  data=filemeta,
+  source=dt_collapse(subjects, group_by='fid', column='subjectID', unique=False),
+  on='familyID',
+  source_on='fid',
+  columns=['subjectID'],
+  overwrite=False
+)
 
 # merge family ID where missing
-filemeta['familyID'] = dt.Frame([
-  subjects[f.subjectID==row[1], 'fid'].to_list()[0][0]
-  if (row[0] is None) and (row[1] is not None) else row[0]
-  for row in filemeta[:, ['familyID', 'subjectID']].to_tuples()
-])
+dt_update_from(
+  data=filemeta,
+  source=subjects,
+  on='subjectID',
+  columns={'familyID': 'fid'},
+  overwrite=False
+)
 
 #///////////////////////////////////////////////////////////////////////////////
 
 # ~ 3 ~
 # Import data
 
-rd3.importDatatableAsCsv(
-  pkg_entity='rd3_portal_cluster_freeze3',
-  data=filemeta
-)
+if filemeta.nrows:
+  response = rd3.importDatatableAsCsv(
+    pkg_entity=portalTable,
+    data=filemeta
+  )
+  if (response.status_code // 100) != 2:
+    raise SystemExit('Import failed: the scan was not committed. Fix the error and import the changes again.')
+
+if incremental and removedFiles:
+  rd3.delete_list(entity=portalTable, entities=removedFiles)
+
+# the scan can now be recorded on the cluster
+if incremental:
+  print('Changes imported. Run solverd_cluster_files_list.py with importCompleted = True')
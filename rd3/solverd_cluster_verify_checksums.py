@@ -0,0 +1,56 @@
+#///////////////////////////////////////////////////////////////////////////////
+# FILE: solverd_cluster_verify_checksums.py
+# AUTHOR: David Ruvolo
+# CREATED: 2026-10-17
+# MODIFIED: 2026-10-17
+# PURPOSE: compare checksums of files on the cluster with solverd_files
+# STATUS: stable
+# PACKAGES: **see below**
+# COMMENTS: Checksums are calculated in parallel on the cluster over a single
+# SSH connection. Files that are missing or have a different checksum are
+# written to `checksum_report.csv`.
+#///////////////////////////////////////////////////////////////////////////////
+
+from rd3tools.molgenis import Molgenis
+from rd3.utils.clustertools import clustertools
+from dotenv import load_dotenv
+from datatable import dt
+from os import environ
+load_dotenv()
+
+rd3 = Molgenis(environ['MOLGENIS_PROD_HOST'])
+rd3.login(environ['MOLGENIS_PROD_USR'], environ['MOLGENIS_PROD_PWD'])
+
+#///////////////////////////////////////////////////////////////////////////////
+
+# ~ 1 ~
+# Retrieve file metadata
+# Only files with a known location on the cluster can be verified. In most
+# cases `fenderFilePath` contains the full path, but some entries only contain
+# the directory.
+
+files = []
+for row in rd3.iter_rows(entity='solverd_files', attributes='name,md5,fenderFilePath'):
+  if row.get('fenderFilePath'):
+    filepath = row['fenderFilePath']
+    if filepath.endswith('/'):
+      filepath = filepath + row['name']
+    files.append({ 'name': row['name'], 'path': filepath, 'md5': row.get('md5') })
+
+print('Found', len(files), 'files with a location on the cluster')
+
+#///////////////////////////////////////////////////////////////////////////////
+
+# ~ 2 ~
+# Run checksums and compare with solverd_files
+
+cluster = clustertools('corridor+fender')
+report = cluster.verifyChecksums(files=files, pathAttr='path', md5Attr='md5', workers=16)
+cluster.close()
+
+if report:
+  reportDT = dt.Frame(report)
+  reportDT.to_csv('checksum_report.csv')
+  print('Saved', reportDT.nrows, 'files with issues to checksum_report.csv')
+else:
+  print('All checksums match')
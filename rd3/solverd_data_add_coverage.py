@@ -14,6 +14,7 @@ import pandas as pd
 from dotenv import load_dotenv
 from rd3tools.molgenis import Molgenis
 from rd3tools.utils import print2, flatten_data
+from rd3tools.datatable import dt_update_from
 from datatable import dt, f, as_type
 
 # when deployed
@@ -63,11 +64,14 @@ reduced_dt = source_dt[f.doesExist, {
     'median_cov': f['median.coverage']
 }]
 
-# map values over to main dataset
-for row in reduced_dt.to_tuples():
-    experiments_dt[
-        f.experimentID == row[0], (f.mean_cov, f.median_cov, f.shouldImport)
-    ] = (row[1], row[2], True)
+# map values over to main dataset (the last record of an experiment is used)
+dt_update_from(
+    data=experiments_dt,
+    source=reduced_dt[-1, :, dt.by(f.experimentID)],
+    on='experimentID',
+    columns=['mean_cov', 'median_cov'],
+    flag='shouldImport'
+)
 
 
 # reduce data to records to import and import
@@ -14,7 +14,9 @@ import numpy as np
 from dotenv import load_dotenv
 from datatable import dt, f
 from rd3tools.molgenis import Molgenis
-from rd3tools.utils import print2, recode_value, flatten_data, timestamp, as_key_pairs
+from rd3tools.datatable import is_in
+from rd3tools.utils import print2, flatten_data, timestamp, as_key_pairs
+from rd3tools.recode import Recoder
 load_dotenv()
 
 
@@ -222,15 +224,10 @@ else:
 # ~ 1b.v ~
 # recode library strategy
 if 'library_strategy' in portal_dt.names:
-    portal_dt['library_strategy'] = dt.Frame([
-        recode_value(
-            mappings=seqtype_mappings,
-            value=value,
-            label='SeqTypes/Library Strategy'
-        )
-        if value else value
-        for value in portal_dt['library_strategy'].to_list()[0]
-    ])
+    seqtype_recoder = Recoder(seqtype_mappings, label='SeqTypes/Library Strategy')
+    portal_dt['library_strategy'] = seqtype_recoder.recode_column(
+        portal_dt['library_strategy'])
+    seqtype_recoder.report()
 else:
     print2('Column "library_strategy" not found. Initializing empty column...')
     portal_dt['library_strategy'] = None
@@ -255,22 +252,14 @@ portal_dt['name'] = dt.Frame([
 # Create flags for new subjects, samples, and experiments
 
 # are there new subjects?
-portal_dt['isNewSubject'] = dt.Frame([
-    id not in subject_ids
-    for id in portal_dt['subject_id'].to_list()[0]
-])
+portal_dt['isNewSubject'] = is_in(portal_dt['subject_id'], subject_ids, negate=True)
 
 # are there new samples?
-portal_dt['isNewSample'] = dt.Frame([
-    id not in sample_ids
-    for id in portal_dt['sample_id'].to_list()[0]
-])
+portal_dt['isNewSample'] = is_in(portal_dt['sample_id'], sample_ids, negate=True)
 
 # are there new experiments?
-portal_dt['isNewExperiment'] = dt.Frame([
-    id not in experiment_ids
-    for id in portal_dt['project_experiment_dataset_id'].to_list()[0]
-])
+portal_dt['isNewExperiment'] = is_in(
+    portal_dt['project_experiment_dataset_id'], experiment_ids, negate=True)
 
 # portal_dt[:, dt.count(), dt.by(f.isNewSubject)]
 # portal_dt[:, dt.count(), dt.by(f.isNewSample)]
@@ -384,7 +373,19 @@ portal_dt['processed'] = dt.Frame([
 # Import
 
 rd3.import_dt('solverd_labinfo', labinfo_dt)
-rd3.import_dt('solverd_files', files_dt)
+import_reports = rd3.import_dt_chunked('solverd_files', files_dt, chunk_size=10000)
+
+# files that were not imported must not be marked as processed in the portal
+failed_chunks = [report for report in import_reports if report['status'] != 'FINISHED']
+if failed_chunks:
+    for report in failed_chunks:
+        print2(
+            'Chunk', report['chunk'], f"({report['rows']} rows):",
+            report['status'], '-', report['message']
+        )
+    rd3.logout()
+    raise SystemExit('Error in solverd_files import: portal status was not updated')
+
 rd3.import_dt('rd3_portal_novelomics_experiment', portal_dt)
 
 rd3.logout()
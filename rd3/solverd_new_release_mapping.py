@@ -10,7 +10,8 @@
 #'////////////////////////////////////////////////////////////////////////////
 
 from rd3.api.molgenis2 import Molgenis
-from rd3.utils.utils import recodeValue, statusMsg, toKeyPairs
+from rd3.utils.utils import statusMsg, toKeyPairs
+from rd3tools.recode import Recoder
 from datatable import dt, f, as_type
 from datetime import datetime
 
@@ -186,10 +187,9 @@ del release['_href']
 # set primary release attributes so that it is easier to select columns later
 # on in the script
 # release['partOfRelease'] = patchinfo['id']
-release['partOfRelease'] = dt.Frame([
-  recodeValue(mappings = releaseMappings, value = value, label='Releases')
-  for value in release['solverd_release'].to_list()[0]
-])
+releaseRecoder = Recoder(releaseMappings, label='Releases')
+release['partOfRelease'] = releaseRecoder.recode_column(release['solverd_release'])
+releaseRecoder.report()
 
 release['sampleID'] = dt.Frame([
   f"VS{value}"
@@ -209,20 +209,14 @@ release['sampleID'] = dt.Frame([
 # throws any error, add the name variation to the object `ernMappings` defined
 # in step 0b. Repeat until the no more mapping errors are thrown. If everything
 # is mapped, then proceed to the next step.
-dt.Frame([
-  recodeValue(mappings=ernMappings, value=value, label="ERN")
-  for value in dt.unique(
-    dt.Frame(
-      erns = release['samples_ERN'].to_list()[0] + release['subject_ERN'].to_list()[0]
-    )
-  )['erns'].to_list()[0]
-])
+ernRecoder = Recoder(ernMappings, label='ERN')
+ernRecoder.recode_values(
+  release['samples_ERN'].to_list()[0] + release['subject_ERN'].to_list()[0]
+)
+ernRecoder.report()
 
 # recode ERNs variables with known variations (recode both columns in one go)
-release[['subject_ERN','samples_ERN']] = dt.Frame([
-  recodeValue(mappings=ernMappings, value=value, label='ERN')
-  for value in release['subject_ERN'].to_list()[0]
-])
+release[['subject_ERN','samples_ERN']] = ernRecoder.recode_column(release['subject_ERN'])
 
 #///////////////////////////////////////
 
@@ -279,10 +273,9 @@ if rawOrgs[f.orgExists == False, :].nrows:
 
 # ~ 1c ~
 # Validate Tissue Types
-dt.Frame([
-  recodeValue(mappings = tissueTypeMappings, value = value, label='Tissue Type')
-  for value in release['samples_tissueType'].to_list()[0]
-])
+tissueTypeRecoder = Recoder(tissueTypeMappings, label='Tissue Type')
+tissueTypeRecoder.recode_values(release['samples_tissueType'].to_list()[0])
+tissueTypeRecoder.report()
 
 #//////////////////////////////////////////////////////////////////////////////
 
@@ -307,10 +300,9 @@ subjects = release[
 ][:, dt.first(f[:]), dt.by(f.subjectID)]
 
 # reocde solved status
-subjects['solved'] = dt.Frame([
-  recodeValue(mappings=solvedStatusMappings, value=value, label='Solved status')
-  for value in subjects['solved'].to_list()[0]
-])
+solvedStatusRecoder = Recoder(solvedStatusMappings, label='Solved status')
+subjects['solved'] = solvedStatusRecoder.recode_column(subjects['solved'])
+solvedStatusRecoder.report()
 
 # ~~~ OPTIONAL ~~~
 # MAKE SURE SUBJECTS ARE NEW!!!!
@@ -358,10 +350,7 @@ samples = release[
 ]
 
 # recode tisseType
-samples['tissueType'] = dt.Frame([
-  recodeValue(mappings = tissueTypeMappings, value = value, label='Tissue Type')
-  for value in samples['tissueType'].to_list()[0]
-])
+samples['tissueType'] = tissueTypeRecoder.recode_column(samples['tissueType'])
 
 # ~ d ~
 # Create rd3_<release>_labinfo
@@ -379,10 +368,9 @@ labinfo = release[
 ]
 
 # recode library type
-labinfo['libraryType'] = dt.Frame([
-  recodeValue(mappings=libraryTypeMappings, value=value, label='libraryType')
-  for value in labinfo['libraryType'].to_list()[0]
-])
+libraryTypeRecoder = Recoder(libraryTypeMappings, label='libraryType')
+labinfo['libraryType'] = libraryTypeRecoder.recode_column(labinfo['libraryType'])
+libraryTypeRecoder.report()
 
 # recode library
 labinfo['library'] = dt.Frame([
@@ -391,10 +379,9 @@ labinfo['library'] = dt.Frame([
 ])
 
 # recode labinfo
-labinfo['seqType'] = dt.Frame([
-  recodeValue(mappings=seqTypeMappings, value=value, label='SeqType')
-  for value in labinfo['seqType'].to_list()[0]
-])
+seqTypeRecoder = Recoder(seqTypeMappings, label='SeqType')
+labinfo['seqType'] = seqTypeRecoder.recode_column(labinfo['seqType'])
+seqTypeRecoder.report()
 
 #//////////////////////////////////////////////////////////////////////////////
 
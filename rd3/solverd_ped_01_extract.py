@@ -2,7 +2,7 @@
 # FILE: solverd_ped_01_extract.py
 # AUTHOR: David Ruvolo
 # CREATED: 2023-01-23
-# MODIFIED: 2023-01-23
+# MODIFIED: 2026-10-17
 # PURPOSE: extract contents from PED files
 # STATUS: stable
 # PACKAGES: **see below**
@@ -10,9 +10,8 @@
 #///////////////////////////////////////////////////////////////////////////////
 
 from dotenv import load_dotenv
-from datatable import dt, f, fread
+from datatable import dt, f
 from os import environ, path, listdir
-from tqdm import tqdm
 import re
 import sys
 
@@ -21,13 +20,7 @@ sys.path.append(environ['SYS_PATH'])
 
 from rd3.api.molgenis2 import Molgenis
 from rd3.utils.clustertools import clustertools
-from rd3.utils.pedtools import parseFileContents
-
-def readTextFile(file):
-  with open(file, 'r') as f:
-    data = f.readlines()
-  f.close()
-  return data
+from rd3.utils.pedtools import parseMany
 
 # set release
 currentRelease = 'freeze1_patch3'
@@ -111,16 +104,20 @@ pedFiles = [
   if (re.search(r'(.ped|.ped.cip)$', file['filename'])) and (file['filename'] not in excludedFiles)
 ]
 
-print('Found', len(pedFiles), 'phenopacket files')
+print('Found', len(pedFiles), 'PED files')
+
+# Files are read and parsed in parallel. Lines that do not have six columns
+# and files that cannot be read are reported for manual review.
+pedDT, pedIssues = parseMany(
+  paths=[file['filepath'] for file in pedFiles],
+  ids=subjectIDs,
+  workers=8
+)
+pedDT['clusterRelease'] = currentRelease
 
-pedDT = dt.Frame()
-for file in tqdm(pedFiles):
-  rawPedData = readTextFile(file=file['filepath'])
-  # rawPedData = cluster.readTextFile(path=file['filepath'])
-  parsedPedData = dt.Frame(parseFileContents(rawPedData, subjectIDs, file['filepath']))
-  parsedPedData['clusterRelease'] = currentRelease
-  parsedPedData['pedID'] = file['filename']
-  pedDT = dt.rbind(pedDT, parsedPedData, force=True)
+if pedIssues:
+  dt.Frame(pedIssues).to_csv('data/ped_issues.csv')
+  print('Saved', len(pedIssues), 'issues to data/ped_issues.csv')
 
 
 # create a unique identifier for each row
@@ -144,22 +141,6 @@ dt.unique(pedDT['id']).nrows == pedDT.nrows
 uploadablePedDT = pedDT[f.upload,:]
 dt.unique(uploadablePedDT['id']).nrows == uploadablePedDT.nrows
 
-# check for void columns
-print("Checking data for void columns.....")
-for column in uploadablePedDT.names:
-  if uploadablePedDT[column].types[0] == dt.Type.void:
-    print('Chaning class for column', column)
-    uploadablePedDT[column] = uploadablePedDT[column][:, dt.as_type(f[column], dt.str32)]
-
-
-# uploadablePedDT.to_csv('data/ped_batch_1.csv')
-# uploadablePedDT.to_csv('data/ped_batch_2.csv')
-
-uploadablePedDT = dt.rbind(
-  fread('data/ped_batch_1.csv'),
-  fread('data/ped_batch_2.csv')
-)
-
 # import
 # rd3.delete('rd3_portal_cluster_ped')
 # rd3_prod.delete('rd3_portal_cluster_ped')
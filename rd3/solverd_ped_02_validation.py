@@ -10,10 +10,10 @@
 #///////////////////////////////////////////////////////////////////////////////
 
 from rd3.api.molgenis2 import Molgenis
+from rd3tools.datatable import is_in
 from dotenv import load_dotenv
 from datatable import dt, f, fread, as_type
 from os import environ
-from tqdm import tqdm
 load_dotenv()
 
 rd3_prod = Molgenis(environ['MOLGENIS_PROD_HOST'])
@@ -43,7 +43,7 @@ for row in subjects:
     
 
 subjects = dt.Frame(subjects)[:,['subjectID','partOfRelease']]
-subjectIDs = dt.unique(subjects['subjectID']).to_list()[0]
+subjectIDs = set(subjects['subjectID'].to_list()[0])
 
 # Get sex codes
 sexcodes = dt.Frame(rd3_prod.get('solverd_lookups_sex'))['id'].to_list()[0]
@@ -60,9 +60,7 @@ del pedDT['_href']
 
 # ~ 1a ~
 # Check to see if all subject identifiers exist in RD3
-pedDT['subjectExists'] = dt.Frame([
-  id in subjectIDs for id in tqdm(pedDT['subjectID'].to_list()[0])
-])
+pedDT['subjectExists'] = is_in(pedDT['subjectID'], subjectIDs)
 
 pedDT[:, dt.count(), dt.by(f.subjectExists)]
 
@@ -2,7 +2,7 @@
 # FILE: solverd_cluster_phenopackets_01_extract.py
 # AUTHOR: David Ruvolo
 # CREATED: 2023-01-23
-# MODIFIED: 2023-01-23
+# MODIFIED: 2026-10-17
 # PURPOSE: extract phenopacket information from a specific location
 # STATUS: in.progress
 # PACKAGES: NA
@@ -10,32 +10,15 @@
 #///////////////////////////////////////////////////////////////////////////////
 
 from dotenv import load_dotenv
-from datatable import dt, fread
 from os import environ, listdir, path
-from tqdm import tqdm
 import re
 import sys
-import json
 
 load_dotenv()
 sys.path.append(environ['SYS_PATH'])
 
 from rd3.api.molgenis2 import Molgenis
-from rd3.utils.phenopacketTools import (
-  recodeSexCodes,
-  formatDateOfBirth,
-  unpackDiseaseCodes,
-  unpackPhenotypicFeatures
-)
-
-def read_json(file):
-  """Read JSON
-  Import the contents of a json file
-  """
-  with open(file, 'r') as stream:
-    data = json.load(stream)
-  stream.close()
-  return data
+from rd3.utils.phenopacketTools import extractPhenopackets
 
 # set path to latest release
 currentRelease = 'novelwgs_original'
@@ -75,13 +58,8 @@ diseaseCodeMappings = {
 }
 
 # get reference datasets
-hpoCodes = dt.Frame(
-  rd3.get('solverd_lookups_phenotype', attributes='id')
-)['id'].to_list()[0]
-
-diseaseCodes = dt.Frame(
-  rd3.get('solverd_lookups_disease', attributes='id')
-)['id'].to_list()[0]
+hpoCodes = [row['id'] for row in rd3.get('solverd_lookups_phenotype', attributes='id')]
+diseaseCodes = [row['id'] for row in rd3.get('solverd_lookups_disease', attributes='id')]
 
 #///////////////////////////////////////////////////////////////////////////////
 
@@ -100,6 +78,9 @@ diseaseCodes = dt.Frame(
 # manual review. These codes will either need to be added to the appropriate
 # lookup table or need to be mapped to a new value. These cases should be
 # reconciled before importing into RD3.
+#
+# Files are processed in parallel (see `extractPhenopackets`). Files that cannot
+# be read are reported and skipped.
 
 
 # create list of all available JSON files
@@ -118,84 +99,15 @@ phenopacketFiles = [
 
 print('Found', len(phenopacketFiles), 'phenopacket files')
 print('Starting file processing...')
-phenopackets = []
-
-for file in tqdm(phenopacketFiles):
-  # json = clustertools.readJson(path=file['filepath'])
-  jsoncontents = read_json(file['filepath'])
-  phenopacket = jsoncontents['phenopacket']
-  result = {
-    'phenopacketsID': file['filename'],
-    'clusterRelease': currentRelease,
-    'subjectID': phenopacket['id'],
-    'dateofBirth': formatDateOfBirth(phenopacket.get('subject').get('dateOfBirth')),
-    'sex1': recodeSexCodes(phenopacket.get('subject').get('sex')),
-    'phenotype': None,
-    'hasNotPhenotype': None,
-    'disease': None,
-    'ageOfOnset': None,
-    'subjectExists': None,
-    'releasesWhereSubjectExists': None,
-    'unknownOnsetCodes': None,
-    'unknownHpoCodes': None,
-    'unknownDiseaseCodes': None,
-  }
-
-  # ///////////////////////////////////////
-
-  # ~ 2 ~
-  # make sure 'phenotypicFeatures' exists and triage HPO codes into
-  # 'has', 'has not', and 'unknown'. All unknown codes will need to be manually
-  # verified before importing into RD3. Unknown codes will remain in the HPO columns.
-  if bool(phenopacket.get('phenotypicFeatures')):
-    patientHpoCodes = unpackPhenotypicFeatures(data=phenopacket['phenotypicFeatures'])
-    patientHpoUnknown = []
-
-    # ObservedPhenotypes isolate unknown cases
-    if patientHpoCodes['phenotype']:
-      for code in patientHpoCodes['phenotype']:
-        if code not in hpoCodes:
-          patientHpoUnknown.append(code)
-
-    # Unobserved Phenotypes isolate unknown cases
-    if patientHpoCodes['hasNotPhenotype']:
-      for code in patientHpoCodes['hasNotPhenotype']:
-        if code not in hpoCodes:
-          patientHpoUnknown.append(code)
-
-    # collapse codes
-    result['phenotype'] = ','.join(patientHpoCodes['phenotype']) if patientHpoCodes['phenotype'] else None
-    result['hasNotPhenotype'] = ','.join(patientHpoCodes['hasNotPhenotype']) if patientHpoCodes['hasNotPhenotype'] else None
-    result['unknownHpoCodes'] = ','.join(patientHpoUnknown) if patientHpoUnknown else None
-
-  # ///////////////////////////////////////
-
-  # ~ 3 ~
-  # make sure `diseases` exist first
-  if bool(phenopacket.get('diseases')):
-    diseases = unpackDiseaseCodes(data=phenopacket['diseases'], mappings=diseaseCodeMappings)
-    patientDiseasesUnknown = []
-
-    # triage dx IDs isolate invalid codes for review
-    for code in diseases['diagnostic']:
-      if (code not in diseaseCodes) and (code != ''):
-          patientDiseasesUnknown.append(code)
-
-    result['disease'] = ','.join(diseases['diagnostic']) if diseases['diagnostic'] else None
-    result['unknownDiseaseCodes'] = ','.join(patientDiseasesUnknown) if patientDiseasesUnknown else None
-
-    # triage onset IDs isolate invalid codes for review
-    if len(diseases['onset']) > 0:
-      onset_codes_unknown = []
-      for code in diseases['onset']:
-        if code not in hpoCodes:
-          onset_codes_unknown.append(code)
-
-      result['ageOfOnset'] = ','.join(diseases['onset']) if diseases['onset'] else None
-      result['unknownOnsetCodes'] = ','.join(onset_codes_unknown) if onset_codes_unknown else None
-  
-  # bind patient record to main object
-  phenopackets.append(result)
+
+phenopacketsDT = extractPhenopackets(
+  paths=[file['filepath'] for file in phenopacketFiles],
+  hpoCodes=hpoCodes,
+  diseaseCodes=diseaseCodes,
+  mappings=diseaseCodeMappings,
+  release=currentRelease,
+  workers=8
+)
 
 # //////////////////////////////////////////////////////////////////////////////
 
@@ -204,32 +116,12 @@ for file in tqdm(phenopacketFiles):
 # rd3.delete('rd3_portal_cluster_phenopacket')
 # rd3_prod.delete('rd3_portal_cluster_phenopacket')
 
-phenopacketsDT = dt.Frame(phenopackets)
-
-# change data type void to string32
-print('Checking data for void columns....')
-for column in phenopacketsDT.names:
-  if phenopacketsDT[column].types[0] == dt.Type.void:
-    print('Changing class for column:', column)
-    phenopacketsDT[column] = phenopacketsDT[column][:, dt.as_type(dt.f[column], dt.str32)]
-
-
-# phenopacketsDT.to_csv('data/phenopackets_batch_1.csv')
-phenopacketsDT.to_csv('data/phenopackets_batch_2.csv')
-
-
-# import all batches into RD3
-jsonData = dt.rbind(
-  fread('data/phenopackets_batch_1.csv'),
-  fread('data/phenopackets_batch_2.csv'),
-)
-
 rd3.importDatatableAsCsv(
   pkg_entity='rd3_portal_cluster_phenopacket',
-  data = jsonData
+  data = phenopacketsDT
 )
 
 rd3_prod.importDatatableAsCsv(
   pkg_entity='rd3_portal_cluster_phenopacket',
-  data = jsonData
+  data = phenopacketsDT
 )
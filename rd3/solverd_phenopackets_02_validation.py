@@ -2,7 +2,7 @@
 #' FILE: rd3_phenopacket_02_validation.py
 #' AUTHOR: David Ruvolo
 #' CREATED: 2022-08-02
-#' MODIFIED: 2023-02-02
+#' MODIFIED: 2026-10-17
 #' PURPOSE: process new phenopacket data
 #' STATUS: stable
 #' PACKAGES: **see below**
@@ -10,7 +10,9 @@
 #'////////////////////////////////////////////////////////////////////////////
 
 from rd3.utils.utils import statusMsg, dtFrameToRecords
+from rd3.utils.codetools import CodeNormalizer
 from rd3.api.molgenis2 import Molgenis
+from rd3tools.datatable import is_in
 from dotenv import load_dotenv
 from datatable import dt, f, fread, as_type
 from os import environ
@@ -19,40 +21,6 @@ import re
 load_dotenv()
 
 
-def cleanNestedCodes(x,separator=','):
-  """Clean comma separated string of HPO codes
-
-  @param x a string containing one or more HPO code separated by a column
-  @param separator A character separator if not a comma
-  
-  @return a clean, formatted string containing one or more HPO codes
-  """
-  values = x.split(separator)
-  newvalues = []
-  for value in values:
-    newval = value.replace('\n','').replace('HP:','HP_').replace('P:', 'HP_').replace('HP0','HP_0').strip()
-    if re.search(r'^(HP_)', newval):
-      newvalues.append(newval)
-    else:
-      print('Unknown format', newval)
-  return ','.join(newvalues)
-  
-def validateNestedCodes(x, referenceValues, separator = ','):
-  """Validate comma separated codes
-  
-  @param x a comma separated string containing one or more values
-  @param referenceValues an array of values to check
-  @param separator a character separator if not a comma
-  
-  @return a list of unknown values
-  """
-  values = x.split(separator)
-  unknownvalues = []
-  for value in values:
-    if value not in referenceValues:
-      unknownvalues.append(value)
-  return ','.join(unknownvalues) if unknownvalues else None
-
 #///////////////////////////////////////////////////////////////////////////////
 
 # ~ 0 ~
@@ -82,7 +50,7 @@ for row in subjects:
     row['partOfRelease'] = None
 
 subjects = dt.Frame(subjects)
-subjectIDs = dt.unique(subjects['subjectID']).to_list()[0]
+subjectIDs = set(subjects['subjectID'].to_list()[0])
 # len(subjectIDs) == subjects.nrows
 del subjects['_href']
 
@@ -116,9 +84,7 @@ del phenopacketDT['_href']
 
 # ~ 1a ~
 # Check to see if all subject identifiers exist in RD3
-phenopacketDT['subjectExists'] = dt.Frame([
-  id in subjectIDs for id in tqdm(phenopacketDT['subjectID'].to_list()[0])
-])
+phenopacketDT['subjectExists'] = is_in(phenopacketDT['subjectID'], subjectIDs)
 
 # make sure all do! Otherwise, remove?
 phenopacketDT[:, dt.count(), dt.by(f.subjectExists)]
@@ -204,9 +170,9 @@ phenopacketDT[f.dateofBirth=='....', :]
 dobMappings = fread('data/date_of_birth_mappings.csv')
 
 # update DOB for invalid cases
+newDatesOfBirth = dict(dobMappings[:, (f.subjectID, f.newDateOfBirth)].to_tuples())
 phenopacketDT['dateofBirth'] = dt.Frame([
-  dobMappings[f.subjectID==tuple[0], 'newDateOfBirth'].to_list()[0][0]
-  if tuple[0] in dobMappings['subjectID'].to_list()[0] else tuple[1]
+  newDatesOfBirth[tuple[0]] if tuple[0] in newDatesOfBirth else tuple[1]
   for tuple in phenopacketDT[:, (f.subjectID, f.dateofBirth)].to_tuples()
 ])
 
@@ -320,28 +286,21 @@ rd3_acc.importDatatableAsCsv(
 dt.unique(phenopacketDT['unknownHpoCodes'])[f.unknownHpoCodes!=None,:]
 
 # ~ 2c.i ~
-# it is a better idea to clean all the columns, and then reverify each code 
-# clean phenotype column
-phenopacketDT['phenotype'] = dt.Frame([
-  cleanNestedCodes(d) if d else d
-  for d in phenopacketDT['phenotype'].to_list()[0]
-])
+# it is a better idea to clean all the columns, and then reverify each code.
+# Codes are normalised, deduplicated, and validated in one pass per column.
+# Codes with an invalid format are removed (see the report in 2c.ii).
+hpoNormalizer = CodeNormalizer('hpo', referenceCodes=knownHpoCodes)
 
-phenopacketDT['hasNotPhenotype'] = dt.Frame([
-  cleanNestedCodes(d) if d else d
-  for d in phenopacketDT['hasNotPhenotype'].to_list()[0]
-])
+phenotypes = hpoNormalizer.normalizeColumn(phenopacketDT['phenotype'])
+hasNotPhenotypes = hpoNormalizer.normalizeColumn(phenopacketDT['hasNotPhenotype'])
 
-# revalidate HPO columns
-phenopacketDT['unknownHpoCodes'] = dt.Frame([
-  validateNestedCodes(d, knownHpoCodes) if d else d
-  for d in phenopacketDT['phenotype'].to_list()[0]
-])
+# clean HPO columns
+phenopacketDT['phenotype'] = dt.Frame(phenotypes['codes'], type='str32')
+phenopacketDT['hasNotPhenotype'] = dt.Frame(hasNotPhenotypes['codes'], type='str32')
 
-phenopacketDT['unknownHpoCodes2'] = dt.Frame([
-  validateNestedCodes(d, knownHpoCodes) if d else d
-  for d in phenopacketDT['hasNotPhenotype'].to_list()[0]
-])
+# revalidate HPO columns
+phenopacketDT['unknownHpoCodes'] = dt.Frame(phenotypes['unknown'], type='str32')
+phenopacketDT['unknownHpoCodes2'] = dt.Frame(hasNotPhenotypes['unknown'], type='str32')
 
 # check values
 # if unknownHpoCodes2 isn't void, collapse both columns
@@ -361,33 +320,14 @@ rd3.importDatatableAsCsv(
 
 
 # ~ 2c.ii ~
-# combine both revalidated columns. It is likely that one column may be 'void'
-hpoCodesToReviewArray = dt.rbind(
-  dt.unique(phenopacketDT['unknownHpoCodes'])[:, {'code':f.unknownHpoCodes}],
-  # dt.unique(phenopacketDT['unknownHpoCodes2'])[:, {'code':f.unknownHpoCodes2}], # may be void
-)[(f.code != None) & (f.code != ''), :].to_list()[0]
-
-# split strings by comma and find unique codes that are unknown
-hpoCodesToReview = dt.Frame()
-for value in hpoCodesToReviewArray:
-  for value in value.split(','):
-    hpoCodesToReview = dt.rbind(hpoCodesToReview, dt.Frame(code = [value]))
-hpoCodesToReview = dt.unique(hpoCodesToReview['code'])
-
-
-# flag cases that do not start with 'HP_'
-hpoCodesToReview['status'] = dt.Frame([
-  'invalid.value' if not re.search(r'^(HP_)', code) else None
-  for code in hpoCodesToReview['code'].to_list()[0]
-])
-
-
-# check once again to see if codes exist in `rd3_phenotype`. It is likely that the previous steps
-# have fixed a lot of formatting issues that led to matching errors
-hpoCodesToReview['status'] = dt.Frame([
-  'code.exists' if row[0] in knownHpoCodes else row[1]
-  for row in hpoCodesToReview[:, (f.code, f.status)].to_tuples()
-])
+# find unique codes that are unknown in both revalidated columns. Codes that
+# do not start with 'HP_' are flagged as 'invalid.value'. It is likely that the
+# previous steps have fixed a lot of formatting issues that led to matching
+# errors
+hpoCodesToReview = dt.Frame(
+  hpoNormalizer.report(),
+  names=['code', 'count', 'status']
+)
 
 # check values
 dt.unique(hpoCodesToReview['status'])
@@ -10,6 +10,7 @@
 #'////////////////////////////////////////////////////////////////////////////
 
 from rd3.api.molgenis2 import Molgenis
+from rd3tools.datatable import is_in
 from rd3.utils.utils import timestamp, flattenDataset
 from datatable import dt, f, as_type
 from dotenv import load_dotenv
@@ -70,9 +71,7 @@ del phenopacketsDT['_href']
 # ~ 1b ~
 # Make sure all subjects exist
 # Note subjects that do not exist in RD3 and remove them from the import
-phenopacketsDT['subjectExists'] = dt.Frame([
-  id in subjectsIDs for id in phenopacketsDT['subjectID'].to_list()[0]
-])
+phenopacketsDT['subjectExists'] = is_in(phenopacketsDT['subjectID'], subjectsIDs)
 
 
 # get counts, create a subset of missing subjects for later use
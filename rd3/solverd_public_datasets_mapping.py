@@ -14,8 +14,9 @@ from dotenv import load_dotenv
 from tqdm import tqdm
 from datatable import dt, f
 from rd3tools.molgenis import Molgenis
-from rd3tools.datatable import dt_as_recordset, unique_values_by_id
-from rd3tools.utils import print2, flatten_data, as_key_pairs, recode_value
+from rd3tools.datatable import dt_as_recordset, unique_values_by_id, dt_collapse, dt_update_from
+from rd3tools.utils import print2, flatten_data, as_key_pairs
+from rd3tools.recode import Recoder
 load_dotenv()
 
 
@@ -29,18 +30,20 @@ def merge_dataset_ids(id_list, from_dt, to_dt, from_id_col, to_id_col):
     :param to_dt: the dataset to copy the IDs into
     :param to_id_col: name of the column where the values in id_list exist
     """
-    for _id in tqdm(id_list):
-        row_dataset_ids = dt.unique(
-            from_dt[f[from_id_col] == _id, 'data_ega_id']
-        )
-        row_dataset_id_str = ','.join(row_dataset_ids.to_list()[0])
-        if row_dataset_id_str:
-            to_dt[
-                f[to_id_col] == _id, (f.includedInDatasets, f.should_import)
-            ] = (
-                row_dataset_id_str,
-                True
-            )
+    ids = set(id_list)
+    dataset_ids = dt_collapse(
+        from_dt, group_by=from_id_col, column='data_ega_id', sort=True)
+    dataset_ids = dataset_ids[dt.Frame([
+        _id in ids for _id in dataset_ids[from_id_col].to_list()[0]
+    ]), :]
+    dt_update_from(
+        data=to_dt,
+        source=dataset_ids,
+        on=to_id_col,
+        source_on=from_id_col,
+        columns={'includedInDatasets': 'data_ega_id'},
+        flag='should_import'
+    )
 
 
 def calculate_age(dob, recent=datetime.today()):
@@ -238,14 +241,10 @@ new_experiments_dt = experiments_dt[f.should_import, :]
 
 
 # create analysis type
-new_experiments_dt['analysisType'] = dt.Frame([
-    recode_value(
-        mappings=analysis_type_mappings,
-        value=value,
-        label='analyis type mappings'
-    )
-    for value in new_experiments_dt['partOfRelease'].to_list()[0]
-])
+analysis_type_recoder = Recoder(analysis_type_mappings, label='analysis type mappings')
+new_experiments_dt['analysisType'] = analysis_type_recoder.recode_column(
+    new_experiments_dt['partOfRelease'])
+analysis_type_recoder.report()
 
 
 # ///////////////////////////////////////////////////////////////////////////////
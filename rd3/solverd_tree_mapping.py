@@ -10,10 +10,13 @@ COMMENTS: see notes at the end of this script
 """
 
 import json
+from itertools import groupby
+from operator import itemgetter
 from os import environ
-from tqdm import tqdm
 from rd3tools.molgenis import Molgenis
-from rd3tools.utils import print2, flatten_data
+from rd3tools.cache import SnapshotCache
+from rd3tools.datatable import is_in
+from rd3tools.utils import print2
 from datatable import dt, f
 from dotenv import load_dotenv
 load_dotenv()
@@ -22,6 +25,9 @@ load_dotenv()
 rd3 = Molgenis(environ['MOLGENIS_PROD_HOST'])
 rd3.login(environ['MOLGENIS_PROD_USR'], environ['MOLGENIS_PROD_PWD'])
 
+# tables are kept on disk and only changed rows are retrieved on the next run
+cache = SnapshotCache(rd3)
+
 
 def init_json(_index: int = None, subject_id: str = None, family_id: str = None):
     """Init JSON object for top-level subject metadata
@@ -76,7 +82,9 @@ def init_child_json(
 
 
 def get_table_attribs(pkg_entity: str = None, attributes: str = None, nested_columns: str = None):
-    """Retrieve a subset data from a specific table in a database
+    """Retrieve a subset data from a specific table in a database (via the
+    snapshot cache)
+
     :param pkg_entity: the name of the table in emx format (pkg_entity)
     :type pkg_entity: str
 
@@ -90,13 +98,83 @@ def get_table_attribs(pkg_entity: str = None, attributes: str = None, nested_col
     :return: dataset
     :rtype: datatable frame
     """
-    data_raw = rd3.get(pkg_entity, attributes=attributes, batch_size=10000)
+    return cache.get(
+        pkg_entity,
+        attributes=attributes,
+        col_patterns=nested_columns or 'id|value'
+    )
+
+
+def unique_values(values: list = None):
+    """Unique values of a sorted list in the order of `dt.unique` (missing
+    values first)"""
+    return [value for value, _ in groupby(values)]
+
+
+def build_tree(summary_dt):
+    """Build the patient tree dataset in a single pass
+
+    Rows must be sorted by subject, sample, and experiment so that the records
+    of a subject (and of a sample) are contiguous. Each group is converted
+    into a nested json object (subject > samples > experiments) and the frame
+    is created once all rows have been collected.
+
+    :param summary_dt: dataset with the columns belongsToSubject, fid,
+        sampleID, and experimentID
+    :type summary_dt: datatable frame
+
+    :return: dataset with the columns id, subjectID, fid, and json
+    :rtype: datatable frame
+    """
+    rows = zip(*summary_dt[:, (f.belongsToSubject, f.fid, f.sampleID, f.experimentID)].to_list())
+    tree = {'id': [], 'subjectID': [], 'fid': [], 'json': []}
 
-    if bool(nested_columns):
-        data_flat = flatten_data(data_raw, 'subjectID')
-        return dt.Frame(data_flat)
+    for (index, (subj_id, subj_rows)) in enumerate(groupby(rows, key=itemgetter(0))):
+        subj_rows = list(subj_rows)
+        family_id = subj_rows[0][1]
+        subj_json = init_json(_index=index, subject_id=subj_id, family_id=family_id)
+        subj_tree_json = None
+
+        # compile samples and experiments
+        subj_sample_ids = unique_values([row[2] for row in subj_rows])
+        if bool(subj_sample_ids) and subj_sample_ids != [None]:
+            subj_json['children'] = []
+
+            # loop through samples; the rows of each sample are contiguous
+            samples = groupby(subj_rows, key=itemgetter(2))
+            for (sample_index, (sample_id, sample_rows)) in enumerate(samples):
+                sample_json = init_child_json(
+                    _index=f"{index}.{sample_index}",
+                    _id=sample_id,
+                    group='sample',
+                    table='samples',
+                    column='sampleID'
+                )
 
-    return dt.Frame(data_raw)
+                # detect experiment IDs and loop through
+                subj_expr_ids = unique_values([row[3] for row in sample_rows])
+                if bool(subj_expr_ids) and subj_expr_ids != [None]:
+                    sample_json['children'] = []
+                    for (expr_index, expr_id) in enumerate(subj_expr_ids):
+                        expr_json = init_child_json(
+                            _index=f"{index}.{sample_index}.{expr_index}",
+                            _id=expr_id,
+                            group='experiment',
+                            table='labinfo',
+                            column='experimentID'
+                        )
+                        sample_json['children'].append(expr_json)
+
+                # add sample json object to subject level json
+                subj_json['children'].append(sample_json)
+            subj_tree_json = json.dumps(subj_json)
+
+        tree['id'].append(f"RD-{index}")
+        tree['subjectID'].append(subj_id)
+        tree['fid'].append(family_id)
+        tree['json'].append(subj_tree_json)
+
+    return dt.Frame(tree, types=[dt.Type.str32] * len(tree))
 
 
 if __name__ == '__main__':
@@ -115,24 +193,13 @@ if __name__ == '__main__':
         nested_columns='subjectID'
     )
 
-    experiments_data = rd3.get(
-        'solverd_labinfo',
-        attributes="experimentID,sampleID",
-        batch_size=10000
+    # samples are collapsed into a comma separated string
+    experiments_dt = get_table_attribs(
+        pkg_entity='solverd_labinfo',
+        attributes='experimentID,sampleID',
+        nested_columns='sampleID'
     )
 
-    # for row in solverdExperiments:
-    for row in experiments_data:
-        if 'sampleID' in row:
-            if bool(row['sampleID']):
-                row['sampleID'] = ','.join([
-                    item['sampleID'] for item in row['sampleID']
-                ])
-            else:
-                row['sampleID'] = None
-    experiments_dt = dt.Frame(experiments_data)
-    del experiments_dt['_href']
-
     # ///////////////////////////////////////
 
     # Summarise data
@@ -147,11 +214,8 @@ if __name__ == '__main__':
 
     # add missing samples
     print2('Adding samples that do not have experiment metadata (yet)....')
-    summary_dt_sample_ids = summary_dt['sampleID'].to_list()[0]
-    samples_dt['is_missing'] = dt.Frame([
-        value not in summary_dt_sample_ids
-        for value in samples_dt['sampleID'].to_list()[0]
-    ])
+    samples_dt['is_missing'] = is_in(
+        samples_dt['sampleID'], summary_dt['sampleID'], negate=True)
 
     missing_samples_dt = samples_dt[
         (f.is_missing), (f.belongsToSubject, f.sampleID)][
@@ -168,11 +232,8 @@ if __name__ == '__main__':
 
     # add missing subjects
     print2('Adding missing subjects that do not have samples yet....')
-    summary_dt_subject_ids = summary_dt['belongsToSubject'].to_list()[0]
-    subjects_dt['is_missing'] = dt.Frame([
-        value not in summary_dt_subject_ids
-        for value in subjects_dt['subjectID'].to_list()[0]
-    ])
+    subjects_dt['is_missing'] = is_in(
+        subjects_dt['subjectID'], summary_dt['belongsToSubject'], negate=True)
 
     missing_subjects_dt = subjects_dt[f.is_missing, :]
     missing_subjects_dt.names = {'subjectID': 'belongsToSubject'}
@@ -185,68 +246,12 @@ if __name__ == '__main__':
 
     # create json dataset
     print2('Building tree dataset....')
-    tree_dt = dt.Frame([
-        {'id': '', 'belongsToSubject': '', 'fid': '', 'json': ''}])
-
-    summary_subject_ids = dt.unique(
-        summary_dt['belongsToSubject']).to_list()[0]
-
-    for (index, subj_id) in enumerate(tqdm(summary_subject_ids)):
-
-        # filter data for subject and init json
-        subj_row = summary_dt[f.belongsToSubject == subj_id, :]
-        new_subj_row = subj_row[0, (f.belongsToSubject, f.fid)]
-        new_subj_row['id'] = f"RD-{index}"
-
-        subj_json = init_json(
-            _index=index,
-            subject_id=subj_id,
-            family_id=subj_row['fid'].to_list()[0][0]
-        )
-
-        # compile samples and experiments
-        subj_sample_ids = dt.unique(subj_row['sampleID']).to_list()[0]
-        if bool(subj_sample_ids) and str(subj_sample_ids) != '[None]':
-            subj_json['children'] = []
-
-            # loop through samples
-            for (sample_index, sample_id) in enumerate(subj_sample_ids):
-                sample_json = init_child_json(
-                    _index=f"{index}.{sample_index}",
-                    _id=sample_id,
-                    group='sample',
-                    table='samples',
-                    column='sampleID'
-                )
-
-                # detect experiment IDs and loop through
-                subj_expr_ids = dt.unique(
-                    subj_row[f.sampleID == sample_id, f.experimentID]).to_list()[0]
-                if bool(subj_expr_ids) and str(subj_expr_ids) != '[None]':
-                    sample_json['children'] = []
-                    for (expr_index, expr_id) in enumerate(subj_expr_ids):
-                        expr_json = init_child_json(
-                            _index=f"{index}.{sample_index}.{expr_index}",
-                            _id=expr_id,
-                            group='experiment',
-                            table='labinfo',
-                            column='experimentID'
-                        )
-                        sample_json['children'].append(expr_json)
-
-                # add sample json object to subject level json
-                subj_json['children'].append(sample_json)
-
-            # add json to tree_data
-            new_subj_row['json'] = json.dumps(subj_json)
-        tree_dt = dt.rbind(tree_dt, new_subj_row, force=True)
+    tree_dt = build_tree(summary_dt)
 
     # ///////////////////////////////////////
 
-    # drop first row and importy
+    # import
     print2('Importing data....')
-    tree_dt = tree_dt[f.id != '', :]
-    tree_dt.names = {'belongsToSubject': 'subjectID'}
     rd3.delete('rd3stats_treedata')
     rd3.import_dt('rd3stats_treedata', tree_dt)
     rd3.logout()
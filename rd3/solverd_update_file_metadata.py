@@ -11,10 +11,10 @@
 # identifiers.
 #///////////////////////////////////////////////////////////////////////////////
 
-from rd3.utils.utils import flattenDataset, timestamp
-from rd3.api.molgenis2 import Molgenis
+from rd3tools.molgenis import Molgenis
+from rd3tools.utils import iter_flatten_data
+from rd3tools.datatable import dt_from_records
 from dotenv import load_dotenv
-from datatable import dt,f
 from os import environ
 load_dotenv()
 
@@ -26,10 +26,11 @@ rd3.login(environ['MOLGENIS_PROD_USR'], environ['MOLGENIS_PROD_PWD'])
 # ~ 1 ~
 # Retrieve metadata and prep data objects
 
-files = rd3.get(entity='solverd_files', batch_size=10000)
-filesDT = flattenDataset(
-  data=files,
-  columnPatterns='subjectID|sampleID|experimentID'
-)
-
-filesDT = dt.Frame(filesDT)
\ No newline at end of file
+# rows are streamed and flattened page by page to keep memory bounded
+files = rd3.iter_rows(entity='solverd_files')
+filesDT = dt_from_records(
+  iter_flatten_data(
+    data=files,
+    col_patterns='subjectID|sampleID|experimentID'
+  )
+)
\ No newline at end of file
@@ -21,6 +21,7 @@
 
 from rd3.api.molgenis2 import Molgenis
 from rd3.api.github import github
+from rd3tools.datatable import is_in, flag_membership
 from dotenv import load_dotenv
 from datatable import dt, f, fread
 from tqdm import tqdm
@@ -147,10 +148,7 @@ del hpo_acc
 # Identify new codes
 
 # create a bool attrib that indicates a code is not in RD3
-hpoDT['codeIsNew'] = dt.Frame([
-  value not in hpoCodes
-  for value in tqdm(hpoDT['id'].to_list()[0])
-])
+hpoDT['codeIsNew'] = is_in(hpoDT['id'], hpoCodes, negate=True)
 
 # summarise data
 hpoDT[:, dt.count(), dt.by('codeIsNew')]
@@ -171,9 +169,6 @@ rd3_prod.importDatatableAsCsv(pkg_entity = 'rd3_phenotype', data = newHpoDT)
 # run check against missing cases
 
 missingCodesDT = fread('data/freeze3_hpo_codes.csv')
-missingCodesDT['status'] = dt.Frame([
-  value in newHpoDT['id'].to_list()[0]
-  for value in missingCodesDT['code'].to_list()[0]
-])
+missingCodesDT['status'] = flag_membership(missingCodesDT, 'code', newHpoDT, 'id')
 
 missingCodesDT[:, dt.count(), dt.by(f.status)]
\ No newline at end of file
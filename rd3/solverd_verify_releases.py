@@ -11,6 +11,7 @@
 
 from rd3.utils.utils import flattenDataset
 from rd3.api.molgenis2 import Molgenis
+from rd3tools.datatable import dt_collapse, dt_left_join
 from dotenv import load_dotenv
 from datatable import dt, f,fread
 from os import environ
@@ -57,17 +58,38 @@ releaseDT['shouldUpdate'] = None
 # del releaseDT['shouldUpdate']
 
 # check to see if all SolveRD subjects are missing the 'official' release info
-releaseSubjectIDs = releaseDT['participantID'].to_list()[0]
-
-for id in releaseSubjectIDs:
+# the existing releases are joined by subject ID; the official release of a
+# participant is the release of its first record
+subjectIDs = set(subjectIDs)
+releaseDT = dt_left_join(
+  releaseDT,
+  subjectsDT,
+  on='participantID',
+  lookup_on='subjectID',
+  columns={'existingRelease': 'partOfRelease'}
+)
+officialReleases = {}
+for id, release in releaseDT[:, ['participantID', 'partOfRelease']].to_tuples():
+  officialReleases.setdefault(id, release)
+
+shouldUpdate = []
+isUnknown = []
+for id, existingRelease in releaseDT[:, ['participantID', 'existingRelease']].to_tuples():
+  officialRelease = officialReleases[id]
   if id in subjectIDs:
-    officialRelease = releaseDT[f.participantID==id,'partOfRelease'].to_list()[0][0]
-    existingRelease = subjectsDT[f.subjectID==id,'partOfRelease'].to_list()[0][0]
+    isUnknown.append(None)
     if bool(officialRelease) and bool(existingRelease):
-      releaseDT[f.participantID==id,'shouldUpdate'] = officialRelease not in existingRelease
+      shouldUpdate.append(officialRelease not in existingRelease)
+    else:
+      shouldUpdate.append(None)
   else:
     print(f"Warning: subjectID '{id}' does not exist in RD3")
-    releaseDT[f.participantID==id,'isUnknown'] = True
+    isUnknown.append(True)
+    shouldUpdate.append(None)
+
+releaseDT['shouldUpdate'] = dt.Frame(shouldUpdate, type=dt.Type.bool8)
+releaseDT['isUnknown'] = dt.Frame(isUnknown, type=dt.Type.bool8)
+del releaseDT['existingRelease']
 
 
 # review mappings
@@ -78,15 +100,19 @@ releaseDT[f.shouldUpdate, :][:, dt.count(), dt.by(f.partOfRelease)]
 releaseDT[f.isUnknown, :]
 
 # update solverd_subjects with missing release info
-updateIDs = releaseDT[f.shouldUpdate, 'subjectID'].to_list()[0]
-
-for id in updateIDs:
-  releases = subjectsDT[f.subjectID==id,'partOfRelease'].to_list()[0][0].split(',')
-  newReleases = releaseDT[f.subjectID==id,'partOfRelease'].to_list()[0]
-  for rel in newReleases:
-    releases.append(rel)
-  releases.sort()
-  subjectsDT[f.subjectID==id,'partOfRelease'] = ','.join(list(set(releases)))
+updateIDs = set(releaseDT[f.shouldUpdate, 'subjectID'].to_list()[0])
+subjectsDT = dt_left_join(
+  subjectsDT,
+  dt_collapse(releaseDT, group_by='subjectID', column='partOfRelease'),
+  on='subjectID',
+  columns={'newReleases': 'partOfRelease'}
+)
+subjectsDT['partOfRelease'] = dt.Frame([
+  ','.join(sorted((set(existing.split(',')) | set((newReleases or '').split(','))) - {''}))
+  if id in updateIDs else existing
+  for id, existing, newReleases in subjectsDT[:, ['subjectID', 'partOfRelease', 'newReleases']].to_tuples()
+], type=dt.Type.str32)
+del subjectsDT['newReleases']
   
 # import  
 rd3.importDatatableAsCsv(pkg_entity='solverd_subjects', data=subjectsDT)
\ No newline at end of file
@@ -2,25 +2,116 @@
 #' FILE: clustertools.py
 #' AUTHOR: David Ruvolo
 #' CREATED: 2022-04-25
-#' MODIFIED: 2022-09-19
+#' MODIFIED: 2026-10-17
 #' PURPOSE: methods for interacting with files on the cluster
 #' STATUS: stable
-#' PACKAGES: os, re, json, io, csv, rd3.utils
-#' COMMENTS: NA
+#' PACKAGES: os, re, json, io, csv, shlex, tarfile, threading, rd3.utils
+#' COMMENTS: All commands share one SSH connection (ControlMaster). The
+#' master connection is started once in the background (see `connect`). Call
+#' `close` when you are done to stop the master connection.
 #'////////////////////////////////////////////////////////////////////////////
 
 from rd3.utils.utils import addForwardSlash, statusMsg
-from os.path import basename
+from os.path import basename, expanduser, normpath
 import subprocess
+import threading
+import tarfile
+import shlex
 import re
 import json
 import io
 import csv
 
 class clustertools:
-  def __init__(self, connectionMethod):
-    """Cluster Tools"""
+  def __init__(self, connectionMethod, persist: str = '10m'):
+    """Cluster Tools
+    Run commands on the cluster over a single persistent SSH connection.
+    The first command starts a master connection that is reused by all
+    other commands until `close` is called or the connection has been idle
+    for `persist`. Commands never start a master themselves; if the master
+    is not available, they use a separate connection.
+
+    @param connectionMethod ssh host or alias (e.g., 'corridor+fender')
+    @param persist how long the master connection is kept open when idle
+    """
     self.method = connectionMethod
+    self.persist = persist
+    self.controlPath = expanduser('~/.ssh/rd3-cm-%C')
+    self.sshOptions = ['-o', f'ControlPath={self.controlPath}']
+    self._connected = False
+    self._connectLock = threading.Lock()
+
+  def connect(self):
+    """Connect
+    Start the shared master connection in the background if it is not
+    running. The output of the master is not captured: a background master
+    that keeps a captured stdout or stderr open blocks the command that
+    started it until the connection is closed.
+
+    @return True if the master connection is available
+    """
+    with self._connectLock:
+      if self._connected:
+        return True
+      check = subprocess.run(
+        ['ssh', *self.sshOptions, '-O', 'check', self.method],
+        stdin = subprocess.DEVNULL,
+        stdout = subprocess.DEVNULL,
+        stderr = subprocess.DEVNULL
+      )
+      if check.returncode != 0:
+        master = subprocess.run(
+          [
+            'ssh', *self.sshOptions,
+            '-o', f'ControlPersist={self.persist}',
+            '-M', '-N', '-f', self.method
+          ],
+          stdin = subprocess.DEVNULL,
+          stdout = subprocess.DEVNULL,
+          stderr = subprocess.DEVNULL
+        )
+        if master.returncode != 0:
+          statusMsg('Unable to start a shared connection to', self.method)
+          return False
+      self._connected = True
+      return True
+
+  def _ssh(self, *command):
+    """SSH command
+    Build an ssh command that uses the shared connection
+
+    @param command remote command and arguments
+    @return list
+    """
+    self.connect()
+    return ['ssh', *self.sshOptions, '-o', 'ControlMaster=no', self.method, *command]
+
+  def _run(self, *command, timeout: int = None):
+    """Run command
+    Run a command on the cluster and return the completed process
+
+    @param command remote command and arguments
+    @param timeout number of seconds to wait before the command is stopped
+    @return subprocess.CompletedProcess (stdout as bytes)
+    """
+    return subprocess.run(
+      self._ssh(*command),
+      stdin = subprocess.DEVNULL,
+      stdout = subprocess.PIPE,
+      stderr = subprocess.PIPE,
+      timeout = timeout
+    )
+
+  def close(self):
+    """Close
+    Stop the shared master connection
+    """
+    subprocess.run(
+      ['ssh', *self.sshOptions, '-O', 'exit', self.method],
+      stdout = subprocess.DEVNULL,
+      stderr = subprocess.DEVNULL
+    )
+    self._connected = False
 
   def listFiles(self, path, filter: str=None, quietly: bool=False):
     """List Files
@@ -32,18 +123,11 @@ class clustertools:
     
     @return a list of dictionaries
     """
-    available_files = subprocess.Popen(
-      ['ssh', self.method, 'ls', path],
-      stdout = subprocess.PIPE,
-      stdin = subprocess.PIPE,
-      stderr= subprocess.PIPE,
-      universal_newlines=True
-    )
+    available_files = self._run('ls', shlex.quote(path))
     path = addForwardSlash(path)
     data = []
-    for f in available_files.stdout:
+    for f in available_files.stdout.decode('utf-8').splitlines():
       data.append({ 'filename': f.strip(), 'filepath': path + f.strip() })
-    available_files.kill()
     if filter:
       filtered = []
       for d in data:
@@ -65,18 +149,10 @@ class clustertools:
       @param path location of a file
       @return list of dictionaries, contents of file 
       """
-      proc = subprocess.Popen(
-          ['ssh', self.method, 'cat', path],
-          stdout = subprocess.PIPE,
-          stdin = subprocess.PIPE,
-          stderr = subprocess.PIPE,
-          universal_newlines=True
-      )
-      proc.wait()
+      proc = self._run('cat', shlex.quote(path))
       data= []
-      for line in proc.stdout:
+      for line in proc.stdout.decode('utf-8').splitlines():
           data.append(line.strip())
-      proc.kill()
       return data
       
   def readCsv(self, path: str = None):
@@ -86,7 +162,7 @@ class clustertools:
     @return list of dictionaries where each dict is a row in the csv file
     """
     proc = subprocess.Popen(
-      ['ssh', self.method, 'cat', path],
+      self._ssh('cat', shlex.quote(path)),
       stdout = subprocess.PIPE
     )
     procWrapper = io.TextIOWrapper(proc.stdout)
@@ -94,7 +170,7 @@ class clustertools:
     data = []
     for line in csvReader:
       data.append(dict(line))
-    proc.kill()
+    proc.wait()
     return data
 
   def readJson(self, path: str = None):
@@ -104,21 +180,11 @@ class clustertools:
     @param path location of the file
     @return list containing contents of a json file
     """
-    proc = subprocess.Popen(
-      ['ssh', self.method, 'cat', path],
-      stdout = subprocess.PIPE,
-      stdin = subprocess.PIPE,
-      stderr = subprocess.PIPE,
-      universal_newlines=True
-    )
     try:
-      raw = proc.communicate(timeout=15)
-      data = json.loads(raw[0])
-      proc.kill()
-      return data
+      proc = self._run('cat', shlex.quote(path), timeout=15)
+      return json.loads(proc.stdout)
     except subprocess.TimeoutExpired:
       statusMsg('Error: unable to fetch file {}'.format(str(basename(path))))
-      proc.kill()
       return ''
           
   def md5sum(self,path: str = None):
@@ -128,13 +194,187 @@ class clustertools:
     @param path location of the file run the checksum
     @return string containing checksum value of a file
     """
+    proc = self._run('md5sum', shlex.quote(path))
+    if proc.returncode != 0:
+      statusMsg('Error: unable to run checksum on {}'.format(str(basename(path))))
+      return None
+    value = proc.stdout.decode('utf-8').split()[0]
+    return value
+
+  def md5sumMany(self, paths: list = None, workers: int = 8, filesPerProcess: int = 20):
+    """Run checksum on many files
+    Run md5sum in parallel on the cluster (`xargs -P`) and stream the results
+    back over the shared connection. Paths are sent through stdin, so the
+    number of files is not limited by the maximum length of a command.
+
+    @param paths list of file locations
+    @param workers number of md5sum processes to run at the same time
+    @param filesPerProcess number of files passed to each md5sum process
+    @return dictionary of file path and checksum
+    """
     proc = subprocess.Popen(
-      ['ssh', self.method, 'md5sum', path],
-      stdout = subprocess.PIPE,
+      self._ssh(
+        'xargs', '-0', '-P', str(workers), '-n', str(filesPerProcess),
+        'md5sum', '--'
+      ),
       stdin = subprocess.PIPE,
-      stderr = subprocess.PIPE,
-      universal_newlines=True
+      stdout = subprocess.PIPE,
+      stderr = subprocess.DEVNULL
     )
-    value = proc.stdout.read().split()[0]
-    proc.kill()
-    return value
+
+    # write paths in a separate thread so that a full stdout buffer cannot
+    # block the remote processes while input is still being sent
+    def sendPaths():
+      for path in paths:
+        proc.stdin.write(path.encode('utf-8') + b'\0')
+      proc.stdin.close()
+
+    sender = threading.Thread(target=sendPaths)
+    sender.start()
+
+    data = {}
+    for line in proc.stdout:
+      line = line.decode('utf-8').rstrip('\n')
+      if not line:
+        continue
+
+      # md5sum escapes file names that contain a backslash or newline
+      escaped = line.startswith('\\')
+      checksum, path = line[int(escaped):].split('  ', 1)
+      if escaped:
+        path = re.sub(r'\\(.)', lambda m: '\n' if m.group(1) == 'n' else m.group(1), path)
+      data[path] = checksum
+
+    sender.join()
+    proc.wait()
+
+    missing = len(set(paths)) - len(data)
+    if missing > 0:
+      statusMsg('Error: unable to run checksum on {} files'.format(missing))
+    return data
+
+  def verifyChecksums(self, files: list = None, pathAttr: str = 'path', md5Attr: str = 'md5', workers: int = 8):
+    """Verify checksums
+    Compare the checksums of files on the cluster with known values (e.g.,
+    the `md5` column in `solverd_files`)
+
+    @param files list of dictionaries containing the path and checksum
+    @param pathAttr name of the key that contains the location of the file
+    @param md5Attr name of the key that contains the expected checksum
+    @param workers number of md5sum processes to run at the same time
+    @return list of dictionaries (path, expected, observed, status) for all
+      files that are missing or have a different checksum
+    """
+    expected = {
+      file[pathAttr]: file.get(md5Attr)
+      for file in files
+      if file.get(pathAttr)
+    }
+    observed = self.md5sumMany(paths=list(expected.keys()), workers=workers)
+
+    report = []
+    for path, value in expected.items():
+      if path not in observed:
+        status = 'missing'
+      elif not value:
+        status = 'no reference'
+      elif observed[path] != value.strip().lower():
+        status = 'mismatch'
+      else:
+        continue
+      report.append({
+        'path': path,
+        'expected': value,
+        'observed': observed.get(path),
+        'status': status
+      })
+
+    statusMsg(
+      'Verified', len(expected), 'files:',
+      len([row for row in report if row['status'] == 'mismatch']), 'mismatches,',
+      len([row for row in report if row['status'] == 'missing']), 'missing,',
+      len([row for row in report if row['status'] == 'no reference']), 'without a reference'
+    )
+    return report
+
+  def readFiles(self, paths: list = None, batchSize: int = 500):
+    """Read files
+    Read the contents of many files using one remote call per batch. Files
+    are sent as a tar stream over the shared connection.
+
+    @param paths list of file locations
+    @param batchSize number of files per remote call
+    @return dictionary of file path and contents (bytes)
+    """
+    data = {}
+    for batch in range(0, len(paths), batchSize):
+      batchPaths = paths[batch:batch+batchSize]
+      names = {normpath(path).lstrip('/'): path for path in batchPaths}
+      proc = subprocess.Popen(
+        self._ssh('tar', '-cf', '-', *[shlex.quote(path) for path in batchPaths]),
+        stdin = subprocess.DEVNULL,
+        stdout = subprocess.PIPE,
+        stderr = subprocess.DEVNULL
+      )
+      with tarfile.open(fileobj=proc.stdout, mode='r|') as archive:
+        for member in archive:
+          if member.isfile():
+            path = names.get(normpath(member.name).lstrip('/'), member.name)
+            data[path] = archive.extractfile(member).read()
+      proc.wait()
+      missing = [path for path in batchPaths if path not in data]
+      if missing:
+        statusMsg('Error: unable to fetch {} files'.format(len(missing)))
+    return data
+
+  def readDirectory(self, path: str = None, filter: str = None):
+    """Read directory
+    Read the contents of all files in a directory in one remote call
+
+    @param path location of the directory
+    @param filter a pattern used to select files by name
+    @return dictionary of file path and contents (bytes)
+    """
+    path = addForwardSlash(path)
+    proc = subprocess.Popen(
+      self._ssh('tar', '-cf', '-', '-C', shlex.quote(path), '.'),
+      stdin = subprocess.DEVNULL,
+      stdout = subprocess.PIPE,
+      stderr = subprocess.DEVNULL
+    )
+    data = {}
+    pattern = re.compile(filter) if filter else None
+    with tarfile.open(fileobj=proc.stdout, mode='r|') as archive:
+      for member in archive:
+        name = normpath(member.name)
+        if member.isfile() and (pattern is None or pattern.search(basename(name))):
+          data[path + name] = archive.extractfile(member).read()
+    proc.wait()
+    return data
+
+  def readTextFiles(self, paths: list = None):
+    """Read text files
+    Read many text files (i.e., PED) in one remote call per batch
+
+    @param paths list of file locations
+    @return dictionary of file path and a list of lines
+    """
+    return {
+      path: [line.strip() for line in contents.decode('utf-8').splitlines()]
+      for path, contents in self.readFiles(paths).items()
+    }
+
+  def readJsonFiles(self, paths: list = None):
+    """Read Json files
+    Read many json files (i.e., phenopackets) in one remote call per batch
+
+    @param paths list of file locations
+    @return dictionary of file path and the contents of the file
+    """
+    data = {}
+    for path, contents in self.readFiles(paths).items():
+      try:
+        data[path] = json.loads(contents)
+      except ValueError:
+        statusMsg('Error: unable to parse file {}'.format(str(basename(path))))
+    return data
@@ -0,0 +1,180 @@
+#'////////////////////////////////////////////////////////////////////////////
+#' FILE: codetools.py
+#' AUTHOR: David Ruvolo
+#' CREATED: 2026-10-17
+#' MODIFIED: 2026-10-17
+#' PURPOSE: normalise and validate HPO and disease codes
+#' STATUS: stable
+#' PACKAGES: **see below**
+#' COMMENTS: NA
+#'////////////////////////////////////////////////////////////////////////////
+
+from collections import Counter
+from functools import lru_cache
+import re
+
+# Patterns are compiled once and shared by all normalizers. Each rule is a
+# pair of a pattern and a replacement that are applied in order.
+CODE_RULES = {
+  'hpo': [
+    (re.compile(r'^H?P[:_]?(?=[0-9])'), 'HP_')
+  ],
+  'disease': [
+    (re.compile(r'^(Orphanet|ORDO)[:_]\s*'), 'ORDO_'),
+    (re.compile(r'^(OMIM|MIM)[:_]\s*'), 'MIM_'),
+    (re.compile(r'^HP:'), 'HP_')
+  ]
+}
+
+# pattern of a valid code after normalisation
+CODE_FORMATS = {
+  'hpo': re.compile(r'^HP_[0-9]+$'),
+  'disease': re.compile(r'^((ORDO|MIM|HP)_[0-9]+|HGNC[:_][0-9]+)$')
+}
+
+class CodeNormalizer:
+  """Code Normalizer
+  Normalise, deduplicate, and validate HPO or disease codes. Raw values are
+  cleaned using precompiled patterns and the result of each distinct raw
+  value is cached, so repeated codes across phenopackets or columns are only
+  processed once. Codes with an invalid format are removed and unknown codes
+  are kept. Both are counted across calls (see `report`).
+
+  @param codeType type of code to normalise: 'hpo' or 'disease'
+  @param referenceCodes known codes (e.g., ids of `rd3_phenotype`). If None,
+    codes are only checked for a valid format.
+  @param mappings a dictionary containing 'incorrect' codes and new mappings
+  @param cacheSize maximum number of raw values to cache
+
+  @examples
+  ```
+  hpo = CodeNormalizer('hpo', referenceCodes=['HP_0001250'])
+  hpo.normalizeValue('HP:0001250, P:0001250,HP0000001,HP_12a')
+  #> (['HP_0001250', 'HP_0000001'], ['HP_0000001'])
+  ```
+  """
+  def __init__(self, codeType: str = 'hpo', referenceCodes: list = None, mappings: dict = None, cacheSize: int = 100000):
+    if codeType not in CODE_RULES:
+      raise ValueError(f"Unknown code type '{codeType}'. Use: {', '.join(CODE_RULES)}")
+    self.codeType = codeType
+    self.rules = CODE_RULES[codeType]
+    self.codeFormat = CODE_FORMATS[codeType]
+    self.referenceCodes = frozenset(referenceCodes) if referenceCodes is not None else None
+    self.mappings = mappings or {}
+    self.unknownCodes = Counter()
+    self.invalidCodes = Counter()
+    self.normalize = lru_cache(maxsize=cacheSize)(self._normalize)
+
+  def _normalize(self, code: str = None):
+    """Normalise a single raw code
+
+    @param code a raw code
+    @return normalised code or None if the value is empty
+    """
+    value = code.replace('\n', '').strip()
+    for pattern, replacement in self.rules:
+      value = pattern.sub(replacement, value)
+    value = self.mappings.get(value, value)
+    return value or None
+
+  def isValid(self, code: str = None):
+    """Is Valid
+    @param code a normalised code
+    @return True if the format is valid
+    """
+    return bool(self.codeFormat.match(code))
+
+  def isKnown(self, code: str = None):
+    """Is Known
+    @param code a normalised code
+    @return True if the code exists in the reference codes or, if there are
+      no reference codes, if the format is valid
+    """
+    if self.referenceCodes is None:
+      return self.isValid(code)
+    return code in self.referenceCodes
+
+  def _validate(self, values: list = None):
+    """Normalise, deduplicate, and validate raw codes
+    @param values list of raw codes
+    @return tuple of valid codes, unknown codes, and codes with an invalid
+      format. Unknown codes are also in the valid codes.
+    """
+    codes = []
+    invalid = []
+    for code in dict.fromkeys(filter(None, map(self.normalize, values))):
+      (codes if self.isValid(code) else invalid).append(code)
+    return codes, [code for code in codes if not self.isKnown(code)], invalid
+
+  def _count(self, unknown: list = None, invalid: list = None):
+    """Add unknown and invalid codes to the report"""
+    self.unknownCodes.update(unknown)
+    self.invalidCodes.update(invalid)
+
+  def normalizeValues(self, values: list = None):
+    """Normalise values
+    Normalise and deduplicate a list of raw codes. The order of first
+    occurrence is kept and codes with an invalid format are removed.
+
+    @param values list of raw codes
+    @return tuple of normalised codes and unknown codes
+    """
+    codes, unknown, invalid = self._validate(values)
+    self._count(unknown, invalid)
+    return codes, unknown
+
+  def normalizeValue(self, value: str = None, separator: str = ','):
+    """Normalise value
+    Normalise a string containing one or more codes
+
+    @param value a string containing one or more codes (e.g., 'HP:001,HP_002')
+    @param separator character that separates codes
+
+    @return tuple of normalised codes and unknown codes
+    """
+    if not value:
+      return [], []
+    return self.normalizeValues(value.split(separator))
+
+  def normalizeColumn(self, column, separator: str = ','):
+    """Normalise column
+    Normalise all values of a column in one call. Each distinct value is only
+    processed once.
+
+    @param column a list of strings or a single datatable column
+    @param separator character that separates codes in a value
+
+    @return dictionary with a list of normalised values ('codes') and a list
+      of unknown codes ('unknown') for each row. Values are comma separated
+      strings or None.
+    """
+    if hasattr(column, 'to_list'):
+      column = column.to_list()[0]
+
+    results = {}
+    data = {'codes': [], 'unknown': []}
+    for value in column:
+      if value not in results:
+        results[value] = self._validate(value.split(separator)) if value else ([], [], [])
+      codes, unknown, invalid = results[value]
+      self._count(unknown, invalid)
+      data['codes'].append(','.join(codes) or None)
+      data['unknown'].append(','.join(unknown) or None)
+    return data
+
+  def report(self):
+    """Report
+    Summarise all unknown codes found since the normalizer was created
+
+    @return list of dictionaries (code, count, status). Status is
+      'invalid.value' if the format is not valid (these codes are removed) or
+      'unknown' if the code is not in the reference codes.
+    """
+    rows = [
+      {'code': code, 'count': count, 'status': 'invalid.value'}
+      for code, count in self.invalidCodes.items()
+    ] + [
+      {'code': code, 'count': count, 'status': 'unknown'}
+      for code, count in self.unknownCodes.items()
+    ]
+    return sorted(rows, key=lambda row: (-row['count'], row['code']))
@@ -0,0 +1,209 @@
+#'////////////////////////////////////////////////////////////////////////////
+#' FILE: pedigreetools.py
+#' AUTHOR: David Ruvolo
+#' CREATED: 2026-10-17
+#' MODIFIED: 2026-10-17
+#' PURPOSE: resolve family relationships between RD3 subjects
+#' STATUS: stable
+#' PACKAGES: NA
+#' COMMENTS: NA
+#'////////////////////////////////////////////////////////////////////////////
+
+class PedigreeGraph:
+  """Pedigree Graph
+  Index subjects by identifier, parent, and family so that relationships
+  can be resolved without scanning all subjects. The graph is built once
+  in a single pass over the subjects.
+
+  A parent is only linked to a child if the parent is a subject that has a
+  family ID (`fid`). Parent IDs may be nested (i.e., {'subjectID': ...}) or
+  plain strings.
+
+  @param subjects list of dictionaries (e.g., `solverd_subjects`)
+
+  @examples
+  ```
+  graph = PedigreeGraph(subjects)
+  graph.parents('P0001')
+  #> {'mother': 'P0002', 'father': 'P0003'}
+  rows = graph.pedigreeMembers()
+  ```
+  """
+  def __init__(self, subjects: list = None):
+    self.subjects = {}
+    self.families = {}
+    self.mothers = {}
+    self.fathers = {}
+    self.childrenOfMother = {}
+    self.childrenOfFather = {}
+
+    for subject in subjects:
+      subjectId = subject['subjectID']
+      self.subjects[subjectId] = subject
+      if subject.get('fid'):
+        self.families.setdefault(subject['fid'], []).append(subjectId)
+
+    for subjectId, subject in self.subjects.items():
+      motherId = self._parentId(subject, 'mid')
+      fatherId = self._parentId(subject, 'pid')
+      if self._isLinked(motherId):
+        self.mothers[subjectId] = motherId
+        self.childrenOfMother.setdefault(motherId, []).append(subjectId)
+      if self._isLinked(fatherId) and fatherId != motherId:
+        self.fathers[subjectId] = fatherId
+        self.childrenOfFather.setdefault(fatherId, []).append(subjectId)
+
+    # full siblings share the same mother and father
+    self.siblingGroups = {}
+    for childId, motherId in self.mothers.items():
+      key = (motherId, self.fathers.get(childId))
+      self.siblingGroups.setdefault(key, []).append(childId)
+
+  def _parentId(self, subject: dict = None, attr: str = None):
+    """Get the identifier of a parent (mid or pid)"""
+    value = subject.get(attr)
+    if isinstance(value, dict):
+      return value.get('subjectID')
+    return value
+
+  def _isLinked(self, parentId: str = None):
+    """Is the parent a subject with a family ID"""
+    return bool(parentId) and bool(self.subjects.get(parentId, {}).get('fid'))
+
+  def isPatient(self, subjectId: str = None):
+    """Is Patient
+    A subject is a patient if a maternal or paternal ID is recorded
+
+    @param subjectId identifier of a subject
+    @return bool
+    """
+    subject = self.subjects.get(subjectId, {})
+    return 'mid' in subject or 'pid' in subject
+
+  def affected(self, subjectId: str = None):
+    """Affected
+    @param subjectId identifier of a subject
+    @return clinical status of a subject or None
+    """
+    return self.subjects.get(subjectId, {}).get('clinical_status')
+
+  def members(self, fid: str = None):
+    """Family members
+    @param fid family identifier
+    @return list of identifiers of the subjects in a family
+    """
+    return self.families.get(fid, [])
+
+  def parents(self, subjectId: str = None):
+    """Parents
+    @param subjectId identifier of a subject
+    @return dictionary with the identifiers of the mother and father
+    """
+    return {
+      'mother': self.mothers.get(subjectId),
+      'father': self.fathers.get(subjectId)
+    }
+
+  def children(self, subjectId: str = None):
+    """Children
+    @param subjectId identifier of a subject
+    @return list of identifiers of the children of a subject
+    """
+    return self.childrenOfMother.get(subjectId, []) + self.childrenOfFather.get(subjectId, [])
+
+  def grandparents(self, subjectId: str = None):
+    """Grandparents
+    @param subjectId identifier of a subject
+    @return dictionary of relation and the identifier of the grandparent.
+      Relations are 'maternal grandmother', 'maternal grandfather',
+      'paternal grandmother', 'paternal grandfather'
+    """
+    data = {}
+    for side, parentId in [('maternal', self.mothers.get(subjectId)), ('paternal', self.fathers.get(subjectId))]:
+      if parentId:
+        parent = self.subjects[parentId]
+        data[f'{side} grandmother'] = self._parentId(parent, 'mid')
+        data[f'{side} grandfather'] = self._parentId(parent, 'pid')
+    return {relation: value for relation, value in data.items() if value}
+
+  def siblings(self, subjectId: str = None):
+    """Full siblings
+    @param subjectId identifier of a subject
+    @return list of identifiers of subjects with the same mother and father
+    """
+    motherId = self.mothers.get(subjectId)
+    if not motherId:
+      return []
+    key = (motherId, self.fathers.get(subjectId))
+    return [child for child in self.siblingGroups.get(key, []) if child != subjectId]
+
+  def _row(self, pedigree: str, individual: str, affected, relative: str, relation: str = None):
+    """Create a row for the Pedigree members table"""
+    return {
+      'pedigree': pedigree,
+      'individual': individual,
+      'affected': affected,
+      'relative': relative,
+      'relation': relation
+    }
+
+  def pedigreeMembers(self):
+    """Pedigree members
+    Create the rows of the EMX2 Pedigree members table.
+
+    - subjects with a maternal or paternal ID are mapped as 'Patient'
+    - parents are mapped as 'Biological Mother' or 'Biological Father'
+    - parents of a patient who has children are mapped as grandparents of
+      those children
+    - subjects that were not mapped are added with themselves as relative
+    - children with the same parents and a known sex (F, M) are mapped as
+      'Full Sister' or 'Full Brother'
+
+    @return list of dictionaries
+    """
+    rows = []
+    for subjectId, subject in self.subjects.items():
+      fid = subject.get('fid')
+      if not fid:
+        continue
+      affected = subject.get('clinical_status')
+
+      if self.isPatient(subjectId):
+        rows.append(self._row(fid, subjectId, affected, subjectId, 'Patient'))
+
+      for childId in self.childrenOfMother.get(subjectId, []):
+        rows.append(self._row(fid, subjectId, affected, childId, 'Biological Mother'))
+      for childId in self.childrenOfFather.get(subjectId, []):
+        rows.append(self._row(fid, subjectId, affected, childId, 'Biological Father'))
+
+      if self.isPatient(subjectId):
+        grandparents = {
+          'Grandmother': self._parentId(subject, 'mid'),
+          'Grandfather': self._parentId(subject, 'pid')
+        }
+        for side, grandchildren in [
+          ('Maternal', self.childrenOfMother.get(subjectId, [])),
+          ('Paternal', self.childrenOfFather.get(subjectId, []))
+        ]:
+          for relation, grandparentId in grandparents.items():
+            if not grandparentId:
+              continue
+            for grandchildId in grandchildren:
+              rows.append(self._row(
+                fid, grandparentId, self.affected(grandparentId),
+                grandchildId, f'Biological {side} {relation}'
+              ))
+
+    mapped = {row['individual'] for row in rows}
+    for subjectId, subject in self.subjects.items():
+      fid = subject.get('fid')
+      if fid and subjectId not in mapped:
+        rows.append(self._row(fid, subjectId, subject.get('clinical_status'), subjectId))
+
+      sex = (subject.get('sex1') or {}).get('id')
+      if 'pid' in subject and sex in ['F', 'M']:
+        relation = 'Full Sister' if sex == 'F' else 'Full Brother'
+        for siblingId in self.siblings(subjectId):
+          rows.append(self._row(fid, subjectId, subject.get('clinical_status'), siblingId, relation))
+
+    return rows
@@ -2,7 +2,7 @@
 #' FILE: pedtools.py
 #' AUTHOR: David Ruvolo
 #' CREATED: 2022-08-04
-#' MODIFIED: 2022-08-04
+#' MODIFIED: 2026-10-17
 #' PURPOSE: PED file tools
 #' STATUS: stable
 #' PACKAGES: **see below**
@@ -10,6 +10,21 @@
 #'////////////////////////////////////////////////////////////////////////////
 
 from rd3.utils.utils import statusMsg
+from concurrent.futures import ThreadPoolExecutor
+from datatable import dt
+from os.path import basename
+
+# columns of a parsed PED row (see `_parseFileRow` and `_validateFileRow`)
+PED_COLUMNS = [
+  'id', 'subjectID', 'fid', 'mid', 'pid', 'sex1', 'clinical_status',
+  'unknownSexCode', 'unknownClinicalStatus', 'upload',
+  'error_id', 'error_mid', 'error_pid', 'pedID'
+]
+
+PED_COLUMN_TYPES = {
+  'clinical_status': dt.bool8,
+  'upload': dt.bool8
+}
 
 def _parseFileRow(row: dict = None):
   """Parse Pedigree File Row
@@ -54,7 +69,7 @@ def _validateFileRow(row: dict = None, ids: list = None, quiet=True):
 
   @param data a dict containing a single line of data from a PED file.
       This is the output from `pedtools.parseFileRow`
-  @param ids a list of IDs to compare to
+  @param ids a set of IDs to compare to
   @param a dictionary containing validated data
 
   @return a dictionary
@@ -79,26 +94,98 @@ def _validateFileRow(row: dict = None, ids: list = None, quiet=True):
     line['pid'] = None
   return line
 
+def _parseLines(contents, ids, filename, quiet=True):
+  """Parse and validate the lines of a PED file
+
+  @param contents list of lines
+  @param ids a set of reference IDs
+  @param filename name of the file
+  @param quiet if True, no messages will be printed
+
+  @return tuple of rows and lines with the wrong number of columns
+  """
+  data = []
+  errors = []
+  for lineNumber, line in enumerate(contents, start=1):
+    row = line.split()
+    if len(row) == 6:
+      rowData = _validateFileRow(row=_parseFileRow(row=row), ids=ids, quiet=quiet)
+      data.append(rowData)
+    elif row:
+      errors.append({
+        'file': filename,
+        'line': lineNumber,
+        'columns': len(row),
+        'message': f'{len(row)} columns instead of 6'
+      })
+  return data, errors
+
 def parseFileContents(contents, ids, filename, quiet=True):
   """Extract contents from a PED file
 
-  Extract the contents of a pedigree file
+  Extract the contents of a pedigree file. Columns may be separated by tabs
+  or spaces.
 
   @param contents output from `cluster_read_file`
-  @param ids a list of reference IDs to check against
+  @param ids a list or set of reference IDs to check against
   @param filename string containing the name of the file (for validation)
   @param quiet if True, no messages will be printed
 
   @return list of dictionaries
   """
-  data = []
-  for line in contents:
-    row = line.split()
-    if len(row) == 6:
-      row_data = _parseFileRow(row=row)
-      processed_row_data = _validateFileRow(row=row_data, ids=ids, quiet=quiet)
-      data.append(processed_row_data)
-    else:
-      if not quiet:
-        statusMsg('Line in ', filename, 'has',len(row),'columns instead of 6')
+  if not isinstance(ids, (set, frozenset)):
+    ids = frozenset(ids)
+  data, errors = _parseLines(contents, ids, filename, quiet)
+  if not quiet:
+    for error in errors:
+      statusMsg('Line in ', filename, 'has',error['columns'],'columns instead of 6')
   return data
+
+def _readFile(path):
+  """Read and parse a single PED file"""
+  try:
+    with open(path, 'r', encoding='utf-8') as stream:
+      return stream.readlines(), None
+  except (OSError, UnicodeDecodeError) as error:
+    return [], {'file': path, 'line': None, 'columns': None, 'message': str(error)}
+
+def parseMany(paths: list = None, ids: list = None, workers: int = 8):
+  """Parse many PED files
+
+  Read PED files in a pool of threads and validate all rows against a single
+  set of reference IDs. Rows are collected into columnar buffers and the
+  frame is built once at the end. Lines with the wrong number of columns and
+  files that cannot be read are returned in a separate report.
+
+  @param paths list of PED file locations
+  @param ids list of reference IDs to check against
+  @param workers number of threads used to read files
+
+  @return tuple of a datatable frame (see PED_COLUMNS) and a list of
+    dictionaries (file, line, columns, message) with all issues
+  """
+  ids = frozenset(ids)
+  buffers = {column: [] for column in PED_COLUMNS}
+  report = []
+
+  with ThreadPoolExecutor(max_workers=workers) as executor:
+    for path, (contents, error) in zip(paths, executor.map(_readFile, paths)):
+      if error:
+        report.append(error)
+        continue
+      filename = basename(path)
+      rows, errors = _parseLines(contents, ids, path)
+      report.extend(errors)
+      for row in rows:
+        row['pedID'] = filename
+        for column in PED_COLUMNS:
+          buffers[column].append(row.get(column))
+
+  data = dt.Frame(
+    [buffers[column] for column in PED_COLUMNS],
+    names=PED_COLUMNS,
+    types=[PED_COLUMN_TYPES.get(column, dt.str32) for column in PED_COLUMNS]
+  )
+
+  statusMsg('Parsed', data.nrows, 'rows from', len(paths), 'files', f'({len(report)} issues)')
+  return data, report
@@ -2,16 +2,29 @@
 #' FILE: phenopackettools.py
 #' AUTHOR: David Ruvolo
 #' CREATED: 2022-08-04
-#' MODIFIED: 2022-09-06
+#' MODIFIED: 2026-10-17
 #' PURPOSE: misc functions for extracting and formatting data
 #' STATUS: stable
 #' PACKAGES: **see below**
 #' COMMENTS: NA
 #'////////////////////////////////////////////////////////////////////////////
 
-from rd3.utils.utils import recodeValue
+from rd3.utils.utils import recodeValue, statusMsg
+from rd3.utils.codetools import CodeNormalizer
+from rd3tools.datatable import dt_from_records
+from concurrent.futures import ProcessPoolExecutor
+from datatable import dt
+from os.path import basename
+import json
 import re
 
+# reference codes used by the worker processes (see `extractPhenopackets`)
+_references = {}
+
+# normalizers for raw codes; validation happens in `processPhenopacket`
+_hpoNormalizer = CodeNormalizer('hpo')
+_diseaseNormalizer = CodeNormalizer('disease')
+
 def recodeSexCodes(value):
   """Recode Phenopacket set value
   Record phenopackets sex values into RD3 terminology
@@ -42,19 +55,14 @@ def unpackPhenotypicFeatures(data):
   @return dictionary with lists for observed and unobserved phenotypes
   """
   result = {'phenotype': [], 'hasNotPhenotype': []}
+  found = set()
   for row in data:
     if 'type' in row:
-      hpoId = row['type']['id'].replace('HP:','HP_')
-      hpoId = hpoId.replace('\n','').strip()
-      hpoId = re.sub('^(P:)', 'HP:', hpoId)
-      if re.search('^(HP[0-9]{1,})', hpoId):
-        hpoId = hpoId.replace('HP', 'HP:')
-      if not (hpoId in result['phenotype']) and not (hpoId in result['hasNotPhenotype']):
+      hpoId = _hpoNormalizer.normalize(row['type']['id'])
+      if hpoId and (hpoId not in found):
+        found.add(hpoId)
         if row.get('negated'):
-          if row['negated']:
-            result['hasNotPhenotype'].append(hpoId)
-          if not row['negated']:
-            result['phenotype'].append(hpoId)
+          result['hasNotPhenotype'].append(hpoId)
         else:
           result['phenotype'].append(hpoId)
   return result
@@ -74,19 +82,139 @@ def unpackDiseaseCodes(data, mappings: dict = None):
   for row in data:
     if 'term' in row:
       if 'id' in row['term']:
-        code1 = row['term']['id']
-        if re.search(r'^((Orphanet:)|(ORDO:))', code1):
-          code1 = re.sub(r'^((Orphanet:)|(ORDO:))', 'ORDO_', code1)
-        if re.search(r'^((OMIM:)|(MIM:))', code1):
-          code1 = re.sub(r'^((OMIM:)|(MIM:))', 'MIM_', code1)
+        code1 = _diseaseNormalizer.normalize(row['term']['id']) or ''
         if mappings and (code1 in mappings):
           code1 = recodeValue(mappings=mappings,value=code1,label='Disease Code')
         if not (code1 in codes['diagnostic']):
           codes['diagnostic'].append(code1)
     if 'classOfOnset' in row:
       if 'id' in row['classOfOnset']:
-        code2 = row['classOfOnset']['id']
-        code2 = re.sub(r'^(HP:)', 'HP_', code2)
-        if not (code2 in codes['onset']):
+        code2 = _hpoNormalizer.normalize(row['classOfOnset']['id'])
+        if code2 and not (code2 in codes['onset']):
           codes['onset'].append(code2)
-  return codes
\ No newline at end of file
+  return codes
+
+def processPhenopacket(data, filename: str = None, release: str = None, hpoCodes: set = None, diseaseCodes: set = None, mappings: dict = None):
+  """Process Phenopacket
+  Extract subject metadata, phenotypes, and diseases from the contents of a
+  phenopacket file. Codes that are not in the reference sets are returned in
+  the columns `unknownHpoCodes`, `unknownDiseaseCodes`, and
+  `unknownOnsetCodes` so that they can be reviewed before importing.
+
+  @param data contents of a phenopacket file
+  @param filename name of the file
+  @param release the release, on the cluster, where the file comes from
+  @param hpoCodes set of known HPO codes
+  @param diseaseCodes set of known disease codes
+  @param mappings a dictionary containing 'incorrect' disease codes and new mappings
+
+  @return dictionary
+  """
+  phenopacket = data['phenopacket']
+  subject = phenopacket.get('subject') or {}
+  result = {
+    'phenopacketsID': filename,
+    'clusterRelease': release,
+    'subjectID': phenopacket['id'],
+    'dateofBirth': formatDateOfBirth(subject.get('dateOfBirth')),
+    'sex1': recodeSexCodes(subject.get('sex')),
+    'phenotype': None,
+    'hasNotPhenotype': None,
+    'disease': None,
+    'ageOfOnset': None,
+    'subjectExists': None,
+    'releasesWhereSubjectExists': None,
+    'unknownOnsetCodes': None,
+    'unknownHpoCodes': None,
+    'unknownDiseaseCodes': None,
+  }
+
+  # triage HPO codes into 'has', 'has not', and 'unknown'
+  if phenopacket.get('phenotypicFeatures'):
+    patientHpoCodes = unpackPhenotypicFeatures(data=phenopacket['phenotypicFeatures'])
+    patientHpoUnknown = [
+      code for code in patientHpoCodes['phenotype'] + patientHpoCodes['hasNotPhenotype']
+      if code not in hpoCodes
+    ]
+    result['phenotype'] = ','.join(patientHpoCodes['phenotype']) or None
+    result['hasNotPhenotype'] = ','.join(patientHpoCodes['hasNotPhenotype']) or None
+    result['unknownHpoCodes'] = ','.join(patientHpoUnknown) or None
+
+  # triage disease and onset codes
+  if phenopacket.get('diseases'):
+    diseases = unpackDiseaseCodes(data=phenopacket['diseases'], mappings=mappings)
+    patientDiseasesUnknown = [
+      code for code in diseases['diagnostic']
+      if (code not in diseaseCodes) and (code != '')
+    ]
+    result['disease'] = ','.join(diseases['diagnostic']) or None
+    result['unknownDiseaseCodes'] = ','.join(patientDiseasesUnknown) or None
+
+    if diseases['onset']:
+      onsetCodesUnknown = [code for code in diseases['onset'] if code not in hpoCodes]
+      result['ageOfOnset'] = ','.join(diseases['onset'])
+      result['unknownOnsetCodes'] = ','.join(onsetCodesUnknown) or None
+
+  return result
+
+def _initWorker(hpoCodes, diseaseCodes, mappings, release):
+  """Store reference codes once per worker process"""
+  _references.update({
+    'hpoCodes': hpoCodes,
+    'diseaseCodes': diseaseCodes,
+    'mappings': mappings,
+    'release': release
+  })
+
+def _extractFile(path):
+  """Read and process a single phenopacket file in a worker process"""
+  try:
+    with open(path, 'r', encoding='utf-8') as stream:
+      data = json.load(stream)
+    return processPhenopacket(data=data, filename=basename(path), **_references)
+  except (OSError, ValueError, KeyError, TypeError) as error:
+    return {'error': path, 'message': str(error)}
+
+def extractPhenopackets(paths: list = None, hpoCodes: list = None, diseaseCodes: list = None, mappings: dict = None, release: str = None, workers: int = 4):
+  """Extract Phenopackets
+  Read and process phenopacket files in a pool of processes. Reference codes
+  are converted to sets and sent to each process once. Results are collected
+  in file order and built into a datatable frame in chunks. Files that cannot
+  be read or processed are reported and skipped.
+
+  @param paths list of phenopacket file locations
+  @param hpoCodes list of known HPO codes (solverd_lookups_phenotype)
+  @param diseaseCodes list of known disease codes (solverd_lookups_disease)
+  @param mappings a dictionary containing 'incorrect' disease codes and new mappings
+  @param release the release, on the cluster, where the files come from
+  @param workers number of processes
+
+  @return datatable frame
+  """
+  failed = []
+
+  def results(rows):
+    for row in rows:
+      if 'error' in row:
+        failed.append(row)
+      else:
+        yield row
+
+  with ProcessPoolExecutor(
+    max_workers=workers,
+    initializer=_initWorker,
+    initargs=(set(hpoCodes or []), set(diseaseCodes or []), mappings or {}, release)
+  ) as executor:
+    chunksize = max(1, len(paths) // (workers * 4))
+    data = dt_from_records(results(executor.map(_extractFile, paths, chunksize=chunksize)))
+
+  for row in failed:
+    statusMsg('Error: unable to process', basename(row['error']), f"({row['message']})")
+
+  # columns without values are stored as strings so that frames can be combined
+  for column in data.names:
+    if data[column].types[0] == dt.Type.void:
+      data[column] = data[column][:, dt.as_type(dt.f[column], dt.str32)]
+
+  statusMsg('Processed', data.nrows, 'of', len(paths), 'phenopacket files')
+  return data
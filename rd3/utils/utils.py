@@ -10,6 +10,7 @@
 # '////////////////////////////////////////////////////////////////////////////
 
 from datetime import datetime
+from functools import lru_cache
 from tqdm import tqdm
 import numpy as np
 import pytz
@@ -112,41 +113,74 @@ def flattenBoolArray(array, keepTrueValues=True):
   else:
     return None
 
-def flattenDataset(data, columnPatterns=None):
+@lru_cache(maxsize=None)
+def _compilePattern(columnPatterns: str = None):
+  """Compile a search pattern once"""
+  return re.compile(columnPatterns)
+
+@lru_cache(maxsize=4096)
+def _matchKey(columnPatterns: str = None, keys: tuple = None):
+  """Match Key
+  Find the nested key that matches a search pattern
+
+  @param columnPatterns string containing row headers to detect
+  @param keys tuple of the keys of a nested value
+  @return name of the key or None
+  """
+  columnMatch = _compilePattern(columnPatterns).search(','.join(keys))
+  return columnMatch.group() if columnMatch else None
+
+def flattenDataset(data, columnPatterns=None, asFrame: bool = False):
   """Flatten Dataset
   Flatten all nested attributes in a recordset based on a specific column names.
+  The target key of each column is determined once from the first non-empty
+  value and reused for all other rows. Values that do not contain this key
+  are matched separately.
   
   @param data a recordset
   @param column string containing row headers to detect: "subjectID|id|value"
-  @return a new recordset containing flattened data
+  @param asFrame if True, a datatable frame is returned
+  @return the recordset (modified in place) containing flattened data
   """
+  targetKeys = {}
+
+  def getKey(column, value):
+    key = targetKeys.get(column)
+    if key is None or key not in value:
+      key = _matchKey(columnPatterns, tuple(value))
+      if key is not None:
+        targetKeys[column] = key
+    return key
+
   newData = data
   for row in tqdm(newData):
-    if '_href' in row:
-      del row['_href']
-    for column in row.keys():
-      if isinstance(row[column], dict):
-        if bool(row[column]):
-          columnMatch = re.search(columnPatterns, ','.join(row[column].keys()))
-          if bool(columnMatch):
-            row[column] = row[column][columnMatch.group()]
+    row.pop('_href', None)
+    for column, value in row.items():
+      if isinstance(value, dict):
+        if bool(value):
+          key = getKey(column, value)
+          if key is not None:
+            row[column] = value = value[key]
           else:
             print(f'Variable {column} is type "dict", but no target column found')
         else:
-          row[column] = None
-      if isinstance(row[column], list):
-        if bool(row[column]):
+          row[column] = value = None
+      if isinstance(value, list):
+        if bool(value):
           values = []
-          for nestedrow in row[column]:
-            columnMatch = re.search(columnPatterns, ','.join(nestedrow.keys()))
-            if bool(columnMatch):
-              values.append(nestedrow[columnMatch.group()])
+          for nestedrow in value:
+            key = getKey(column, nestedrow)
+            if key is not None:
+              values.append(nestedrow[key])
             else:
               print(f'Variable {column} is type "list", but no target column found')
           if bool(values):
             row[column] = ','.join(values)
         else:
           row[column] = None
+  if asFrame:
+    from datatable import dt
+    return dt.Frame(newData)
   return newData
 
 def flattenStringArray(array):